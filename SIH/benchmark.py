@@ -0,0 +1,247 @@
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import tempfile
+import time
+import timeit
+import numpy as np
+from eeg_synth import simulate_eeg_chunks, generate_eeg_signal, chunks_per_minute, channel_names
+from recording import write_recording
+from ring_buffer import RingBuffer
+from dsp import StreamingBandpass
+from focus_model import FocusModel
+from run_info import git_revision, machine_info
+import server
+
+# --- Parameter Sweep ---
+# Every benchmark declares which of these parameters it depends on and runs once per
+# combination of their values. server.py streams at 5000 Hz; the generators use 500 Hz.
+PARAMS = {
+    'fs': (500, 5000),
+    'chunk_size': (100, 200, 500),
+    'buffer_seconds': (2, 10),
+    'channels': (1, 8, 32),
+    'backend': ('linear', 'sklearn'),
+    'window_seconds': (2, 4),
+}
+QUICK_PARAMS = {'fs': (500, 5000), 'chunk_size': (200,), 'buffer_seconds': (2,), 'channels': (1, 8),
+                'backend': ('linear',), 'window_seconds': (2,)}
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_results')
+MIN_RUN_SECONDS = 0.2  # Each repeat runs the stage enough times to take at least this long
+REPEATS = 5
+REGRESSION_THRESHOLD = 1.10  # compare: a median slower by more than 10% is reported as a regression
+
+
+def _n_channels(params):
+    return None if params['channels'] == 1 else params['channels']
+
+
+def _quiet(fn, *args, **kwargs):
+    """Runs setup code that prints progress (training, loading) without the noise."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def _chunk(params, rng):
+    shape = (params['chunk_size'],) if params['channels'] == 1 else (params['channels'], params['chunk_size'])
+    return rng.standard_normal(shape)
+
+
+def _trained_model(params):
+    channels = channel_names(params['channels']) if params['channels'] > 1 else None
+    return _quiet(FocusModel(params['fs'], params['chunk_size'], channels=channels,
+                             backend=params.get('backend', 'linear')).train)
+
+
+# --- Benchmarks: each setup returns the callable that is timed ---
+def bench_simulate_eeg_chunk(params):
+    """DataLoader.simulate_eeg_chunk's generator, swept over fs and channels."""
+    rng = np.random.default_rng(0)
+    return lambda: simulate_eeg_chunks([True], rng, params['fs'], params['chunk_size'], _n_channels(params))
+
+
+def bench_generate_long_eeg_signal(params):
+    """One minute of signal with the generator behind DataLoader.generate_long_eeg_signal."""
+    labels = np.ones(chunks_per_minute(params['fs'], 200), dtype=int)
+    return lambda: generate_eeg_signal(labels, 0, params['fs'], 200, _n_channels(params))
+
+
+def bench_bandpass_filter(params):
+    bandpass = StreamingBandpass(params['fs'])
+    chunk = _chunk(params, np.random.default_rng(0))
+    return lambda: bandpass.process(chunk)
+
+
+def bench_extract_features(params):
+    """One chunk through the sliding-window band powers and the feature vector."""
+    model = FocusModel(params['fs'], params['chunk_size'], window_seconds=params['window_seconds'],
+                       channels=channel_names(params['channels']) if params['channels'] > 1 else None)
+    band_power = model.make_band_power()
+    filtered = _chunk(params, np.random.default_rng(0))[np.newaxis]
+    return lambda: model.features(band_power.process(filtered))
+
+
+def bench_window_fft(params):
+    """Band powers from a full FFT of the analysis window every tick, kept as a baseline."""
+    model = FocusModel(params['fs'], params['chunk_size'], window_seconds=params['window_seconds'])
+    window = _chunk(dict(params, chunk_size=model.window_size), np.random.default_rng(0))
+    return lambda: model.band_power.band_powers(window)
+
+
+def bench_train_model(params):
+    channels = channel_names(params['channels']) if params['channels'] > 1 else None
+    return lambda: _quiet(FocusModel(params['fs'], 200, channels=channels).train)
+
+
+def bench_classify(params):
+    """Scaler + predict + probability for one tick's feature row."""
+    model = _trained_model(dict(params, fs=500, chunk_size=200))
+    chunk = _chunk(dict(params, chunk_size=200), np.random.default_rng(0))
+    row = model.features(model.make_band_power().process(chunk[np.newaxis]))
+    return lambda: model.classify(row)
+
+
+def bench_ring_buffer_write(params):
+    buffer = RingBuffer(params['fs'] * params['buffer_seconds'], _n_channels(params))
+    chunk = _chunk(params, np.random.default_rng(0))
+    return lambda: buffer.write(chunk)
+
+
+def bench_np_roll_update(params):
+    """The original per-tick update (np.roll of the whole buffer), kept as a baseline."""
+    shape = (params['fs'] * params['buffer_seconds'],)
+    if params['channels'] > 1:
+        shape = (params['channels'],) + shape
+    buffer = np.zeros(shape)
+    chunk = _chunk(params, np.random.default_rng(0))
+    n = params['chunk_size']
+
+    def update():
+        nonlocal buffer
+        buffer = np.roll(buffer, -n, axis=-1)
+        buffer[..., -n:] = chunk
+    return update
+
+
+def bench_update_and_get_state(params, workdir):
+    """One server tick (at server.FS / server.CHUNK_SIZE) including frame serialization."""
+    path = os.path.join(workdir, f"bench_{params['channels']}ch.eegrec")
+    if not os.path.exists(path):
+        labels = np.repeat([1, 0], chunks_per_minute(server.FS, server.CHUNK_SIZE))
+        _, signal, labels = generate_eeg_signal(labels, 0, server.FS, server.CHUNK_SIZE, _n_channels(params))
+        names = channel_names(params['channels']) if params['channels'] > 1 else None
+        write_recording(path, signal.astype(np.float32), labels, server.FS, server.CHUNK_SIZE, names)
+    model = _trained_model(dict(params, fs=server.FS, chunk_size=server.CHUNK_SIZE))
+    monitor = _quiet(server.FocusMonitor, path, model=model, adaptive=False)
+
+    def tick():
+        state = monitor.update_and_get_state()
+        server.encode_state(state)
+        server.encode_summary(state)
+    return tick
+
+
+BENCHMARKS = {
+    'simulate_eeg_chunk': (bench_simulate_eeg_chunk, ('fs', 'chunk_size', 'channels')),
+    'generate_long_eeg_signal': (bench_generate_long_eeg_signal, ('fs', 'channels')),
+    'bandpass_filter': (bench_bandpass_filter, ('fs', 'chunk_size', 'channels')),
+    'extract_features': (bench_extract_features, ('fs', 'chunk_size', 'channels', 'window_seconds')),
+    'window_fft': (bench_window_fft, ('fs', 'chunk_size', 'channels', 'window_seconds')),
+    'train_model': (bench_train_model, ('fs', 'channels')),
+    'classify': (bench_classify, ('backend', 'channels')),
+    'ring_buffer_write': (bench_ring_buffer_write, ('fs', 'chunk_size', 'buffer_seconds', 'channels')),
+    'np_roll_update': (bench_np_roll_update, ('fs', 'chunk_size', 'buffer_seconds', 'channels')),
+    'update_and_get_state': (bench_update_and_get_state, ('channels',)),
+}
+
+
+def time_stage(fn, repeats=REPEATS, min_seconds=MIN_RUN_SECONDS):
+    """asv-style timing: calibrate the loop count, then report per-call times over the repeats."""
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_seconds or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_seconds / 10 else 2
+    samples = np.array(timer.repeat(repeat=repeats, number=number)) / number
+    return {'number': number, 'repeat': repeats,
+            'min_us': float(samples.min() * 1e6), 'median_us': float(np.median(samples) * 1e6)}
+
+
+def run(names, grid, repeats=REPEATS, min_seconds=MIN_RUN_SECONDS):
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in names:
+            setup, keys = BENCHMARKS[name]
+            for values in itertools.product(*(grid[key] for key in keys)):
+                params = dict(zip(keys, values))
+                if name == 'update_and_get_state':
+                    fn = setup(params, workdir)
+                else:
+                    fn = setup(params)
+                timing = time_stage(fn, repeats, min_seconds)
+                results.append({'name': name, 'params': params, **timing})
+                print(f"{name:<26} {json.dumps(params):<70} {timing['median_us']:>12.1f} us")
+    return results
+
+
+def compare(old_path, new_path, threshold=REGRESSION_THRESHOLD):
+    """Prints median ratios new/old for every benchmark in both files; returns the regressions."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    key = lambda r: (r['name'], json.dumps(r['params'], sort_keys=True))
+    baseline = {key(r): r for r in old['results']}
+    regressions = []
+    print(f"{old['commit']} -> {new['commit']}")
+    for r in new['results']:
+        before = baseline.get(key(r))
+        if before is None:
+            continue
+        ratio = r['median_us'] / before['median_us']
+        flag = ' REGRESSION' if ratio > threshold else (' faster' if ratio < 1 / threshold else '')
+        print(f"{r['name']:<26} {key(r)[1]:<70} {before['median_us']:>10.1f} -> {r['median_us']:>10.1f} us "
+              f"({ratio:.2f}x){flag}")
+        if ratio > threshold:
+            regressions.append((r['name'], r['params'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the per-tick pipeline stages and store results per commit.")
+    sub = parser.add_subparsers(dest='command')
+    run_parser = sub.add_parser('run', help="Run the benchmarks (the default command).")
+    run_parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    run_parser.add_argument('--quick', action='store_true', help="Smaller parameter sweep and shorter timing runs.")
+    run_parser.add_argument('--results-dir', default=RESULTS_DIR)
+    compare_parser = sub.add_parser('compare', help="Compare two result files, e.g. two commits.")
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if args.command == 'compare':
+        regressions = compare(args.old, args.new, args.threshold)
+        raise SystemExit(1 if regressions else 0)
+
+    only = getattr(args, 'only', list(BENCHMARKS))
+    quick = getattr(args, 'quick', False)
+    results_dir = getattr(args, 'results_dir', RESULTS_DIR)
+    results = run(only, QUICK_PARAMS if quick else PARAMS,
+                  repeats=3 if quick else REPEATS, min_seconds=0.05 if quick else MIN_RUN_SECONDS)
+    revision = git_revision()
+    report = {'commit': revision, 'timestamp': time.time(), 'machine': machine_info(), 'results': results}
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, f'{revision}.json')
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results for {revision} saved to '{path}'.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+import math
+import numpy as np
+
+# --- Classifier Backends ---
+# Every backend is trained on raw (unscaled) feature batches and answers batched queries:
+#   fit(X, y) -> self, decision_function(X), predict(X), predict_proba(X) (probability of
+#   label 1), classify(X) -> (labels, probabilities), config(), runtime()
+# 'linear' needs only numpy/scipy and is the default on the hot path; 'online' adds
+# partial_fit for per-subject adaptation; 'sklearn' is the original
+# StandardScaler + SVC(probability=True) pipeline, kept as a reference.
+DEFAULT_BACKEND = 'linear'
+
+
+def expit(x):
+    """Logistic function in numpy (tanh form, no overflow), so classifying does not need scipy.special."""
+    return 0.5 + 0.5 * np.tanh(0.5 * x)
+
+
+def _minimize(loss, x0):
+    """L-BFGS minimum of a loss returning (value, gradient). Only training needs scipy.optimize."""
+    from scipy.optimize import minimize
+    return minimize(loss, x0, jac=True, method='L-BFGS-B').x
+
+
+def _platt_fit(decision, y):
+    """
+    Platt scaling: fits P(y=1 | f) = 1 / (1 + exp(A f + B)) to decision values, with
+    Platt's smoothed targets so a separable training set does not give infinite slopes.
+    """
+    n_pos = np.sum(y == 1)
+    n_neg = len(y) - n_pos
+    target = np.where(y == 1, (n_pos + 1.0) / (n_pos + 2.0), 1.0 / (n_neg + 2.0))
+
+    def loss(params):
+        z = params[0] * decision + params[1]
+        p = np.exp(-np.logaddexp(0, z))
+        nll = np.sum(target * np.logaddexp(0, z) + (1 - target) * np.logaddexp(0, -z))
+        residual = target - p
+        return nll, np.array([np.sum(residual * decision), np.sum(residual)])
+
+    prior = np.log((n_neg + 1.0) / (n_pos + 1.0))
+    return _minimize(loss, np.array([0.0, prior]))
+
+
+class LinearClassifier:
+    """
+    Linear SVM (L2-regularized squared hinge loss, the LinearSVC objective) trained with
+    L-BFGS on standardized features. After training, the standardization is folded into
+    the weights, so inference is one dot product plus a bias, and the probability is a
+    logistic (Platt) calibration of that decision value. The calibration is fitted on the
+    training decisions rather than by SVC's internal cross-validation. Labels must be 0/1.
+
+    `classify` evaluates the decision and the calibrated logit together as one
+    (n_features, 2) matrix product, which keeps the per-tick cost to a few numpy calls.
+    A single row (one session's tick) takes a shorter path: one dot product and a scalar
+    logistic.
+    """
+    def __init__(self, C=1.0):
+        self.C = C
+        self.weights = None
+        self.bias = 0.0
+        self.calibration = (-1.0, 0.0)  # Platt (A, B)
+        self._folded = None  # (weights, bias) columns: decision value, calibrated logit
+        self.mean = None  # Training feature statistics, kept to warm-start online models
+        self.std = None
+
+    def config(self):
+        return {'type': 'linear', 'loss': 'squared_hinge', 'C': self.C, 'calibration': 'platt'}
+
+    def runtime(self):
+        return {}
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y)
+        if set(np.unique(y).tolist()) != {0, 1}:
+            raise ValueError(f"LinearClassifier needs 0/1 labels, got {np.unique(y).tolist()}.")
+        signs = np.where(y == 1, 1.0, -1.0)
+        mean = X.mean(axis=0)
+        std = X.std(axis=0)
+        std[std == 0] = 1.0
+        Z = (X - mean) / std
+
+        def loss(params):
+            w, b = params[:-1], params[-1]
+            margin = 1 - signs * (Z @ w + b)
+            active = np.maximum(margin, 0)
+            grad = -2 * self.C * (active * signs)
+            return (0.5 * w @ w + self.C * active @ active,
+                    np.append(w + Z.T @ grad, np.sum(grad)))
+
+        params = _minimize(loss, np.zeros(Z.shape[1] + 1))
+        # Fold the standardization into the weights: w.(x - mean)/std + b = (w/std).x + b'
+        self.mean, self.std = mean, std
+        self.weights = params[:-1] / std
+        self.bias = float(params[-1] - self.weights @ mean)
+        a, b = self.calibration = tuple(float(v) for v in _platt_fit(self.decision_function(X), y))
+        # P = 1 / (1 + exp(a d + b)) = expit(-a d - b), so the logit is linear in x as well
+        self._folded = (np.column_stack([self.weights, -a * self.weights]),
+                        np.array([self.bias, -a * self.bias - b]))
+        return self
+
+    def decision_function(self, X):
+        return np.asarray(X, dtype=float) @ self.weights + self.bias
+
+    def classify(self, X):
+        if len(X) == 1:
+            decision = float(X[0] @ self.weights) + self.bias
+            a, b = self.calibration
+            return np.array([int(decision > 0)]), np.array([0.5 + 0.5 * math.tanh(-0.5 * (a * decision + b))])
+        weights, bias = self._folded
+        out = X @ weights + bias
+        return (out[:, 0] > 0).astype(int), expit(out[:, 1])
+
+    def predict(self, X):
+        return (self.decision_function(X) > 0).astype(int)
+
+    def predict_proba(self, X):
+        weights, bias = self._folded
+        return expit(X @ weights[:, 1] + bias[1])
+
+    def standardized_logit(self):
+        """(mean, std, weights, bias) of the calibrated logit over standardized features."""
+        a, b = self.calibration
+        return self.mean, self.std, -a * self.weights * self.std, -a * (self.bias + self.weights @ self.mean) - b
+
+
+class OnlineLinearClassifier:
+    """
+    Logistic regression that keeps learning from labelled feature batches with bounded
+    memory: a running mean/variance scaler (merged batch-wise, with the sample count
+    capped at `max_count` so the statistics follow slow drift) and one mini-batch SGD
+    step per `partial_fit`. No data is kept and nothing is ever refitted from scratch.
+
+    `from_classifier` warm-starts it from a trained LinearClassifier so that, before any
+    update, it reproduces that model's calibrated probabilities exactly.
+    """
+    def __init__(self, learning_rate=0.05, alpha=1e-3, max_count=10000, epochs=20, batch_size=32):
+        self.learning_rate = learning_rate
+        self.alpha = alpha  # L2 penalty
+        self.max_count = max_count
+        self.epochs = epochs  # Only used by fit()
+        self.batch_size = batch_size
+        self.count = 0.0
+        self.mean = None
+        self.m2 = None  # Sum of squared deviations from the mean
+        self.weights = None
+        self.bias = 0.0
+        self.updates = 0
+        self._folded = None  # (weights, bias) over raw features
+
+    @classmethod
+    def from_classifier(cls, base, prior_count=100, **params):
+        """Continues from `base`, whose statistics count as `prior_count` samples."""
+        if getattr(base, 'mean', None) is None or not hasattr(base, 'standardized_logit'):
+            raise ValueError(f"Cannot warm-start an online model from {type(base).__name__}; use the linear backend.")
+        online = cls(**params)
+        mean, std, weights, bias = base.standardized_logit()
+        online.count = float(prior_count)
+        online.mean = np.array(mean, dtype=float)
+        online.m2 = np.asarray(std, dtype=float) ** 2 * prior_count
+        online.weights = np.array(weights, dtype=float)
+        online.bias = float(bias)
+        online._refold()
+        return online
+
+    def config(self):
+        return {'type': 'online_logistic', 'learning_rate': self.learning_rate, 'alpha': self.alpha,
+                'max_count': self.max_count, 'epochs': self.epochs, 'batch_size': self.batch_size}
+
+    def runtime(self):
+        return {}
+
+    def _std(self):
+        std = np.sqrt(self.m2 / max(self.count, 1.0))
+        std[std == 0] = 1.0
+        return std
+
+    def _refold(self):
+        folded = self.weights / self._std()
+        self._folded = (folded, self.bias - folded @ self.mean)
+
+    def _update_stats(self, X):
+        n = len(X)
+        if self.mean is None:
+            self.mean = np.zeros(X.shape[1])
+            self.m2 = np.zeros(X.shape[1])
+            self.weights = np.zeros(X.shape[1])
+        # Chan et al.'s merge of two (count, mean, M2) summaries
+        batch_mean = X.mean(axis=0)
+        delta = batch_mean - self.mean
+        total = self.count + n
+        self.mean = self.mean + delta * (n / total)
+        self.m2 = self.m2 + ((X - batch_mean) ** 2).sum(axis=0) + delta ** 2 * (self.count * n / total)
+        self.count = total
+        if self.count > self.max_count:
+            self.m2 *= self.max_count / self.count
+            self.count = float(self.max_count)
+
+    def _sgd_step(self, X, y):
+        Z = (X - self.mean) / self._std()
+        error = expit(Z @ self.weights + self.bias) - y
+        self.weights = self.weights - self.learning_rate * (Z.T @ error / len(X) + self.alpha * self.weights)
+        self.bias -= self.learning_rate * float(error.mean())
+        self.updates += 1
+
+    def partial_fit(self, X, y):
+        """Updates the scaler and takes one SGD step on a batch of 0/1-labelled rows."""
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        y = np.asarray(y, dtype=float).reshape(-1)
+        self._update_stats(X)
+        self._sgd_step(X, y)
+        self._refold()  # Swapped in as one tuple, so concurrent readers see old or new weights
+        return self
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        self.count, self.mean, self.m2 = 0.0, None, None
+        self._update_stats(X)
+        self.weights = np.zeros(X.shape[1])
+        self.bias = 0.0
+        rng = np.random.default_rng(0)
+        for _ in range(self.epochs):
+            order = rng.permutation(len(X))
+            for start in range(0, len(X), self.batch_size):
+                batch = order[start:start + self.batch_size]
+                self._sgd_step(X[batch], y[batch])
+        self._refold()
+        return self
+
+    def decision_function(self, X):
+        weights, bias = self._folded
+        return np.asarray(X, dtype=float) @ weights + bias
+
+    def classify(self, X):
+        weights, bias = self._folded
+        logit = X @ weights + bias
+        return (logit > 0).astype(int), expit(logit)
+
+    def predict(self, X):
+        return (self.decision_function(X) > 0).astype(int)
+
+    def predict_proba(self, X):
+        return expit(self.decision_function(X))
+
+
+class SklearnSVCClassifier:
+    """The original StandardScaler + SVC(kernel='linear', probability=True) pipeline (needs scikit-learn)."""
+    def __init__(self):
+        from sklearn.svm import SVC
+        from sklearn.preprocessing import StandardScaler
+        self.scaler = StandardScaler()
+        self.clf = SVC(kernel='linear', probability=True)
+
+    def config(self):
+        return {'type': 'SVC', 'kernel': 'linear', 'probability': True}
+
+    def runtime(self):
+        import sklearn
+        return {'sklearn': sklearn.__version__}
+
+    def fit(self, X, y):
+        self.clf.fit(self.scaler.fit_transform(X), y)
+        return self
+
+    def decision_function(self, X):
+        return self.clf.decision_function(self.scaler.transform(X))
+
+    def predict(self, X):
+        return self.clf.predict(self.scaler.transform(X))
+
+    def predict_proba(self, X):
+        proba = self.clf.predict_proba(self.scaler.transform(X))
+        return proba[:, list(self.clf.classes_).index(1)]
+
+    def classify(self, X):
+        return self.predict(X), self.predict_proba(X)
+
+
+CLASSIFIER_BACKENDS = {'linear': LinearClassifier, 'online': OnlineLinearClassifier, 'sklearn': SklearnSVCClassifier}
+
+
+def make_classifier(backend=DEFAULT_BACKEND):
+    if backend not in CLASSIFIER_BACKENDS:
+        raise ValueError(f"Unknown classifier backend '{backend}', expected one of {sorted(CLASSIFIER_BACKENDS)}.")
+    return CLASSIFIER_BACKENDS[backend]()
@@ -0,0 +1,291 @@
+import re
+import numpy as np
+from functools import lru_cache
+
+# --- Feature Configuration ---
+BANDS = {'delta': (0.5, 4), 'theta': (4, 8), 'alpha': (8, 12), 'beta': (12, 30)}
+BAND_RATIOS = {'theta_beta': ('theta', 'beta'), 'alpha_beta': ('alpha', 'beta')}  # Per-channel engagement ratios
+POWER_EPS = 1e-12  # Keeps ratios and log-asymmetries finite for bands without power
+
+
+def _signal():
+    """scipy.signal, imported on first use: importing it is most of a cold start of the server."""
+    import scipy.signal
+    return scipy.signal
+
+
+@lru_cache(maxsize=None)
+def design_bandpass(fs, lowcut, highcut, order):
+    """Butterworth band-pass as second-order sections, designed once per (fs, band, order)."""
+    nyq = 0.5 * fs
+    return _signal().butter(order, [lowcut / nyq, highcut / nyq], btype='band', output='sos')
+
+
+class StreamingBandpass:
+    """
+    Band-pass filter for live, chunked data.
+
+    The coefficients come from the design cache and the `sosfilt` state is carried
+    from one chunk to the next, so consecutive chunks are filtered as one
+    continuous signal without per-chunk edge transients. Samples run along the
+    last axis, so (n_channels, n_samples) chunks are filtered in one call.
+    """
+    def __init__(self, fs, lowcut=1.0, highcut=40.0, order=4):
+        self.fs = fs
+        self.sos = design_bandpass(fs, lowcut, highcut, order)
+        self._zi = None
+
+    def process(self, chunk):
+        """Causally filters the next chunk of the stream."""
+        chunk = np.asarray(chunk, dtype=float)
+        if self._zi is None:
+            # Start from the steady state for the first sample to avoid a start-up step response
+            first = chunk[..., 0]
+            zi = _signal().sosfilt_zi(self.sos)
+            self._zi = zi.reshape((zi.shape[0],) + (1,) * first.ndim + (2,)) * first[np.newaxis, ..., np.newaxis]
+        filtered, self._zi = _signal().sosfilt(self.sos, chunk, axis=-1, zi=self._zi)
+        return filtered
+
+    def offline(self, data):
+        """Zero-phase filtering for complete recordings or batches of independent chunks."""
+        return _signal().sosfiltfilt(self.sos, data, axis=-1)
+
+    def reset(self):
+        self._zi = None
+
+
+class BandPowerExtractor:
+    """
+    Vectorized band-power features for one chunk or a whole (n_chunks, chunk_size) matrix.
+
+    Matches `welch(x, fs, nperseg=len(x))` followed by a mean over each band, but the
+    Hann window, PSD scaling and band membership are precomputed once. A batch then
+    costs one rFFT along the last axis and one matrix product for the band means.
+    """
+    def __init__(self, fs, chunk_size, bands=None):
+        self.fs = fs
+        self.chunk_size = chunk_size
+        self.bands = dict(BANDS if bands is None else bands)
+        self.window = _signal().get_window('hann', chunk_size)
+        self.scale = 1.0 / (fs * np.sum(self.window ** 2))
+        self.freqs = np.fft.rfftfreq(chunk_size, 1.0 / fs)
+
+        # One-sided density: every bin except DC (and Nyquist for even lengths) is doubled
+        self.one_sided = np.full(len(self.freqs), 2.0)
+        self.one_sided[0] = 1.0
+        if chunk_size % 2 == 0:
+            self.one_sided[-1] = 1.0
+
+        # Column j averages the bins of band j; bands without any bin stay all-zero (power 0)
+        self.band_matrix = np.zeros((len(self.freqs), len(self.bands)))
+        for j, (low, high) in enumerate(self.bands.values()):
+            idx = np.flatnonzero((self.freqs >= low) & (self.freqs <= high))
+            if idx.size:
+                self.band_matrix[idx, j] = 1.0 / idx.size
+
+    @property
+    def band_names(self):
+        return list(self.bands)
+
+    def psd(self, filtered):
+        """Power spectral density of each chunk along the last axis."""
+        filtered = np.asarray(filtered, dtype=float)
+        detrended = filtered - filtered.mean(axis=-1, keepdims=True)
+        spectrum = np.fft.rfft(detrended * self.window, axis=-1)
+        return (spectrum.real ** 2 + spectrum.imag ** 2) * (self.scale * self.one_sided)
+
+    def band_powers(self, filtered):
+        """Mean PSD per band: (chunk_size,) -> (n_bands,), (n_chunks, chunk_size) -> (n_chunks, n_bands)."""
+        return self.psd(filtered) @ self.band_matrix
+
+
+class SlidingDFT:
+    """
+    Design of an incremental spectrum over the newest `window_chunks` chunks of a stream.
+
+    Chunks of 40 ms leave no DFT bins below 25 Hz, so band powers are taken over a longer
+    analysis window of window_chunks * chunk_size samples, as BandPowerExtractor(fs,
+    window_size) would on that window. Only the bins the band means average (and their
+    neighbours) are tracked: each chunk adds its own DFT at those bins, one
+    (chunk_size, n_bins) matrix product, and the chunk leaving the window subtracts its
+    stored one, so a tick costs O(chunk_size * n_bins) instead of an FFT of the window.
+    The Hann window is applied afterwards in the frequency domain (0.5 X[k] - 0.25
+    X[k-1] - 0.25 X[k+1]) and the mean is removed by dropping bin 0, which reproduces
+    the extractor's detrended, windowed PSD exactly.
+
+    The design holds no stream state and is shared; each stream gets a SlidingBandPower.
+    """
+    def __init__(self, fs, chunk_size, window_chunks, bands=None):
+        self.fs = fs
+        self.chunk_size = chunk_size
+        self.window_chunks = window_chunks
+        self.window_size = n = chunk_size * window_chunks
+        self.extractor = BandPowerExtractor(fs, n, bands)
+
+        # Hann-windowed bins that feed a band mean, and the plain DFT bins they are built from
+        used = np.flatnonzero(self.extractor.band_matrix.any(axis=1))
+        neighbours = np.concatenate([used - 1, used, used + 1])
+        # A real signal's spectrum is conjugate-symmetric: bins -k and n-k are conj(X[k])
+        folded = np.where(neighbours > n // 2, n - neighbours, np.abs(neighbours))
+        self.bins = np.unique(folded[folded != 0])  # Bin 0 is removed by the detrend
+        column = {k: i for i, k in enumerate(self.bins)}
+        self.band_matrix = self.extractor.band_matrix[used]
+        self.power_scale = self.extractor.scale * self.extractor.one_sided[used]
+
+        # Y = 0.5 X[k] - 0.25 z* X[k-1] - 0.25 z X[k+1], z = e^(2j pi s/n) for a window starting at sample s.
+        # Each tap indexes [X, conj(X), 0], so neighbours below 1 or above n/2 fold onto tracked bins.
+        m = len(self.bins)
+        self._taps = np.empty((3, len(used)), dtype=int)
+        for shift, taps in enumerate((used - 1, used, used + 1)):
+            for j, k in enumerate(taps):
+                if k % n == 0:
+                    self._taps[shift, j] = 2 * m
+                elif 0 < k <= n // 2:
+                    self._taps[shift, j] = column[k]
+                else:
+                    self._taps[shift, j] = m + column[-k if k < 0 else n - k]
+
+        # Phase of each ring slot's first sample, and z for a window whose oldest chunk is in that slot
+        slot_starts = np.arange(window_chunks) * chunk_size
+        self.slot_phases = np.exp(-2j * np.pi * np.outer(slot_starts, self.bins) / n)
+        self.start_phases = np.exp(2j * np.pi * slot_starts / n)
+
+        # DFT of a chunk at the tracked bins, phase-referenced to the chunk's first sample, as one real
+        # (chunk_size, 2 * n_bins) matrix of the cosine and sine parts so real chunks need no complex product
+        angles = 2 * np.pi * np.outer(np.arange(chunk_size), self.bins) / n
+        self.basis = np.hstack([np.cos(angles), -np.sin(angles)])
+
+    @property
+    def band_names(self):
+        return self.extractor.band_names
+
+    def chunk_spectra(self, filtered):
+        """Plain DFT of each chunk at the tracked bins: (..., chunk_size) -> (..., n_bins)."""
+        parts = np.asarray(filtered, dtype=float) @ self.basis
+        m = len(self.bins)
+        return parts[..., :m] + 1j * parts[..., m:]
+
+
+class SlidingBandPower:
+    """
+    Per-stream state of a SlidingDFT: the window's running DFT and the per-chunk terms it
+    is made of. Until the first window has filled, the missing samples count as zeros.
+    """
+    def __init__(self, design):
+        self.design = design
+        self.reset()
+
+    def reset(self):
+        self._terms = None  # (window_chunks, [n_channels,] n_bins) DFT of each chunk in the window
+        self._sum = None
+        self._position = 0  # Chunks seen so far
+
+    def update(self, spectra):
+        """
+        Advances the window by the chunks whose `chunk_spectra` are given, (n_chunks, [n_channels,]
+        n_bins), and returns the band powers after each one, (n_chunks, [n_channels,] n_bands).
+        """
+        d = self.design
+        if self._terms is None:
+            self._terms = np.zeros((d.window_chunks,) + spectra.shape[1:], dtype=complex)
+            self._sum = np.zeros(spectra.shape[1:], dtype=complex)
+        powers = np.empty(spectra.shape[:-1] + (d.band_matrix.shape[1],))
+        for i, spectrum in enumerate(spectra):
+            slot = self._position % d.window_chunks
+            # Every chunk's term is referenced to one phase origin, the first sample of slot 0
+            term = spectrum * d.slot_phases[slot]
+            self._sum += term - self._terms[slot]
+            self._terms[slot] = term
+            self._position += 1
+            if slot == d.window_chunks - 1:
+                self._sum = self._terms.sum(axis=0)  # Re-sum once per window so rounding cannot accumulate
+            powers[i] = self._band_powers()
+        return powers
+
+    def _band_powers(self):
+        d = self.design
+        # The window now starts at the oldest chunk, which sits in the next slot of the ring
+        z = d.start_phases[self._position % d.window_chunks]
+        taps = np.concatenate([self._sum, np.conj(self._sum), np.zeros(self._sum.shape[:-1] + (1,))], axis=-1)
+        hann = 0.5 * taps[..., d._taps[1]] - 0.25 * (np.conj(z) * taps[..., d._taps[0]] + z * taps[..., d._taps[2]])
+        return (hann.real ** 2 + hann.imag ** 2) * d.power_scale @ d.band_matrix
+
+    def process(self, filtered):
+        """Band powers after each of the consecutive filtered (n_chunks, [n_channels,] chunk_size) chunks."""
+        return self.update(self.design.chunk_spectra(filtered))
+
+
+def homologous_pairs(channels):
+    """
+    (left, right) index pairs of mirrored 10-20 electrodes present in `channels`: an odd
+    number is the left hemisphere and the next even number its right twin (F3/F4, TP9/TP10).
+    """
+    index = {name: i for i, name in enumerate(channels)}
+    pairs = []
+    for i, name in enumerate(channels):
+        match = re.fullmatch(r'([A-Za-z]+)(\d+)', name)
+        # Generic 'Ch<n>' names carry no montage information
+        if match and match.group(1) != 'Ch' and int(match.group(2)) % 2 == 1:
+            right = f'{match.group(1)}{int(match.group(2)) + 1}'
+            if right in index:
+                pairs.append((i, index[right]))
+    return pairs
+
+
+class ChannelFeatures:
+    """
+    Turns per-channel band powers into the classifier's feature vector.
+
+    Single-channel streams (channels=None) use the band powers as they are. For
+    (..., n_channels, n_bands) powers the vector is, all computed with array indexing
+    over every channel at once:
+      - each channel's band powers
+      - per-channel band ratios (BAND_RATIOS, e.g. theta/beta)
+      - log-power asymmetry log(right) - log(left) of every band for each homologous pair
+    """
+    def __init__(self, band_names, channels=None):
+        self.band_names = list(band_names)
+        self.channels = list(channels) if channels is not None else None
+        bands = {name: j for j, name in enumerate(self.band_names)}
+        ratios = {name: pair for name, pair in BAND_RATIOS.items() if pair[0] in bands and pair[1] in bands}
+        self.ratio_names = list(ratios)
+        self._numerators = np.array([bands[num] for num, _ in ratios.values()], dtype=int)
+        self._denominators = np.array([bands[den] for _, den in ratios.values()], dtype=int)
+        pairs = homologous_pairs(self.channels) if self.channels is not None else []
+        self.pairs = [(self.channels[left], self.channels[right]) for left, right in pairs]
+        self._left = np.array([left for left, _ in pairs], dtype=int)
+        self._right = np.array([right for _, right in pairs], dtype=int)
+
+    @property
+    def names(self):
+        if self.channels is None:
+            return list(self.band_names)
+        names = [f'{ch}_{band}' for ch in self.channels for band in self.band_names]
+        names += [f'{ch}_{ratio}' for ch in self.channels for ratio in self.ratio_names]
+        names += [f'{right}-{left}_{band}_asym' for left, right in self.pairs for band in self.band_names]
+        return names
+
+    def __call__(self, powers):
+        powers = np.asarray(powers, dtype=float)
+        if self.channels is None:
+            return powers
+        lead = powers.shape[:-2]
+        ratios = powers[..., self._numerators] / (powers[..., self._denominators] + POWER_EPS)
+        log_powers = np.log(powers + POWER_EPS)
+        asymmetry = log_powers[..., self._right, :] - log_powers[..., self._left, :]
+        return np.concatenate([powers.reshape(lead + (-1,)), ratios.reshape(lead + (-1,)),
+                               asymmetry.reshape(lead + (-1,))], axis=-1)
+
+
+def minmax_decimate(samples, points):
+    """
+    Reduces the last axis to `points` (min, max) buckets, the standard trick for drawing a
+    long trace at screen resolution without losing spikes. The oldest samples that do not
+    fill a whole bucket are dropped. Returns (mins, maxs, bucket_size).
+    """
+    samples = np.asarray(samples)
+    n = samples.shape[-1]
+    points = max(1, min(points, n))
+    bucket = n // points
+    blocks = samples[..., n - points * bucket:].reshape(samples.shape[:-1] + (points, bucket))
+    return blocks.min(axis=-1), blocks.max(axis=-1), bucket
@@ -0,0 +1,300 @@
+import argparse
+import json
+import os
+import zlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from recording import RecordingWriter, EXTENSION
+from dsp import homologous_pairs
+
+# --- Configuration Constants ---
+FS = 500  # Sampling frequency in Hz
+CHUNK_SIZE = 200  # Samples per small chunk
+BLOCK_CHUNKS = 3000  # Chunks synthesized per block by the streaming generator
+CHANNEL_NAMES = ['Fp1', 'Fp2', 'F3', 'F4', 'C3', 'C4', 'P3', 'P4', 'O1', 'O2', 'F7', 'F8',
+                 'T3', 'T4', 'T5', 'T6', 'Fz', 'Cz', 'Pz', 'Oz', 'FC1', 'FC2', 'CP1', 'CP2',
+                 'FC5', 'FC6', 'CP5', 'CP6', 'TP9', 'TP10', 'POz', 'AFz']
+NEUTRAL_PROFILE = {'gain': 1.0, 'alpha_shift': 0.0, 'noise': 0.15}
+ALPHA_ASYMMETRY = 0.2  # Multi-channel only: focus lowers left- relative to right-hemisphere alpha
+
+# --- Built-in Scenarios ---
+# A scenario is declarative: either a list of (duration_min, p_focused) segments, or a
+# 2x2 Markov transition matrix over [unfocused, focused] applied once per chunk together
+# with a total duration. Optional keys: channels, subjects, title.
+BUILTIN_SCENARIOS = {
+    'simulated_20min_eeg': {
+        'title': 'Generated 20-Minute EEG Signal',
+        'segments': [(8, 0.90), (12, 0.20)],
+    },
+    'simulated_20min_eeg_unfocused_first': {
+        'title': 'Generated 20-Minute EEG Signal (Unfocused First)',
+        'segments': [(8, 0.20), (12, 0.90)],
+    },
+    'markov_60min_8ch': {
+        'title': 'Generated 60-Minute 8-Channel EEG Signal (Markov)',
+        'markov': [[0.995, 0.005], [0.003, 0.997]],
+        'duration_min': 60,
+        'channels': 8,
+    },
+}
+
+
+def channel_names(n_channels):
+    return [CHANNEL_NAMES[i] if i < len(CHANNEL_NAMES) else f'Ch{i + 1}' for i in range(n_channels)]
+
+
+def hemisphere_sides(names):
+    """-1 for left and +1 for right electrodes of homologous pairs, 0 for midline and others."""
+    sides = np.zeros(len(names))
+    for left, right in homologous_pairs(names):
+        sides[left], sides[right] = -1.0, 1.0
+    return sides
+
+
+def subject_profile(rng):
+    """Draws per-subject variation: overall gain, alpha peak shift (Hz) and noise level."""
+    rng = np.random.default_rng(rng)
+    return {
+        'gain': float(rng.uniform(0.8, 1.2)),
+        'alpha_shift': float(rng.uniform(-1.0, 1.0)),
+        'noise': float(rng.uniform(0.10, 0.20)),
+    }
+
+
+def simulate_eeg_chunks(focus, rng=None, fs=FS, chunk_size=CHUNK_SIZE, n_channels=None, profile=None):
+    """
+    Vectorized version of simulate_eeg_chunk: returns one simulated chunk per entry
+    of the boolean `focus` array as a (n_chunks, chunk_size) matrix, or
+    (n_chunks, n_channels, chunk_size) when n_channels is given.
+    All amplitude and frequency jitter is drawn as arrays from `rng`. Rhythm
+    frequencies are shared across channels; amplitudes and noise are per channel.
+    With several channels, alpha is also lateralized by focus state (ALPHA_ASYMMETRY),
+    which gives cross-channel features something to find.
+    """
+    rng = np.random.default_rng(rng)
+    profile = NEUTRAL_PROFILE if profile is None else profile
+    focus = np.asarray(focus, dtype=bool).reshape(-1)
+    n = focus.size
+    c = 1 if n_channels is None else n_channels
+    t = np.arange(chunk_size) / fs
+
+    # Base amplitudes with some random jitter for realism
+    delta_amp = rng.uniform(0.3, 0.5, (n, c))
+    theta_amp = rng.uniform(0.2, 0.4, (n, c))
+    # Focused state: higher beta, lower alpha. Unfocused state: the reverse.
+    alpha_amp = rng.uniform(0.3, 0.7, (n, c)) * np.where(focus, 0.5, 1.5)[:, None]
+    beta_amp = rng.uniform(0.2, 0.6, (n, c)) * np.where(focus, 1.5, 0.5)[:, None]
+    if n_channels is not None:
+        sides = hemisphere_sides(channel_names(c))
+        alpha_amp *= 1 + ALPHA_ASYMMETRY * np.where(focus, 1.0, -1.0)[:, None] * sides
+
+    delta_freq = rng.uniform(1, 3, (n, 1))
+    alpha_freq = rng.uniform(9, 11, (n, 1)) + profile['alpha_shift']
+    beta_freq = rng.uniform(18, 22, (n, 1))
+
+    phase = 2 * np.pi * t
+    signal = delta_amp[..., None] * np.sin(delta_freq[..., None] * phase)
+    signal += theta_amp[..., None] * np.sin(6 * phase)
+    signal += alpha_amp[..., None] * np.sin(alpha_freq[..., None] * phase)
+    signal += beta_amp[..., None] * np.sin(beta_freq[..., None] * phase)
+    signal *= profile['gain']
+    signal += profile['noise'] * rng.standard_normal((n, c, chunk_size))
+    return signal[:, 0, :] if n_channels is None else signal
+
+
+# --- Focus Schedules ---
+def chunks_per_minute(fs=FS, chunk_size=CHUNK_SIZE):
+    return 60 * fs // chunk_size
+
+
+def scenario_duration_min(scenario):
+    if 'segments' in scenario:
+        return sum(duration for duration, _ in scenario['segments'])
+    return scenario['duration_min']
+
+
+def segment_labels(segments, rng=None, fs=FS, chunk_size=CHUNK_SIZE):
+    """Draws per-chunk focus labels from piecewise-constant (duration_min, p_focused) segments."""
+    rng = np.random.default_rng(rng)
+    per_min = chunks_per_minute(fs, chunk_size)
+    prob_focused = np.concatenate([np.full(int(duration * per_min), p) for duration, p in segments])
+    return (rng.random(prob_focused.size) < prob_focused).astype(int)
+
+
+def markov_labels(transition, n_chunks, rng=None, initial=0):
+    """
+    Draws per-chunk labels from a two-state Markov chain. Instead of stepping chunk by
+    chunk, alternating run lengths are drawn as geometric variates in batches.
+    """
+    rng = np.random.default_rng(rng)
+    transition = np.asarray(transition, dtype=float)
+    leave = np.maximum(1.0 - np.diag(transition), 1e-12)
+    runs, states, total, state = [], [], 0, initial
+    while total < n_chunks:
+        batch_states = (state + np.arange(64)) % 2
+        batch_runs = rng.geometric(leave[batch_states])
+        runs.append(batch_runs)
+        states.append(batch_states)
+        total += batch_runs.sum()
+    return np.repeat(np.concatenate(states), np.concatenate(runs))[:n_chunks]
+
+
+def focus_labels(scenario, rng=None, fs=FS, chunk_size=CHUNK_SIZE):
+    """Ground-truth focus label for every chunk of a scenario."""
+    if 'segments' in scenario:
+        return segment_labels(scenario['segments'], rng, fs, chunk_size)
+    n_chunks = int(scenario['duration_min'] * chunks_per_minute(fs, chunk_size))
+    return markov_labels(scenario['markov'], n_chunks, rng, scenario.get('initial_state', 0))
+
+
+# --- Signal Generation ---
+def iter_eeg_blocks(labels, rng=None, fs=FS, chunk_size=CHUNK_SIZE, block_chunks=BLOCK_CHUNKS,
+                    n_channels=None, profile=None):
+    """
+    Streaming generator: yields (signal_block, labels_block) for consecutive blocks of
+    at most `block_chunks` chunks, so arbitrarily long recordings fit in bounded memory.
+    Signal blocks are 1-D, or (n_channels, n_samples) when n_channels is given.
+    """
+    rng = np.random.default_rng(rng)
+    labels = np.asarray(labels, dtype=int)
+    for start in range(0, len(labels), block_chunks):
+        block_labels = labels[start:start + block_chunks]
+        chunks = simulate_eeg_chunks(block_labels, rng, fs, chunk_size, n_channels, profile)
+        if n_channels is None:
+            yield chunks.reshape(-1), block_labels
+        else:
+            yield chunks.transpose(1, 0, 2).reshape(n_channels, -1), block_labels
+
+
+def generate_eeg_signal(labels, rng=None, fs=FS, chunk_size=CHUNK_SIZE, n_channels=None, profile=None):
+    """Generates the whole signal in memory; returns (time, signal, labels)."""
+    blocks = [block for block, _ in iter_eeg_blocks(labels, rng, fs, chunk_size, BLOCK_CHUNKS, n_channels, profile)]
+    if blocks:
+        signal = np.concatenate(blocks, axis=-1)
+    else:
+        signal = np.zeros((0,) if n_channels is None else (n_channels, 0))
+    time_array = np.arange(signal.shape[-1]) / fs
+    return time_array, signal, np.asarray(labels, dtype=int)
+
+
+def scenario_rng(seed, name, subject):
+    """Independent, reproducible stream per (seed, scenario, subject), whatever the worker order."""
+    return np.random.default_rng([seed, zlib.crc32(name.encode('utf-8')), subject])
+
+
+def _scenario_setup(name, scenario, subject, seed, fs, chunk_size):
+    """Draws the labels and returns everything needed to synthesize one subject's recording."""
+    n_channels = scenario.get('channels', 1)
+    # Subjects keep the same profile across scenarios; a single-subject scenario stays neutral
+    profile = subject_profile([seed, subject]) if scenario.get('subjects', 1) > 1 else NEUTRAL_PROFILE
+    rng = scenario_rng(seed, name, subject)
+    labels = focus_labels(scenario, rng, fs, chunk_size)
+    return labels, rng, (n_channels if n_channels > 1 else None), profile
+
+
+def generate_scenario(name, scenario, subject=0, seed=0, fs=FS, chunk_size=CHUNK_SIZE):
+    """Generates one subject's recording for a scenario; returns the arrays that get saved."""
+    n_channels = scenario.get('channels', 1)
+    labels, rng, n_channels_arg, profile = _scenario_setup(name, scenario, subject, seed, fs, chunk_size)
+    t, signal, labels = generate_eeg_signal(labels, rng, fs, chunk_size, n_channels_arg, profile)
+    return {
+        'time': t,
+        'signal': signal,
+        'labels': labels,
+        'fs': fs,
+        'chunk_size': chunk_size,
+        'channels': np.array(channel_names(n_channels)),
+    }
+
+
+def output_name(name, scenario, subject):
+    return f"{name}_s{subject:02d}" if scenario.get('subjects', 1) > 1 else name
+
+
+def _write_job(job):
+    """
+    Process-pool worker: generates one (scenario, subject) recording and saves it.
+    The .eegrec format is written block by block, so memory stays bounded for any duration.
+    """
+    name, scenario, subject, seed, out_dir, fmt = job
+    base = os.path.join(out_dir, output_name(name, scenario, subject))
+    if fmt == 'npz':
+        np.savez_compressed(base + '.npz', **generate_scenario(name, scenario, subject, seed))
+        return base + '.npz'
+
+    labels, rng, n_channels, profile = _scenario_setup(name, scenario, subject, seed, FS, CHUNK_SIZE)
+    names = channel_names(scenario.get('channels', 1))
+    with RecordingWriter(base + EXTENSION, len(labels) * CHUNK_SIZE, FS, CHUNK_SIZE, n_channels, names) as writer:
+        for block, block_labels in iter_eeg_blocks(labels, rng, FS, CHUNK_SIZE, BLOCK_CHUNKS, n_channels, profile):
+            writer.write(block, block_labels)
+    return base + EXTENSION
+
+
+def plot_signal_overview(time_array, eeg_signal, scenario):
+    """Plots the full generated signal and marks the boundaries between schedule segments."""
+    import matplotlib.pyplot as plt
+
+    plt.style.use('seaborn-v0_8-whitegrid')
+    fig, ax = plt.subplots(figsize=(15, 6))
+    trace = eeg_signal if eeg_signal.ndim == 1 else eeg_signal[0]
+    ax.plot(time_array / 60, trace, lw=0.5, color='royalblue')
+
+    if 'segments' in scenario:
+        start = 0
+        for i, (duration, p_focused) in enumerate(scenario['segments']):
+            label = 'High Focus Period' if p_focused >= 0.5 else 'Low Focus Period'
+            color = 'darkgreen' if p_focused >= 0.5 else 'darkred'
+            ax.text(start + duration / 2, np.max(trace)*0.8, label, color=color, ha='center', fontsize=12)
+            start += duration
+            if i < len(scenario['segments']) - 1:
+                ax.axvline(x=start, color='r', linestyle='--', lw=2, label=f'{start:g} min Transition Point')
+
+    ax.set_title(scenario.get('title', 'Generated EEG Signal'), fontsize=16)
+    ax.set_xlabel('Time (minutes)', fontsize=12)
+    ax.set_ylabel('Amplitude (µV)', fontsize=12)
+    if ax.get_legend_handles_labels()[0]:
+        ax.legend()
+    plt.tight_layout()
+    plt.show()
+
+
+def load_scenarios(specs):
+    """Resolves CLI arguments: built-in scenario names or JSON files ({name: scenario, ...})."""
+    scenarios = {}
+    for spec in specs:
+        if spec in BUILTIN_SCENARIOS:
+            scenarios[spec] = BUILTIN_SCENARIOS[spec]
+        elif os.path.exists(spec):
+            with open(spec) as f:
+                scenarios.update(json.load(f))
+        else:
+            raise ValueError(f"Unknown scenario '{spec}'. Built-ins: {', '.join(BUILTIN_SCENARIOS)}")
+    return scenarios
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic EEG scenario recordings in parallel.")
+    parser.add_argument('scenarios', nargs='*', default=list(BUILTIN_SCENARIOS),
+                        help="Built-in scenario names or JSON scenario files (default: all built-ins).")
+    parser.add_argument('--out-dir', default='.', help="Directory for the generated files.")
+    parser.add_argument('--seed', type=int, default=None, help="Base seed; printed when chosen at random.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes.")
+    parser.add_argument('--format', choices=['npz', 'eegrec'], default='npz',
+                        help="'eegrec' streams to memory-mappable files in bounded memory.")
+    args = parser.parse_args(argv)
+
+    scenarios = load_scenarios(args.scenarios)
+    seed = args.seed if args.seed is not None else int(np.random.SeedSequence().entropy % 2**32)
+    os.makedirs(args.out_dir, exist_ok=True)
+    jobs = [(name, scenario, subject, seed, args.out_dir, args.format)
+            for name, scenario in scenarios.items()
+            for subject in range(scenario.get('subjects', 1))]
+
+    print(f"Generating {len(jobs)} recording(s) with seed {seed} on {args.workers} worker(s)...")
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for path in pool.map(_write_job, jobs):
+            print(f"💾 Data saved to '{path}'")
+
+
+if __name__ == '__main__':
+    main()
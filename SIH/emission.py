@@ -0,0 +1,72 @@
+import numpy as np
+
+# --- Emission Policy ---
+# The broadcast loop computes every session's state once per tick, but most of it rarely
+# changes from one tick to the next (the focus, timer and verdict texts, the verdict itself)
+# and not every client wants every tick. So frames carry only the state fields that changed
+# since the previous frame, and every `keyframe_every` frames the whole state, so a client
+# that lost a frame (dropped from a full send queue) recovers. A client that asks for a lower
+# rate gets coalesced frames instead: the samples of all the ticks since its previous frame
+# and the fields that changed since then. Clients keep the fields they were last sent.
+FRAME_KEYS = ('seq', 'timestamp', 'chunk')  # Sent in every frame's header and payload, not in its state
+
+
+def state_fields(state):
+    """The fields of a state dict that go into a frame's JSON state."""
+    return {k: v for k, v in state.items() if k not in FRAME_KEYS}
+
+
+class StateDeltas:
+    """
+    The state fields as a group of clients last received them. `update` turns a new state
+    into the one to send: the frame keys plus the fields that differ from what the clients
+    know (all of them in a keyframe).
+    """
+    def __init__(self, keyframe_every, known=None):
+        self.keyframe_every = max(1, keyframe_every)
+        self.known = known
+        self.since_keyframe = 0
+
+    def update(self, state):
+        fields = state_fields(state)
+        self.since_keyframe += 1
+        if self.known is None or self.since_keyframe >= self.keyframe_every:
+            self.since_keyframe = 0
+            changed = fields
+        else:
+            known = self.known
+            changed = {k: v for k, v in fields.items() if k not in known or known[k] != v}
+        self.known = fields
+        update = {k: state[k] for k in FRAME_KEYS}
+        update.update(changed)
+        return update
+
+
+class Coalescer:
+    """
+    One throttled client's frames: collects the chunks of `interval` ticks (when the client
+    receives samples) and then emits a single update against what the client last received.
+    """
+    def __init__(self, interval, known, keyframe_ticks):
+        self.interval = interval
+        self.deltas = StateDeltas(keyframe_ticks // interval, known)
+        self.elapsed = 0
+        self.chunks = []
+        self.state = None
+
+    def push(self, state, keep_chunks=True):
+        """Adds one tick; returns the update to send once `interval` ticks have passed, else None."""
+        self.elapsed += 1
+        self.state = state
+        if keep_chunks:
+            self.chunks.append(state['chunk'])
+        return self.flush() if self.elapsed >= self.interval else None
+
+    def flush(self):
+        """The update for the ticks collected so far (None if there are none)."""
+        if self.state is None:
+            return None
+        chunk = np.concatenate(self.chunks, axis=-1) if self.chunks else self.state['chunk'][..., :0]
+        update = self.deltas.update(dict(self.state, chunk=chunk))
+        self.elapsed, self.chunks, self.state = 0, [], None
+        return update
@@ -0,0 +1,240 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from recording import open_recording
+from focus_model import ModelStore, MODEL_CACHE_DIR
+from classifiers import DEFAULT_BACKEND
+from verdict import VerdictAggregator, VERDICT_MODES
+
+# --- Evaluation Defaults ---
+WINDOW_CHUNKS = 1200  # Verdict window, as FOCUS_WINDOW_CHUNKS in server.py
+BLOCK_CHUNKS = 3000  # Chunks filtered and classified per vectorized block
+STATE_SMOOTHING = 50  # Chunks in the centered moving average that defines the true focus state
+REPORT_FILE = 'evaluation_report.json'
+CALIBRATION_MIN_SHARE = 0.25  # Warn when either class has a smaller share of the calibration chunks
+
+
+def confusion_matrix(truth, pred):
+    """2x2 counts, rows = true label (0, 1), columns = predicted label."""
+    return np.bincount(2 * np.asarray(truth, dtype=int) + np.asarray(pred, dtype=int), minlength=4).reshape(2, 2)
+
+
+def true_states(labels, smoothing=STATE_SMOOTHING):
+    """
+    The underlying focus state: per-chunk labels are noisy (a focused segment still has
+    unfocused chunks), so the state is a centered moving average of the labels thresholded at 0.5.
+    """
+    labels = np.asarray(labels, dtype=float)
+    if len(labels) == 0:
+        return labels.astype(int)
+    padded = np.pad(labels, (smoothing // 2, smoothing - 1 - smoothing // 2), mode='edge')
+    csum = np.concatenate([[0.0], np.cumsum(padded)])
+    return ((csum[smoothing:] - csum[:-smoothing]) / smoothing > 0.5).astype(int)
+
+
+def verdict_latencies(states, verdict_idx, verdict_labels):
+    """
+    For every change of the true state: chunks until the first verdict that agrees with the
+    new state, or None when the state changes again (or the recording ends) first.
+    """
+    transitions = np.flatnonzero(np.diff(states)) + 1
+    bounds = np.append(transitions[1:], len(states))
+    latencies = []
+    for start, end in zip(transitions, bounds):
+        first = np.searchsorted(verdict_idx, start)
+        hits = np.flatnonzero(verdict_labels[first:np.searchsorted(verdict_idx, end)] == states[start])
+        latencies.append(int(verdict_idx[first + hits[0]] - start) if hits.size else None)
+    return latencies
+
+
+def _summary(values):
+    values = np.asarray(values, dtype=float)
+    if values.size == 0:
+        return None
+    return {'mean': float(values.mean()), 'median': float(np.median(values)),
+            'p90': float(np.percentile(values, 90)), 'max': float(values.max())}
+
+
+def classify_recording(recording, model, calibration_chunks=0, block_chunks=BLOCK_CHUNKS):
+    """
+    Replays a recording through the live pipeline (causal streaming filter, band powers,
+    features, classifier) in vectorized blocks. With calibration_chunks, a per-subject copy
+    of the model is first adapted online on that many labelled chunks, one chunk at a time
+    as the server does. Returns (labels, probabilities) per chunk.
+    """
+    chunk_size = recording.chunk_size
+    n_chunks = recording.n_samples // chunk_size
+    truth = np.asarray(recording.labels[:n_chunks])
+    if calibration_chunks:
+        model = model.adaptive_copy()
+    bandpass = model.make_filter()
+    band_power = model.make_band_power()
+    preds, probs = [], []
+    for start in range(0, n_chunks, block_chunks):
+        stop = min(start + block_chunks, n_chunks)
+        block = np.asarray(recording.signal[..., start * chunk_size:stop * chunk_size], dtype=float)
+        filtered = bandpass.process(block)
+        chunks = np.moveaxis(filtered.reshape(filtered.shape[:-1] + (stop - start, chunk_size)), -2, 0)
+        features = model.features(band_power.process(chunks))
+        if start < calibration_chunks:
+            # Predict-then-learn per chunk while calibrating, exactly like a live session
+            for i in range(min(stop, calibration_chunks) - start):
+                label, probability = model.classify(features[i:i + 1])
+                preds.append(label)
+                probs.append(probability)
+                if start + i < len(truth):
+                    model.partial_fit(features[i:i + 1], truth[start + i:start + i + 1])
+            features = features[min(stop, calibration_chunks) - start:]
+        if len(features):
+            label, probability = model.classify(features)
+            preds.append(label)
+            probs.append(probability)
+    if not preds:
+        return np.zeros(0, dtype=int), np.zeros(0)
+    return np.concatenate(preds), np.concatenate(probs)
+
+
+def evaluate_recording(path, options):
+    """Evaluates one recording; runs in a worker process."""
+    recording = open_recording(path)
+    if len(recording.labels) == 0:
+        raise ValueError(f"'{path}' has no ground-truth labels to evaluate against.")
+    model, _ = ModelStore(options['cache_dir']).get(recording.fs, recording.chunk_size,
+                                                     channels=recording.channel_names(), backend=options['backend'])
+
+    if options['calibration_chunks']:
+        focused = float(np.mean(recording.labels[:options['calibration_chunks']]))
+        if min(focused, 1 - focused) < CALIBRATION_MIN_SHARE:
+            print(f"⚠️ '{path}': {focused:.0%} of the calibration chunks are focused; calibrating on "
+                  f"mostly one state biases the model toward it.")
+
+    started = time.perf_counter()
+    preds, probs = classify_recording(recording, model, options['calibration_chunks'])
+    truth = np.asarray(recording.labels[:len(preds)], dtype=int)
+    preds = preds[:len(truth)]
+    probs = probs[:len(truth)]
+
+    aggregator = VerdictAggregator(options['window'], options['verdict_mode'])
+    verdict_idx, verdict_labels = [], []
+    for i, (label, probability) in enumerate(zip(preds, probs)):
+        verdict = aggregator.update(label, probability)
+        if verdict is not None:
+            verdict_idx.append(i)
+            verdict_labels.append(verdict.label)
+    elapsed = time.perf_counter() - started
+    verdict_idx = np.array(verdict_idx, dtype=int)
+    verdict_labels = np.array(verdict_labels, dtype=int)
+
+    # A verdict is right when it matches the majority of the true labels it covered
+    window = options['window']
+    csum = np.concatenate([[0], np.cumsum(truth)])
+    first = np.maximum(verdict_idx + 1 - window, 0)
+    window_truth = ((csum[verdict_idx + 1] - csum[first]) > (verdict_idx + 1 - first) / 2).astype(int)
+
+    states = true_states(truth, options['state_smoothing'])
+    latencies = verdict_latencies(states, verdict_idx, verdict_labels)
+    detected = [lat for lat in latencies if lat is not None]
+    chunk_seconds = recording.chunk_size / recording.fs
+
+    return {
+        'path': path,
+        'fs': recording.fs,
+        'chunk_size': recording.chunk_size,
+        'n_channels': recording.n_channels,
+        'model': model.cache_key(),
+        'n_chunks': int(len(truth)),
+        'chunk_accuracy': float(np.mean(preds == truth)) if len(truth) else None,
+        'chunk_confusion': confusion_matrix(truth, preds).tolist(),
+        'brier_score': float(np.mean((probs - truth) ** 2)) if len(truth) else None,
+        'n_verdicts': int(len(verdict_idx)),
+        'window_accuracy': float(np.mean(verdict_labels == window_truth)) if len(verdict_idx) else None,
+        'window_confusion': confusion_matrix(window_truth, verdict_labels).tolist(),
+        'transitions': len(latencies),
+        'transitions_missed': len(latencies) - len(detected),
+        'verdict_latency_seconds': _summary(np.array(detected) * chunk_seconds),
+        'seconds': elapsed,
+        'chunks_per_second': len(truth) / elapsed if elapsed > 0 else None,
+    }
+
+
+def _evaluate_job(job):
+    return evaluate_recording(*job)
+
+
+def summarize(results):
+    """Corpus-wide totals: pooled confusion matrices, accuracies and latencies."""
+    chunk_cm = np.sum([r['chunk_confusion'] for r in results], axis=0)
+    window_cm = np.sum([r['window_confusion'] for r in results], axis=0)
+    latencies = [r['verdict_latency_seconds']['mean'] for r in results if r['verdict_latency_seconds']]
+    n_chunks = sum(r['n_chunks'] for r in results)
+    seconds = sum(r['seconds'] for r in results)
+    return {
+        'recordings': len(results),
+        'n_chunks': n_chunks,
+        'chunk_accuracy': float(np.trace(chunk_cm) / chunk_cm.sum()) if chunk_cm.sum() else None,
+        'chunk_confusion': chunk_cm.tolist(),
+        'window_accuracy': float(np.trace(window_cm) / window_cm.sum()) if window_cm.sum() else None,
+        'window_confusion': window_cm.tolist(),
+        'transitions': sum(r['transitions'] for r in results),
+        'transitions_missed': sum(r['transitions_missed'] for r in results),
+        'mean_verdict_latency_seconds': float(np.mean(latencies)) if latencies else None,
+        'chunks_per_second_per_worker': n_chunks / seconds if seconds > 0 else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recordings headlessly and report accuracy and latency.")
+    parser.add_argument('recordings', nargs='+', help=".npz or .eegrec recordings with ground-truth labels.")
+    parser.add_argument('--out', default=REPORT_FILE, help="JSON report path.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes.")
+    parser.add_argument('--backend', default=DEFAULT_BACKEND, help="Classifier backend of the evaluated model.")
+    parser.add_argument('--window', type=int, default=WINDOW_CHUNKS, help="Verdict window in chunks.")
+    parser.add_argument('--verdict-mode', choices=VERDICT_MODES, default='tumbling')
+    parser.add_argument('--calibration-chunks', type=int, default=0,
+                        help="Adapt a per-recording model online on this many labelled chunks first.")
+    parser.add_argument('--state-smoothing', type=int, default=STATE_SMOOTHING,
+                        help="Chunks smoothed into the true focus state used for transition latency.")
+    parser.add_argument('--cache-dir', default=MODEL_CACHE_DIR)
+    args = parser.parse_args(argv)
+    if args.calibration_chunks and args.backend not in ('linear', 'online'):
+        parser.error(f"--calibration-chunks needs the linear or online backend; '{args.backend}' models cannot adapt online.")
+
+    options = {
+        'backend': args.backend,
+        'window': args.window,
+        'verdict_mode': args.verdict_mode,
+        'calibration_chunks': args.calibration_chunks,
+        'state_smoothing': args.state_smoothing,
+        'cache_dir': args.cache_dir,
+    }
+    # Train (or load) every model once up front, so the workers only read the cache
+    store = ModelStore(args.cache_dir)
+    for key in {(r.fs, r.chunk_size, tuple(r.channel_names() or ()))
+                for r in (open_recording(path) for path in args.recordings)}:
+        store.get(key[0], key[1], channels=list(key[2]) or None, backend=args.backend)
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(_evaluate_job, [(path, options) for path in args.recordings]))
+    wall = time.perf_counter() - started
+
+    for r in results:
+        window = f"{r['window_accuracy']:.3f}" if r['window_accuracy'] is not None else '-'
+        print(f"{r['path']}: chunk accuracy {r['chunk_accuracy']:.3f}, window accuracy {window}, "
+              f"{r['transitions'] - r['transitions_missed']}/{r['transitions']} transitions detected, "
+              f"{r['chunks_per_second']:.0f} chunks/s")
+    summary = summarize(results)
+    summary['wall_seconds'] = wall
+    summary['chunks_per_second'] = summary['n_chunks'] / wall if wall > 0 else None
+    report = {'options': options, 'summary': summary, 'recordings': results}
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"📊 {summary['recordings']} recording(s), chunk accuracy {summary['chunk_accuracy']:.3f}, "
+          f"{summary['chunks_per_second']:.0f} chunks/s overall. Report saved to '{args.out}'.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+import argparse
+import copy
+import hashlib
+import json
+import os
+import pickle
+import time
+import numpy as np
+from classifiers import make_classifier, OnlineLinearClassifier, DEFAULT_BACKEND
+from dsp import StreamingBandpass, SlidingDFT, SlidingBandPower, ChannelFeatures
+from eeg_synth import simulate_eeg_chunks
+
+# --- Model Cache ---
+MODEL_VERSION = 6  # Bump whenever training or feature code changes in a way the config does not capture
+MODEL_CACHE_DIR = os.environ.get('FOCUS_MODEL_CACHE', 'model_cache')
+MODEL_MAX_AGE = 7 * 24 * 3600  # Seconds after which a cached model is retrained in the background
+WINDOW_SECONDS = float(os.environ.get('FOCUS_SPECTRAL_WINDOW', '2'))  # Band-power analysis window (rounded to chunks)
+TRAINING_PARAMS = {'n_per_class': 150, 'generator': 'eeg_synth'}  # Windows per class, from simulate_eeg_chunks
+
+
+class FocusModel:
+    """
+    Band-power feature extraction plus a classifier backend (see classifiers.py).
+
+    Band powers describe the newest `window_seconds` of the stream (at least one chunk),
+    long enough to resolve the delta and theta bands; live streams update them chunk by
+    chunk with a SlidingBandPower, and training uses whole windows.
+
+    With `channels` the model expects (n_channels, chunk_size) chunks and classifies
+    per-channel band powers, band ratios and hemispheric asymmetries (ChannelFeatures);
+    without it, single-channel chunks and their band powers. The model holds no
+    per-stream state (the streaming filter state lives in each monitor), so a single
+    trained instance can be shared by any number of sessions and used concurrently
+    from worker threads.
+    """
+    def __init__(self, fs, chunk_size, lowcut=1.0, highcut=40.0, order=4, channels=None, backend=DEFAULT_BACKEND,
+                 window_seconds=WINDOW_SECONDS):
+        self.fs = fs
+        self.chunk_size = chunk_size
+        self.channels = list(channels) if channels is not None else None
+        self.filter_params = {'lowcut': lowcut, 'highcut': highcut, 'order': order}
+        self.spectrum = SlidingDFT(fs, chunk_size, max(1, round(window_seconds * fs / chunk_size)))
+        self.window_size = self.spectrum.window_size
+        self.band_power = self.spectrum.extractor  # Offline band powers of whole (..., window_size) windows
+        self.features = ChannelFeatures(self.band_power.band_names, self.channels)
+        self._offline_filter = self.make_filter()
+
+        # --- ML Model ---
+        self.backend = backend
+        self.classifier = make_classifier(backend)
+
+    def config(self):
+        """Everything that determines the trained model; its hash is the cache key."""
+        return {
+            'version': MODEL_VERSION,
+            'fs': self.fs,
+            'chunk_size': self.chunk_size,
+            'filter': self.filter_params,
+            'window_size': self.window_size,
+            'bands': self.band_power.bands,
+            'channels': self.channels,
+            'features': self.features.names,
+            'classifier': self.classifier.config(),
+            'training': TRAINING_PARAMS,
+        }
+
+    def cache_key(self):
+        encoded = json.dumps(self.config(), sort_keys=True).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()[:16]
+
+    def make_filter(self):
+        """A fresh streaming band-pass with this model's design, for one live stream."""
+        return StreamingBandpass(self.fs, **self.filter_params)
+
+    def make_band_power(self):
+        """A fresh sliding-window band-power estimator, for one live stream."""
+        return SlidingBandPower(self.spectrum)
+
+    @property
+    def n_channels(self):
+        return 1 if self.channels is None else len(self.channels)
+
+    def extract_features_batch(self, windows):
+        """Features for independent (n, [n_channels,] window_size) windows, filtered offline (zero-phase)."""
+        filtered = self._offline_filter.offline(np.asarray(windows, dtype=float))
+        return self.features(self.band_power.band_powers(filtered))
+
+    def train(self):
+        """Trains a baseline classifier on temporary synthetic data from the EEG generator."""
+        print("Training baseline model...")
+        focus = np.repeat([True, False], TRAINING_PARAMS['n_per_class'])
+        # Each window is stitched from chunk-sized pieces, as the generator writes recordings, so
+        # the training windows carry the same delta/theta content the streamed windows resolve
+        n_chunks = self.spectrum.window_chunks
+        chunks = simulate_eeg_chunks(np.repeat(focus, n_chunks), np.random.default_rng(), self.fs,
+                                     self.chunk_size, None if self.channels is None else self.n_channels)
+        windows = np.moveaxis(chunks.reshape((len(focus), n_chunks) + chunks.shape[1:]), 1, -2)
+        windows = windows.reshape(windows.shape[:-2] + (self.window_size,))
+        return self._fit(self.extract_features_batch(windows), focus.astype(int))
+
+    def _fit(self, X_train, y_train):
+        self.classifier.fit(X_train, y_train)
+        print("✅ Model trained successfully.")
+        return self
+
+    def predict(self, features):
+        """Predicted labels for a (n_samples, n_features) batch (a single vector is accepted too)."""
+        return self.classifier.predict(np.atleast_2d(features))
+
+    def predict_proba(self, features):
+        """Probability of the focused class (label 1) for each row of the batch."""
+        return self.classifier.predict_proba(np.atleast_2d(features))
+
+    def classify(self, features):
+        """(labels, focus probabilities) for a batch, from a single pass through the classifier."""
+        features = np.asarray(features)
+        return self.classifier.classify(features[np.newaxis] if features.ndim == 1 else features)
+
+    def adaptive_copy(self):
+        """
+        A per-subject copy whose classifier keeps learning (OnlineLinearClassifier, warm-started
+        from this model's). Feature extraction objects are shared; only the classifier is new.
+        """
+        model = copy.copy(self)
+        if isinstance(self.classifier, OnlineLinearClassifier):
+            model.classifier = copy.deepcopy(self.classifier)
+        else:
+            model.classifier = OnlineLinearClassifier.from_classifier(self.classifier)
+        return model
+
+    def partial_fit(self, features, labels):
+        """Online update from labelled features; only models from adaptive_copy() support it."""
+        self.classifier.partial_fit(np.atleast_2d(features), labels)
+
+
+class ModelStore:
+    """
+    Persists trained models on disk, keyed by a hash of their configuration.
+
+    A cached model loads in milliseconds. An artifact built against other library
+    versions (e.g. scikit-learn, for that backend) or older than MODEL_MAX_AGE is still
+    served, but reported as stale so the caller can retrain it in the background. Writers
+    replace artifacts atomically, so a running server can poll `artifact_mtime` and
+    hot-swap whenever a new one appears.
+    """
+    def __init__(self, cache_dir=MODEL_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, f'focus_model_{key}')
+        return base + '.pkl', base + '.json'
+
+    def artifact_mtime(self, key):
+        model_path, _ = self._paths(key)
+        return os.path.getmtime(model_path) if os.path.exists(model_path) else None
+
+    def load(self, key):
+        """Returns (model, is_stale), or (None, True) when nothing is cached for this key."""
+        model_path, meta_path = self._paths(key)
+        if not os.path.exists(model_path):
+            return None, True
+        with open(model_path, 'rb') as f:
+            model = pickle.load(f)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        stale = (meta.get('runtime') != model.classifier.runtime()
+                 or time.time() - meta.get('trained_at', 0) > MODEL_MAX_AGE)
+        return model, stale
+
+    def save(self, model):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        model_path, meta_path = self._paths(model.cache_key())
+        meta = {'config': model.config(), 'runtime': model.classifier.runtime(), 'trained_at': time.time()}
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f, indent=2)
+        with open(model_path + '.tmp', 'wb') as f:
+            pickle.dump(model, f)
+        os.replace(meta_path + '.tmp', meta_path)
+        os.replace(model_path + '.tmp', model_path)  # Last, so watchers see a complete artifact
+
+    def train(self, fs, chunk_size, **params):
+        """Trains a fresh model and stores it; `params` are FocusModel's filter and channel options."""
+        model = FocusModel(fs, chunk_size, **params).train()
+        self.save(model)
+        return model
+
+    def get(self, fs, chunk_size, **params):
+        """
+        Returns (model, is_stale): the cached model when there is one, otherwise a freshly
+        trained and saved model (which is never stale).
+        """
+        key = FocusModel(fs, chunk_size, **params).cache_key()
+        try:
+            model, stale = self.load(key)
+        except (OSError, ValueError, pickle.UnpicklingError, AttributeError, ImportError) as e:
+            print(f"⚠️ Ignoring unreadable cached model {key}: {e}")
+            model, stale = None, True
+        if model is not None:
+            print(f"✅ Loaded cached model {key}{' (stale)' if stale else ''}.")
+            return model, stale
+        return self.train(fs, chunk_size, **params), False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train and cache the focus model ahead of time.")
+    parser.add_argument('--fs', type=int, required=True, help="Sampling frequency of the stream.")
+    parser.add_argument('--chunk-size', type=int, default=200)
+    parser.add_argument('--channels', default=None,
+                        help="Comma-separated channel names for a multi-channel model, e.g. Fp1,Fp2,F3,F4.")
+    parser.add_argument('--backend', default=DEFAULT_BACKEND, help="Classifier backend: 'linear' or 'sklearn'.")
+    parser.add_argument('--window-seconds', type=float, default=WINDOW_SECONDS,
+                        help="Band-power analysis window, as FOCUS_SPECTRAL_WINDOW for the server.")
+    parser.add_argument('--cache-dir', default=MODEL_CACHE_DIR)
+    args = parser.parse_args(argv)
+    channels = args.channels.split(',') if args.channels else None
+    model = ModelStore(args.cache_dir).train(args.fs, args.chunk_size, channels=channels, backend=args.backend,
+                                             window_seconds=args.window_seconds)
+    print(f"💾 Cached model {model.cache_key()} in '{args.cache_dir}'. Running servers pick it up automatically.")
+
+
+if __name__ == '__main__':
+    # Go through the importable module so pickles reference focus_model.FocusModel, not __main__
+    import focus_model
+    focus_model.main()
@@ -0,0 +1,605 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+import numpy as np
+import websockets
+from protocol import HEADER, FRAME_CHUNK, FRAME_SNAPSHOT, FRAME_DISPLAY, FRAME_SUMMARY
+from run_info import git_revision, machine_info
+
+# --- Load Test ---
+# Starts server.py (or targets one that is already running) and ramps a swarm of dashboard
+# clients, spread over several client processes, up through increasing levels. At every
+# level it measures for a while:
+#   latency  arrival time of each frame minus the server timestamp in its header
+#   loss     ticks missing from the sequence numbers (chunks, for raw subscribers): frames
+#            the server dropped, and updates lost when a late tick merged several
+#   server   CPU and RSS of the server's process tree, and its own tick and drop counters
+# The first level that misses the latency or loss limits is the saturation point and the
+# level below it the capacity. Deliberately slow consumers are reported on their own: the
+# server is expected to drop their frames and disconnect them without slowing the rest.
+# Reports are stored per commit, like benchmark.py's, and compared the same way.
+LEVELS = (50, 100, 250, 500, 1000, 2000)  # Total clients at each step of the ramp
+QUICK_LEVELS = (20, 50, 100)
+DEFAULT_MIX = 'summary=6,raw=2,display=1,summary@2=1'  # <streams joined by +>[@<frames/s>]=<weight>
+SETTLE_SECONDS = 3.0  # After a level's clients connected, before measuring
+MEASURE_SECONDS = 10.0
+MAX_P99_MS = 250.0  # Saturated once the 99th percentile latency of the normal clients exceeds this
+MAX_LOSS = 0.01  # ... or they miss more than this fraction of the ticks
+CONNECT_RATE = 200  # New connections per second and client process
+CONNECT_TIMEOUT = 30.0
+SLOW_DELAY = 0.5  # Seconds a slow consumer spends on every frame
+CLIENT_PROCESSES = max(1, min(8, (os.cpu_count() or 2) // 2))
+TICK_INTERVAL = 0.1  # As in server.py; throttled subscribers expect a frame every round(1 / (rate * TICK_INTERVAL)) ticks
+SERVER_PORT = 8790  # Port of the server the tool starts, away from a development server on 8765
+READY_TIMEOUT = 300.0  # Seconds the server may take to warm up (training a missing model)
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server.py')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'loadtest_results')
+REGRESSION_THRESHOLD = 1.10  # compare: a p99 latency higher by more than 10% is reported as a regression
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def parse_mix(spec):
+    """'summary=6,raw+display@2=1' -> [(name, streams, rate or None, weight), ...]."""
+    profiles = []
+    for part in spec.split(','):
+        name, _, weight = part.strip().partition('=')
+        streams, _, rate = name.partition('@')
+        profiles.append((name, streams.split('+'), float(rate) if rate else None, float(weight or 1)))
+    if not profiles or sum(p[3] for p in profiles) <= 0:
+        raise ValueError(f"Subscription mix '{spec}' has no weight.")
+    return profiles
+
+
+def client_specs(n, profiles, sessions, slow_fraction, seed=0):
+    """The first n clients of the ramp: (session, profile name, streams, rate, slow), the same for every run."""
+    rng = np.random.default_rng(seed)
+    weights = np.array([p[3] for p in profiles])
+    picks = rng.choice(len(profiles), size=n, p=weights / weights.sum())
+    slow = rng.random(n) < slow_fraction
+    return [(f'load-{i % sessions}', profiles[k][0], profiles[k][1], profiles[k][2], bool(s))
+            for i, (k, s) in enumerate(zip(picks, slow))]
+
+
+# --- Client Processes ---
+class GroupStats:
+    """What the clients of one group (profile, slow or not) received while measuring."""
+    def __init__(self):
+        self.clients = 0
+        self.frames = 0
+        self.bytes = 0
+        self.latencies = []  # ms
+        self.received_ticks = 0
+        self.missing_ticks = 0
+        self.disconnects = 0
+
+    def as_dict(self):
+        return {'clients': self.clients, 'frames': self.frames, 'bytes': self.bytes,
+                'latencies': np.array(self.latencies, dtype=np.float32), 'received_ticks': self.received_ticks,
+                'missing_ticks': self.missing_ticks, 'disconnects': self.disconnects}
+
+
+class Swarm:
+    """One client process's dashboard clients and their statistics."""
+    def __init__(self, url):
+        self.url = url
+        self.groups = {}
+        self.measuring = False
+        self.tasks = set()
+        self.connect_failures = 0
+
+    def group(self, name):
+        return self.groups.setdefault(name, GroupStats())
+
+    def reset(self):
+        """Starts a measurement: counts restart, and only clients still connected are counted."""
+        for group in self.groups.values():
+            clients = group.clients
+            group.__init__()
+            group.clients = clients
+        self.measuring = True
+
+    async def add(self, specs):
+        """Connects the clients at CONNECT_RATE; returns once each has its hello or failed."""
+        ready = []
+        for spec in specs:
+            future = asyncio.get_running_loop().create_future()
+            task = asyncio.create_task(self.client(spec, future))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+            ready.append(future)
+            await asyncio.sleep(1 / CONNECT_RATE)
+        done, pending = await asyncio.wait(ready, timeout=CONNECT_TIMEOUT)
+        self.connect_failures += len(pending) + sum(1 for f in done if not f.result())
+        for future in pending:
+            future.cancel()
+
+    async def client(self, spec, ready):
+        session, name, streams, rate, slow = spec
+        group = self.group(f'{name} (slow)' if slow else name)
+        url = f'{self.url}/?session={session}&streams={",".join(streams)}' + (f'&rate={rate:g}' if rate else '')
+        primary = next(kind for level, kind in (('raw', FRAME_CHUNK), ('summary', FRAME_SUMMARY),
+                                                ('display', FRAME_DISPLAY)) if level in streams)
+        step = 1 if rate is None else max(1, min(round(1 / (rate * TICK_INTERVAL)), 50))
+        connected = False
+        try:
+            async with websockets.connect(url, max_size=None, open_timeout=CONNECT_TIMEOUT) as websocket:
+                chunk_size = json.loads(await websocket.recv())['chunk_size']
+                connected = True
+                group.clients += 1
+                if not ready.done():
+                    ready.set_result(True)
+                last_seq = None
+                async for message in websocket:
+                    received_at = time.time()
+                    _, _, kind, _, seq, timestamp, n_samples, _ = HEADER.unpack_from(message)
+                    if kind == FRAME_SNAPSHOT:
+                        last_seq = seq
+                        continue
+                    if self.measuring:
+                        group.frames += 1
+                        group.bytes += len(message)
+                        group.latencies.append((received_at - timestamp) * 1000)
+                    if kind == primary:
+                        ticks = n_samples // chunk_size if kind == FRAME_CHUNK else step
+                        if last_seq is not None and self.measuring:
+                            group.received_ticks += ticks
+                            group.missing_ticks += max(0, (seq - last_seq) - ticks)
+                        last_seq = seq
+                    if slow:
+                        await asyncio.sleep(SLOW_DELAY)
+        except asyncio.CancelledError:
+            raise
+        except (OSError, asyncio.TimeoutError, websockets.WebSocketException, KeyError, ValueError):
+            pass
+        finally:
+            if connected:
+                group.clients -= 1
+                if self.measuring:
+                    group.disconnects += 1
+            if not ready.done():
+                ready.set_result(False)
+
+    def report(self, cpu_seconds, wall_seconds):
+        self.measuring = False
+        return {'groups': {name: group.as_dict() for name, group in self.groups.items()},
+                'connect_failures': self.connect_failures, 'cpu_percent': 100 * cpu_seconds / wall_seconds}
+
+    async def close(self):
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+async def _client_process(url, connection):
+    """Serves the controller's commands: ('add', specs), ('measure',), ('report',), ('stop',)."""
+    swarm = Swarm(url)
+    commands = asyncio.Queue()
+
+    def receive():
+        while connection.poll():
+            commands.put_nowait(connection.recv())
+    asyncio.get_running_loop().add_reader(connection.fileno(), receive)
+    measure_started = None
+    while True:
+        command = await commands.get()
+        if command[0] == 'add':
+            await swarm.add(command[1])
+            connection.send(('added',))
+        elif command[0] == 'measure':
+            swarm.reset()
+            measure_started = (time.process_time(), time.monotonic())
+        elif command[0] == 'report':
+            cpu, wall = time.process_time() - measure_started[0], time.monotonic() - measure_started[1]
+            connection.send(('report', swarm.report(cpu, wall)))
+        else:
+            await swarm.close()
+            return
+
+def run_client_process(url, connection):
+    try:
+        asyncio.run(_client_process(url, connection))
+    except KeyboardInterrupt:
+        pass
+
+
+class ClientSwarm:
+    """The controller's side of the client processes; new clients are dealt out round-robin."""
+    def __init__(self, url, n_processes=CLIENT_PROCESSES):
+        context = multiprocessing.get_context('spawn')
+        self.connections, self.processes = [], []
+        for index in range(n_processes):
+            connection, child = context.Pipe()
+            process = context.Process(target=run_client_process, args=(url, child), name=f'loadtest-clients-{index}',
+                                      daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    def _broadcast(self, message, reply=None):
+        for connection in self.connections:
+            connection.send(message)
+        return [connection.recv() for connection in self.connections] if reply else None
+
+    def add(self, specs):
+        for index, connection in enumerate(self.connections):
+            connection.send(('add', specs[index::len(self.connections)]))
+        for connection in self.connections:
+            connection.recv()
+
+    def measure(self):
+        self._broadcast(('measure',))
+
+    def report(self):
+        """Statistics of all client processes, merged per group."""
+        reports = [reply[1] for reply in self._broadcast(('report',), reply=True)]
+        groups = {}
+        for report in reports:
+            for name, stats in report['groups'].items():
+                merged = groups.setdefault(name, {k: [] if k == 'latencies' else 0 for k in stats})
+                for key, value in stats.items():
+                    if key == 'latencies':
+                        merged[key].append(value)
+                    else:
+                        merged[key] += value
+        for merged in groups.values():
+            merged['latencies'] = np.concatenate(merged['latencies'])
+        return {'groups': groups, 'connect_failures': sum(r['connect_failures'] for r in reports),
+                'cpu_percent': max(r['cpu_percent'] for r in reports)}
+
+    def close(self):
+        for connection in self.connections:
+            try:
+                connection.send(('stop',))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+
+
+# --- Server Under Test ---
+def process_tree_usage(pid):
+    """(CPU seconds, resident bytes) of a process and its descendants from Linux /proc, or None elsewhere."""
+    try:
+        pids, i = [pid], 0
+        while i < len(pids):
+            for task in os.listdir(f'/proc/{pids[i]}/task'):
+                try:
+                    with open(f'/proc/{pids[i]}/task/{task}/children') as f:
+                        pids.extend(int(child) for child in f.read().split())
+                except OSError:
+                    pass  # Kernels without CONFIG_PROC_CHILDREN: the root process only
+            i += 1
+        cpu = rss = 0
+        for p in pids:
+            with open(f'/proc/{p}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            cpu += (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')  # utime + stime
+            with open(f'/proc/{p}/statm') as f:
+                rss += int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        return cpu, rss
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def scrape_metrics(url):
+    """Prometheus text from the server's /metrics, as {metric name: value summed over its labels}."""
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            text = response.read().decode('utf-8')
+    except (OSError, urllib.error.URLError):
+        return {}
+    values = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        name, _, value = line.rpartition(' ')
+        name = name.split('{', 1)[0]
+        try:
+            values[name] = values.get(name, 0.0) + float(value)
+        except ValueError:
+            pass
+    return values
+
+
+class ServerProcess:
+    """server.py in a subprocess with the load test's source, port and worker settings."""
+    def __init__(self, source, port=SERVER_PORT, workers=0, record=False, workdir='.'):
+        env = dict(os.environ, FOCUS_PORT=str(port), FOCUS_WORKERS=str(workers))
+        if source == 'synthetic':
+            env['FOCUS_SOURCE'] = 'synthetic'
+        else:
+            env.update(FOCUS_SOURCE='file', FOCUS_DATA_FILE=os.path.abspath(source))
+            env.pop('FOCUS_REPLAY', None)
+        env['FOCUS_SESSION_LOG_DIR'] = (os.environ.get('FOCUS_SESSION_LOG_DIR') or 'session_logs') if record else ''
+        self.http_port = port + 1 if workers else port  # With workers, the pipeline process serves the metrics
+        self.url = f'ws://localhost:{port}'
+        self.log = tempfile.TemporaryFile(mode='w+')
+        self.process = subprocess.Popen([sys.executable, SERVER_SCRIPT], cwd=workdir, env=env,
+                                        stdout=self.log, stderr=subprocess.STDOUT)
+
+    def http(self, path):
+        return f'http://localhost:{self.http_port}{path}'
+
+    def wait_ready(self, timeout=READY_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"server.py exited with code {self.process.returncode}:\n{self.output()}")
+            try:
+                with urllib.request.urlopen(self.http('/status'), timeout=2):
+                    return
+            except (OSError, urllib.error.URLError):
+                time.sleep(0.5)
+        raise RuntimeError(f"server.py was not ready after {timeout:.0f} s:\n{self.output()}")
+
+    def usage(self):
+        return process_tree_usage(self.process.pid)
+
+    def output(self, lines=20):
+        self.log.seek(0)
+        return ''.join(self.log.readlines()[-lines:])
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.send_signal(signal.SIGINT)
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.log.close()
+
+
+class RunningServer:
+    """A server started elsewhere (--url): no process to measure, only its metrics."""
+    def __init__(self, url, http_port=None):
+        self.url = url.rstrip('/')
+        host = self.url.split('://', 1)[-1]
+        self.http_base = f'http://{host}' if http_port is None else f'http://{host.rsplit(":", 1)[0]}:{http_port}'
+
+    def http(self, path):
+        return self.http_base + path
+
+    def wait_ready(self):
+        pass
+
+    def usage(self):
+        return None
+
+    def stop(self):
+        pass
+
+
+# --- Ramp ---
+def _latency_summary(latencies):
+    if len(latencies) == 0:
+        return None
+    summary = {f'p{p:g}': float(np.percentile(latencies, p)) for p in PERCENTILES}
+    summary['max'] = float(latencies.max())
+    return summary
+
+
+def summarize_level(n_clients, seconds, clients, usage, metrics, options):
+    """One level of the report, with the verdict on whether the server kept up."""
+    groups = {}
+    for name, stats in sorted(clients['groups'].items()):
+        ticks = stats['received_ticks'] + stats['missing_ticks']
+        groups[name] = {'clients': stats['clients'], 'frames_per_second': stats['frames'] / seconds,
+                        'megabytes_per_second': stats['bytes'] / seconds / 1e6,
+                        'latency_ms': _latency_summary(stats['latencies']),
+                        'missing_ticks': stats['missing_ticks'], 'loss': stats['missing_ticks'] / ticks if ticks else 0.0,
+                        'disconnects': stats['disconnects']}
+    normal = [stats for name, stats in clients['groups'].items() if not name.endswith('(slow)')]
+    latencies = np.concatenate([s['latencies'] for s in normal]) if normal else np.zeros(0)
+    ticks = sum(s['received_ticks'] + s['missing_ticks'] for s in normal)
+    level = {
+        'clients': n_clients,
+        'connected': sum(g['clients'] for g in groups.values()),
+        'connect_failures': clients['connect_failures'],
+        'seconds': seconds,
+        'latency_ms': _latency_summary(latencies),
+        'loss': sum(s['missing_ticks'] for s in normal) / ticks if ticks else 0.0,
+        'disconnects': sum(s['disconnects'] for s in normal),
+        'groups': groups,
+        'server': {key: metrics.get(name) for key, name in (
+            ('tick_overruns', 'focus_tick_overruns_total'), ('ticks_skipped', 'focus_ticks_skipped_total'),
+            ('dropped_frames', 'focus_client_dropped_frames_total'))},
+        'client_cpu_percent': clients['cpu_percent'],
+    }
+    tick_count = metrics.get('focus_tick_seconds_count')
+    level['server']['mean_tick_ms'] = 1000 * metrics.get('focus_tick_seconds_sum', 0.0) / tick_count if tick_count else None
+    if usage is not None:
+        level['server'].update(cpu_percent=100 * usage[0] / seconds, rss_mb=usage[1] / 2**20)
+    reasons = []
+    p99 = level['latency_ms'] and level['latency_ms']['p99']
+    if p99 is None or p99 > options.max_p99_ms:
+        reasons.append('no frames' if p99 is None else f'p99 latency {p99:.0f} ms > {options.max_p99_ms:g} ms')
+    if level['loss'] > options.max_loss:
+        reasons.append(f"loss {level['loss']:.2%} > {options.max_loss:.2%}")
+    if level['connect_failures']:
+        reasons.append(f"{level['connect_failures']} failed connections")
+    if level['disconnects']:
+        reasons.append(f"{level['disconnects']} normal clients disconnected")
+    if level['server']['ticks_skipped']:
+        reasons.append(f"{level['server']['ticks_skipped']:.0f} ticks skipped")
+    level['saturated'] = bool(reasons)
+    level['reasons'] = reasons
+    return level
+
+
+def _delta(after, before):
+    return {key: value - before.get(key, 0.0) for key, value in after.items()}
+
+
+def print_level(level):
+    latency = level['latency_ms'] or {}
+    server = level['server']
+    cpu = server.get('cpu_percent')
+    rss = server.get('rss_mb')
+    print(f"{level['clients']:>7} {level['connected']:>7} "
+          f"{latency.get('p50', float('nan')):>8.1f} {latency.get('p99', float('nan')):>8.1f} "
+          f"{latency.get('max', float('nan')):>8.1f} {level['loss']:>7.2%} "
+          f"{'-' if cpu is None else f'{cpu:.0f}%':>7} {'-' if rss is None else f'{rss:.0f}':>7} "
+          f"{server['dropped_frames'] or 0:>8.0f} {server['ticks_skipped'] or 0:>7.0f} "
+          f"{level['client_cpu_percent']:>6.0f}%  {'SATURATED: ' + '; '.join(level['reasons']) if level['saturated'] else 'ok'}")
+
+
+def ramp(server, options):
+    """Connects clients level by level and measures each; stops after the first saturated level."""
+    profiles = parse_mix(options.mix)
+    specs = client_specs(max(options.levels), profiles, options.sessions, options.slow)
+    swarm = ClientSwarm(server.url, options.client_processes)
+    levels = []
+    connected = 0
+    print(f"{'clients':>7} {'conn':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'loss':>7} {'cpu':>7} "
+          f"{'rss MB':>7} {'dropped':>8} {'skipped':>7} {'gen':>7}")
+    try:
+        for n_clients in options.levels:
+            swarm.add(specs[connected:n_clients])
+            connected = n_clients
+            time.sleep(options.settle)
+            metrics_before, usage_before = scrape_metrics(server.http('/metrics')), server.usage()
+            swarm.measure()
+            started = time.monotonic()
+            time.sleep(options.duration)
+            clients = swarm.report()
+            seconds = time.monotonic() - started
+            usage_after = server.usage()
+            usage = None if usage_before is None or usage_after is None else (
+                usage_after[0] - usage_before[0], usage_after[1])
+            metrics = _delta(scrape_metrics(server.http('/metrics')), metrics_before)
+            level = summarize_level(n_clients, seconds, clients, usage, metrics, options)
+            levels.append(level)
+            print_level(level)
+            if level['client_cpu_percent'] > 90:
+                print(f"⚠️ A client process used {level['client_cpu_percent']:.0f}% of a core; the load generator "
+                      f"may be the bottleneck (raise --client-processes).")
+            if level['saturated'] and not options.all_levels:
+                break
+    finally:
+        swarm.close()
+    return levels
+
+
+def capacity(levels):
+    """(Largest level that kept up, first saturated level), either None."""
+    ok = [level['clients'] for level in levels if not level['saturated']]
+    saturated = [level['clients'] for level in levels if level['saturated']]
+    return (max(ok) if ok else None), (min(saturated) if saturated else None)
+
+
+def compare(old_path, new_path, threshold=REGRESSION_THRESHOLD):
+    """Prints capacity and the p99 latency at every common level; returns the regressions."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old['commit']} -> {new['commit']}")
+    regressions = []
+    if old['config'] != new['config']:
+        print("⚠️ The two runs used different configurations; the numbers may not be comparable.")
+    print(f"capacity {old['capacity']} -> {new['capacity']} clients")
+    if (old['capacity'] or 0) > (new['capacity'] or 0):
+        regressions.append(('capacity', old['capacity'], new['capacity']))
+    baseline = {level['clients']: level for level in old['levels']}
+    for level in new['levels']:
+        before = baseline.get(level['clients'])
+        if before is None or not before['latency_ms'] or not level['latency_ms']:
+            continue
+        ratio = level['latency_ms']['p99'] / before['latency_ms']['p99']
+        flag = ' REGRESSION' if ratio > threshold else (' faster' if ratio < 1 / threshold else '')
+        print(f"{level['clients']:>7} clients  p99 {before['latency_ms']['p99']:>8.1f} -> "
+              f"{level['latency_ms']['p99']:>8.1f} ms ({ratio:.2f}x)  loss {before['loss']:.2%} -> "
+              f"{level['loss']:.2%}{flag}")
+        if ratio > threshold:
+            regressions.append(('p99', level['clients'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in ('run', 'compare', '-h', '--help'):
+        argv = ['run'] + argv
+    parser = argparse.ArgumentParser(description="Ramp a swarm of dashboard clients against server.py and find "
+                                                 "where it saturates.")
+    sub = parser.add_subparsers(dest='command')
+    run_parser = sub.add_parser('run', help="Run the load test (the default command).")
+    run_parser.add_argument('--levels', type=lambda s: sorted(int(n) for n in s.split(',')), default=list(LEVELS),
+                            help="Comma-separated total clients per step.")
+    run_parser.add_argument('--quick', action='store_true', help="A short ramp with shorter measurements.")
+    run_parser.add_argument('--mix', default=DEFAULT_MIX, help="Subscription mix, e.g. 'summary=6,raw=2,summary@2=1'.")
+    run_parser.add_argument('--sessions', type=int, default=1, help="Sessions the clients are spread over.")
+    run_parser.add_argument('--slow', type=float, default=0.0, help="Fraction of deliberately slow consumers.")
+    run_parser.add_argument('--settle', type=float, default=SETTLE_SECONDS)
+    run_parser.add_argument('--duration', type=float, default=MEASURE_SECONDS, help="Seconds measured per level.")
+    run_parser.add_argument('--max-p99-ms', type=float, default=MAX_P99_MS)
+    run_parser.add_argument('--max-loss', type=float, default=MAX_LOSS)
+    run_parser.add_argument('--all-levels', action='store_true', help="Keep ramping past the saturation point.")
+    run_parser.add_argument('--client-processes', type=int, default=CLIENT_PROCESSES)
+    run_parser.add_argument('--source', default='synthetic', help="'synthetic' or an .npz/.eegrec recording.")
+    run_parser.add_argument('--workers', type=int, default=0, help="FOCUS_WORKERS of the started server.")
+    run_parser.add_argument('--port', type=int, default=SERVER_PORT)
+    run_parser.add_argument('--record', action='store_true',
+                            help="Let the server write session logs (to $FOCUS_SESSION_LOG_DIR or session_logs).")
+    run_parser.add_argument('--workdir', default='.', help="Working directory of the server (its model cache).")
+    run_parser.add_argument('--url', help="Load an already running server instead (same host: latencies use its clock).")
+    run_parser.add_argument('--metrics-port', type=int, help="With --url: the port serving its /metrics.")
+    run_parser.add_argument('--results-dir', default=RESULTS_DIR)
+    compare_parser = sub.add_parser('compare', help="Compare two reports, e.g. two commits.")
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if args.command == 'compare':
+        regressions = compare(args.old, args.new, args.threshold)
+        raise SystemExit(1 if regressions else 0)
+
+    if args.quick:
+        args.levels = list(QUICK_LEVELS) if args.levels == list(LEVELS) else args.levels
+        args.settle, args.duration = min(args.settle, 2.0), min(args.duration, 5.0)
+    if args.url:
+        server = RunningServer(args.url, args.metrics_port)
+    else:
+        if args.source != 'synthetic' and not os.path.exists(args.source):
+            raise SystemExit(f"ERROR: recording '{args.source}' not found.")
+        server = ServerProcess(args.source, args.port, args.workers, args.record, args.workdir)
+    try:
+        print(f"Waiting for the server at {server.url}...")
+        server.wait_ready()
+        levels = ramp(server, args)
+    finally:
+        server.stop()
+
+    ok, saturated = capacity(levels)
+    if saturated is None:
+        print(f"📈 Capacity: at least {ok} clients (not saturated; raise --levels).")
+    else:
+        print(f"📈 Capacity: {ok or 0} clients; saturated at {saturated}.")
+
+    revision = git_revision()
+    config = {key: getattr(args, key) for key in ('levels', 'mix', 'sessions', 'slow', 'settle', 'duration',
+                                                  'max_p99_ms', 'max_loss', 'source', 'workers', 'url')}
+    report = {'commit': revision, 'timestamp': time.time(), 'machine': machine_info(), 'config': config,
+              'capacity': ok, 'saturated_at': saturated, 'levels': levels}
+    os.makedirs(args.results_dir, exist_ok=True)
+    path = os.path.join(args.results_dir, f'{revision}.json')
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Report for {revision} saved to '{path}'.")
+
+
+if __name__ == '__main__':
+    main()
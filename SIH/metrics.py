@@ -0,0 +1,135 @@
+import math
+import os
+import sys
+from bisect import bisect_left
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# --- Metrics ---
+# A minimal Prometheus text-format registry for the server's hot path. Histograms have
+# fixed buckets and are updated with one bisect and two additions; everything that is
+# already tracked elsewhere (overrun counts, queue depths, memory) is read through a
+# callback only when the endpoint is scraped, so it costs nothing per tick.
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (25e-6, 50e-6, 100e-6, 250e-6, 500e-6, 1e-3, 2.5e-3, 5e-3, 10e-3, 25e-3, 50e-3, 100e-3,
+                   250e-3, 500e-3, 1.0, 2.5)
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in labels.values())
+    return '{' + ','.join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + '}'
+
+
+def _number(value):
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram, optionally split by the values of one label (e.g. stage).
+    Not thread-safe: observe from the event loop thread only.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, label=None):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.label = label
+        self._series = {}  # label value -> [bucket counts..., +Inf count], [sum]
+
+    def observe(self, value, label_value=None):
+        series = self._series.get(label_value)
+        if series is None:
+            series = self._series[label_value] = ([0] * (len(self.buckets) + 1), [0.0])
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    def samples(self):
+        for label_value, (counts, total) in sorted(self._series.items(), key=lambda item: str(item[0])):
+            labels = {self.label: label_value} if self.label else {}
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                yield f'{self.name}_bucket', dict(labels, le=le), cumulative
+            yield f'{self.name}_sum', labels, total[0]
+            yield f'{self.name}_count', labels, cumulative
+
+
+class CallbackMetric:
+    """A gauge or counter read at scrape time; `fn` returns a number or (labels, value) pairs."""
+    def __init__(self, name, help, fn, kind='gauge'):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.kind = kind
+
+    def samples(self):
+        value = self.fn()
+        if isinstance(value, (int, float)):
+            yield self.name, {}, value
+            return
+        for labels, v in value:
+            yield self.name, labels, v
+
+
+class MetricsRegistry:
+    """
+    Holds the server's metrics and decides which ticks are timed: with `sample_every`
+    N, one tick in N is timed (0 turns timing off; counters and gauges stay exact).
+    """
+    def __init__(self, sample_every=10):
+        self.sample_every = sample_every
+        self.metrics = []
+        self._ticks = 0
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS, label=None):
+        metric = Histogram(name, help, buckets, label)
+        self.metrics.append(metric)
+        return metric
+
+    def callback(self, name, help, fn, kind='gauge'):
+        metric = CallbackMetric(name, help, fn, kind)
+        self.metrics.append(metric)
+        return metric
+
+    def sample(self):
+        """True for the ticks whose stages should be timed."""
+        if not self.sample_every:
+            return False
+        self._ticks += 1
+        return self._ticks % self.sample_every == 0
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def resident_memory_bytes():
+    """Current resident set size (Linux /proc), or the peak RSS where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return peak_memory_bytes()
+
+
+def peak_memory_bytes():
+    if resource is None:
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # bytes on macOS, KiB on Linux
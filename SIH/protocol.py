@@ -0,0 +1,165 @@
+import json
+import struct
+import numpy as np
+
+# --- Wire Protocol ---
+# Every connection starts with one JSON text "hello" message that carries the
+# static stream description (sampling rate, chunk size, buffer length and the
+# plotting time axis, for raw subscribers; a client that subscribes to raw later
+# gets a second hello). Otherwise the server only sends binary frames:
+#
+#   offset  size  field
+#   0       4     magic  b'EEG1'
+#   4       1     protocol version
+#   5       1     frame kind (FRAME_CHUNK / FRAME_SNAPSHOT / FRAME_DISPLAY / FRAME_SUMMARY)
+#   6       2     number of channels
+#   8       4     sequence number (uint32, wraps)
+#   12      8     server timestamp (float64, seconds since the epoch)
+#   20      4     samples per channel
+#   24      4     length of the trailing JSON state in bytes
+#   28      ...   float32 samples, channel-major
+#   ...     ...   UTF-8 JSON state (focus text, timer, verdict, ...)
+#
+# The header is 28 bytes so the float32 payload stays 4-byte aligned and can be
+# read in the browser with a zero-copy Float32Array view.
+#
+# Clients choose which stream levels they receive, either in the URL
+# (?streams=summary,display&display_points=400) or at any time with a text message
+# {"type": "subscribe", "streams": [...], "display_points": 400}:
+#
+#   raw      FRAME_CHUNK: the newest samples plus the full state (the default)
+#   display  FRAME_DISPLAY: the plotting buffer min/max-decimated to display_points
+#            buckets, sent as 2 x n_channels rows (all minima rows, then all maxima rows)
+#   summary  FRAME_SUMMARY: no samples, only the state with band powers, the model's
+#            focus probability and a smoothed 0-100 attention score
+#
+# The JSON state of chunk and summary frames holds only the fields that changed since the
+# client's previous frame; a client keeps the last value of every other field. The snapshot
+# or summary frame sent when a stream level is subscribed, and a keyframe every few seconds,
+# carry all fields. Clients that do not need every 100 ms tick, e.g. a background tab, ask
+# for a lower rate in frames per second, ?rate=1 or {"type": "subscribe", "rate": 1}; their
+# chunk frames then carry the samples of all ticks since the previous frame. Subscribe
+# messages may leave out any setting.
+#
+# When the server adapts models per session, clients may also send labels for what
+# the subject was actually doing: {"type": "feedback", "label": 1, "chunks": 50}
+# (label 1 = focused, 0 = not focused, over the last `chunks` chunks).
+#
+# Live EEG goes the other way in the same FRAME_CHUNK frames: a WebSocket client that
+# connects with ?source=upload, a UDP datagram or a TCP byte stream carries packets of
+# any number of samples, with the device time of the packet's first sample in the
+# timestamp field (0 when the device has no clock) and a per-packet sequence number.
+PROTOCOL_VERSION = 1
+FRAME_MAGIC = b'EEG1'
+FRAME_CHUNK = 1
+FRAME_SNAPSHOT = 2
+FRAME_DISPLAY = 3
+FRAME_SUMMARY = 4
+STREAM_LEVELS = ('raw', 'display', 'summary')
+HEADER = struct.Struct('<4sBBHIdII')
+
+
+def encode_hello(fs, chunk_size, buffer_length, time_axis, **extra):
+    """Builds the JSON handshake sent when a client connects, and again when it adds the raw stream."""
+    hello = {
+        "type": "hello",
+        "protocol": PROTOCOL_VERSION,
+        "fs": fs,
+        "chunk_size": chunk_size,
+        "buffer_length": buffer_length,
+        "time_axis": np.asarray(time_axis, dtype=np.float32).tolist(),
+    }
+    hello.update(extra)
+    return json.dumps(hello)
+
+
+def encode_frame(kind, seq, timestamp, samples, state=None):
+    """Packs samples (1-D or channels x samples) and an optional state dict into one binary frame."""
+    samples = np.asarray(samples, dtype=np.float32)
+    n_channels = 1 if samples.ndim == 1 else samples.shape[0]
+    meta = json.dumps(state, separators=(',', ':')).encode('utf-8') if state else b''
+    header = HEADER.pack(FRAME_MAGIC, PROTOCOL_VERSION, kind, n_channels,
+                         seq & 0xFFFFFFFF, timestamp, samples.shape[-1], len(meta))
+    return b''.join((header, samples.tobytes(), meta))
+
+
+def parse_client_message(message):
+    """
+    Reads a client text message. Returns ('subscribe', (streams, display_points, rate)), with
+    None for anything the message leaves unchanged, or ('feedback', (label, n_chunks)).
+    """
+    request = json.loads(message)
+    kind = request.get('type') if isinstance(request, dict) else None
+    if kind == 'subscribe':
+        return kind, _subscription(request)
+    if kind == 'feedback':
+        return kind, _feedback(request)
+    raise ValueError(f"Unsupported client message: {message[:100]!r}")
+
+
+def parse_subscription(message):
+    """Reads a {"type": "subscribe", ...} message; returns (streams, display_points, rate)."""
+    kind, subscription = parse_client_message(message)
+    if kind != 'subscribe':
+        raise ValueError(f"Expected a subscribe message, got '{kind}'.")
+    return subscription
+
+
+def _number(request, key, kind):
+    """request[key] converted with `kind` (None if absent); anything unconvertible is a ValueError."""
+    value = request.get(key)
+    if value is None:
+        return None
+    try:
+        return kind(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"'{key}' must be a number, got {value!r}.") from None
+
+
+def _subscription(request):
+    streams = request.get('streams')
+    if streams is not None:
+        if isinstance(streams, str):
+            streams = streams.split(',')
+        if not isinstance(streams, list) or not all(isinstance(level, str) for level in streams):
+            raise ValueError(f"'streams' must be a list or comma-separated string of levels, got {streams!r}.")
+        unknown = set(streams) - set(STREAM_LEVELS)
+        if unknown:
+            raise ValueError(f"Unknown stream level(s): {sorted(unknown)}")
+        streams = set(streams)
+    points = _number(request, 'display_points', int)
+    if points is not None and points <= 0:
+        raise ValueError(f"Display points must be positive, got {points}.")
+    rate = _number(request, 'rate', float)
+    if rate is not None and not rate > 0:
+        raise ValueError(f"Update rate must be a positive number of frames per second, got {rate!r}.")
+    return streams, points, rate
+
+
+def _feedback(request):
+    label = request.get('label')
+    if label not in (0, 1):
+        raise ValueError(f"Feedback label must be 0 or 1, got {label!r}.")
+    return int(label), _number(request, 'chunks', int)
+
+
+def frame_size(header):
+    """Total length of the frame that starts with these HEADER.size bytes (for stream transports)."""
+    magic, version, _, n_channels, _, _, n_samples, meta_len = HEADER.unpack_from(header)
+    if magic != FRAME_MAGIC or version != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported frame (magic={magic!r}, version={version}).")
+    return HEADER.size + 4 * n_channels * n_samples + meta_len
+
+
+def decode_frame(frame):
+    """Inverse of encode_frame; returns (kind, seq, timestamp, samples, state)."""
+    magic, version, kind, n_channels, seq, timestamp, n_samples, meta_len = HEADER.unpack_from(frame)
+    if magic != FRAME_MAGIC or version != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported frame (magic={magic!r}, version={version}).")
+    count = n_channels * n_samples
+    samples = np.frombuffer(frame, dtype=np.float32, count=count, offset=HEADER.size)
+    if n_channels > 1:
+        samples = samples.reshape(n_channels, n_samples)
+    meta_start = HEADER.size + 4 * count
+    state = json.loads(bytes(frame[meta_start:meta_start + meta_len])) if meta_len else {}
+    return kind, seq, timestamp, samples, state
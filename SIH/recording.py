@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import numpy as np
+
+# --- Recording Format ---
+# A recording is a directory '<name>.eegrec' holding:
+#   meta.json    fs, chunk_size, n_samples, channel names, format version
+#   signal.npy   float32 samples, (n_samples,) or channel-major (n_channels, n_samples)
+#   labels.npy   int8 ground-truth focus label per chunk
+# Plain uncompressed .npy files can be opened with np.memmap (via np.load(mmap_mode='r')),
+# so opening is O(1) and chunks are zero-copy views into the page cache. The time
+# axis is not stored because it is always arange(n_samples) / fs.
+FORMAT_NAME = 'eegrec'
+FORMAT_VERSION = 1
+EXTENSION = '.eegrec'
+
+
+class Recording:
+    """An EEG recording: signal (memory-mapped for .eegrec), per-chunk labels and metadata."""
+    def __init__(self, signal, labels, fs, chunk_size, channels=None, path=None):
+        self.signal = signal
+        self.labels = labels
+        self.fs = fs
+        self.chunk_size = chunk_size
+        self.channels = list(channels) if channels is not None else None
+        self.path = path
+
+    @property
+    def n_samples(self):
+        return self.signal.shape[-1]
+
+    @property
+    def n_channels(self):
+        return 1 if self.signal.ndim == 1 else self.signal.shape[0]
+
+    def channel_names(self):
+        """Channel names of a multi-channel recording (generic ones if none are stored), None for 1-D signals."""
+        if self.signal.ndim == 1:
+            return None
+        return self.channels or [f'Ch{i + 1}' for i in range(self.n_channels)]
+
+    @property
+    def time(self):
+        return np.arange(self.n_samples) / self.fs
+
+
+def resolve_recording_path(path):
+    """Prefers a converted '<stem>.eegrec' next to a legacy .npz when one exists."""
+    stem, ext = os.path.splitext(path)
+    if ext == '.npz' and os.path.isdir(stem + EXTENSION):
+        return stem + EXTENSION
+    return path
+
+
+def open_recording(path, fs=None, chunk_size=None):
+    """
+    Opens an .eegrec directory (memory-mapped), a stored session log (.sesslog, loaded
+    into memory) or a legacy .npz archive (loaded eagerly).
+    fs/chunk_size are only used as fallbacks for archives that do not store them.
+    """
+    path = resolve_recording_path(path)
+    if os.path.isdir(path):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('format') == 'sessionlog':
+            from session_store import SessionLog  # A stored live session replays like a recording
+            return SessionLog(path).to_recording()
+        if meta.get('format') != FORMAT_NAME or meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"'{path}' is not a version {FORMAT_VERSION} {FORMAT_NAME} recording.")
+        signal = np.load(os.path.join(path, 'signal.npy'), mmap_mode='r')
+        labels = np.load(os.path.join(path, 'labels.npy'), mmap_mode='r')
+        return Recording(signal, labels, meta['fs'], meta['chunk_size'], meta.get('channels'), path)
+
+    with np.load(path) as data:  # Each member is read into its own array, so the archive can close
+        return Recording(
+            data['signal'],
+            data['labels'] if 'labels' in data else np.zeros(0, dtype=np.int8),
+            int(data['fs']) if 'fs' in data else fs,
+            int(data['chunk_size']) if 'chunk_size' in data else chunk_size,
+            data['channels'].tolist() if 'channels' in data else None,
+            path,
+        )
+
+
+class RecordingWriter:
+    """
+    Streams blocks of samples into a new .eegrec recording whose total length is known
+    up front, so long recordings are written without ever being held in memory.
+    """
+    def __init__(self, path, n_samples, fs, chunk_size, n_channels=None, channels=None):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        shape = (n_samples,) if n_channels is None else (n_channels, n_samples)
+        self.signal = np.lib.format.open_memmap(os.path.join(path, 'signal.npy'), mode='w+',
+                                                dtype=np.float32, shape=shape)
+        self.labels = []
+        self.position = 0
+        self.meta = {
+            'format': FORMAT_NAME,
+            'version': FORMAT_VERSION,
+            'fs': fs,
+            'chunk_size': chunk_size,
+            'n_samples': n_samples,
+            'channels': list(channels) if channels is not None else None,
+        }
+
+    def write(self, block, labels=None):
+        n = block.shape[-1]
+        self.signal[..., self.position:self.position + n] = block
+        self.position += n
+        if labels is not None:
+            self.labels.append(np.asarray(labels, dtype=np.int8))
+
+    def close(self):
+        self.signal.flush()
+        del self.signal
+        labels = np.concatenate(self.labels) if self.labels else np.zeros(0, dtype=np.int8)
+        np.save(os.path.join(self.path, 'labels.npy'), labels)
+        # meta.json is written last, so a half-written recording cannot be opened
+        with open(os.path.join(self.path, 'meta.json'), 'w') as f:
+            json.dump(self.meta, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+
+def write_recording(path, signal, labels, fs, chunk_size, channels=None):
+    n_channels = None if signal.ndim == 1 else signal.shape[0]
+    with RecordingWriter(path, signal.shape[-1], fs, chunk_size, n_channels, channels) as writer:
+        writer.write(signal, labels)
+
+
+def convert_npz(src, dst=None, fs=None, chunk_size=None):
+    """Converts a legacy savez_compressed archive into an .eegrec recording."""
+    dst = dst or os.path.splitext(src)[0] + EXTENSION
+    recording = open_recording(src, fs, chunk_size)
+    if recording.fs is None or recording.chunk_size is None:
+        raise ValueError(f"'{src}' does not store fs/chunk_size; pass them explicitly.")
+    write_recording(dst, recording.signal, recording.labels, recording.fs, recording.chunk_size, recording.channels)
+    return dst
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert and inspect EEG recordings.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    convert = sub.add_parser('convert', help="Convert .npz archives to memory-mapped .eegrec recordings.")
+    convert.add_argument('files', nargs='+')
+    convert.add_argument('--out-dir', default=None, help="Defaults to next to each source file.")
+    convert.add_argument('--fs', type=int, default=None, help="Fallback for archives without 'fs'.")
+    convert.add_argument('--chunk-size', type=int, default=None, help="Fallback for archives without 'chunk_size'.")
+    info = sub.add_parser('info', help="Print recording metadata.")
+    info.add_argument('files', nargs='+')
+    args = parser.parse_args(argv)
+
+    for path in args.files:
+        if args.command == 'convert':
+            dst = None
+            if args.out_dir:
+                os.makedirs(args.out_dir, exist_ok=True)
+                dst = os.path.join(args.out_dir, os.path.splitext(os.path.basename(path))[0] + EXTENSION)
+            print(f"💾 '{path}' -> '{convert_npz(path, dst, args.fs, args.chunk_size)}'")
+        else:
+            rec = open_recording(path)
+            minutes = rec.n_samples / rec.fs / 60 if rec.fs else float('nan')
+            print(f"{rec.path}: {rec.n_channels} channel(s), {rec.n_samples} samples @ {rec.fs} Hz "
+                  f"({minutes:.1f} min), chunk_size={rec.chunk_size}, {len(rec.labels)} labels")
+
+
+if __name__ == '__main__':
+    main()
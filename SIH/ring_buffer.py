@@ -0,0 +1,76 @@
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Preallocated circular buffer for streaming EEG samples.
+
+    Every sample is written twice, at the cursor and at cursor + capacity, so the
+    most recent samples can always be read as one contiguous, zero-copy view no
+    matter where the cursor currently is. Writing a chunk costs O(chunk) instead
+    of the O(buffer) copy that np.roll makes on every tick. A running sum of the
+    buffered samples keeps `mean` O(chunk) as well.
+    """
+    def __init__(self, capacity, n_channels=None, dtype=np.float64):
+        if capacity <= 0:
+            raise ValueError("RingBuffer capacity must be positive.")
+        self.capacity = capacity
+        self.n_channels = n_channels
+        shape = (2 * capacity,) if n_channels is None else (n_channels, 2 * capacity)
+        self._data = np.zeros(shape, dtype=dtype)
+        self.cursor = 0  # Next write position, always in [0, capacity)
+        self.total_written = 0
+        self._sum = np.zeros(shape[:-1])  # Per channel; recomputed on every wrap so rounding cannot drift
+
+    def __len__(self):
+        return self.capacity
+
+    def write(self, chunk):
+        """Appends a chunk (samples along the last axis), overwriting the oldest samples."""
+        chunk = np.asarray(chunk)
+        n = chunk.shape[-1]
+        self.total_written += n
+        if n >= self.capacity:
+            # Only the newest `capacity` samples survive
+            self._data[..., :self.capacity] = chunk[..., n - self.capacity:]
+            self._data[..., self.capacity:] = chunk[..., n - self.capacity:]
+            self.cursor = 0
+            self._resum()
+            return
+
+        first = min(n, self.capacity - self.cursor)
+        self._put(self.cursor, chunk[..., :first])
+        if first < n:
+            self._put(0, chunk[..., first:])
+        self.cursor = (self.cursor + n) % self.capacity
+        if first < n or self.cursor == 0:
+            self._resum()
+
+    def _put(self, start, block):
+        n = block.shape[-1]
+        self._sum += block.sum(axis=-1) - self._data[..., start:start + n].sum(axis=-1)
+        self._data[..., start:start + n] = block
+        self._data[..., start + self.capacity:start + self.capacity + n] = block
+
+    def view(self, n=None):
+        """Returns the latest n samples (default: the whole buffer), oldest first, as a read-only view."""
+        n = self.capacity if n is None else n
+        if not 0 <= n <= self.capacity:
+            raise ValueError(f"Cannot view {n} samples from a buffer of {self.capacity}.")
+        start = self.cursor + self.capacity - n
+        window = self._data[..., start:start + n]
+        window.flags.writeable = False
+        return window
+
+    def _resum(self):
+        self._sum = self._data[..., :self.capacity].sum(axis=-1)
+
+    def mean(self):
+        """Mean of the whole buffer (all channels), from the running sum."""
+        return float(self._sum.sum()) / (self.capacity * (self.n_channels or 1))
+
+    def clear(self):
+        self._data[...] = 0
+        self._sum = np.zeros(self._data.shape[:-1])
+        self.cursor = 0
+        self.total_written = 0
@@ -1,17 +1,101 @@
+import time
+IMPORT_STARTED = time.perf_counter()  # --profile-startup reports the imports below as the first phase
+import argparse
+import itertools
+import multiprocessing
 import numpy as np
 import os
 import asyncio
+import socket
 import websockets
 import json
-from scipy.signal import welch, butter, filtfilt
-from sklearn.svm import SVC
-from sklearn.preprocessing import StandardScaler
+import struct
+from collections import Counter, deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs, unquote
+from ring_buffer import RingBuffer
+from recording import open_recording, resolve_recording_path
+from focus_model import ModelStore
+from dsp import minmax_decimate
+from verdict import VerdictAggregator
+from metrics import MetricsRegistry, CONTENT_TYPE, resident_memory_bytes, peak_memory_bytes
+from session_store import SessionStore, SessionLog, session_logs, SESSION_LOG_DIR
+from sources import FileSource, SyntheticSource, StreamSource, make_receiver
+from shm_ring import FrameRing
+from emission import StateDeltas, Coalescer
+from protocol import (encode_hello, encode_frame, parse_subscription, parse_client_message, FRAME_CHUNK, FRAME_SNAPSHOT,
+                      FRAME_DISPLAY, FRAME_SUMMARY, STREAM_LEVELS)
 
 # --- Configuration Constants (from original script) ---
 FS = 5000  # Sampling frequency
 CHUNK_SIZE = 200  # Number of samples per update
 FOCUS_WINDOW_CHUNKS = 1200  # Make a decision every 1200 chunks (48 seconds)
-DATA_FILE = 'simulated_20min_eeg.npz'
+VERDICT_MODE = os.environ.get('FOCUS_VERDICT_MODE', 'tumbling')  # 'tumbling', 'sliding' or 'decay'
+CLASSIFIER_BACKEND = os.environ.get('FOCUS_CLASSIFIER', 'linear')  # 'linear' (folded, numpy only) or 'sklearn'
+
+# --- Online Adaptation ---
+ONLINE_ADAPTATION = os.environ.get('FOCUS_ADAPT', '0') == '1'  # Per-session models that keep learning
+CALIBRATION_CHUNKS = 600  # Chunks at the start of a session trained on the source's ground-truth labels
+FEEDBACK_CHUNKS = 50  # Recent feature vectors kept per session for user feedback
+DATA_FILE = os.environ.get('FOCUS_DATA_FILE', 'simulated_20min_eeg.npz')  # Recording that file sessions loop
+DEFAULT_SESSION = 'default'  # Clients that do not ask for a session share this one
+INFERENCE_WORKERS = min(4, os.cpu_count() or 1)
+MODEL_POLL_INTERVAL = 5.0  # Seconds between checks for a new model artifact to hot-swap
+
+# --- EEG Source (see sources.py) ---
+SOURCE = os.environ.get('FOCUS_SOURCE', 'file')  # 'file', 'synthetic', 'udp://host:port', 'tcp://host:port', 'lsl://EEG'
+SOURCE_CHANNELS = os.environ.get('FOCUS_SOURCE_CHANNELS')  # Comma-separated channel names of live/synthetic streams
+
+# --- Session Logs & Replay (see session_store.py) ---
+REPLAY_FILE = os.environ.get('FOCUS_REPLAY')  # A stored .sesslog to stream instead of DATA_FILE (overrides SOURCE)
+REPLAY_SPEED = float(os.environ.get('FOCUS_REPLAY_SPEED', '1'))  # Replay at N x real time
+
+# --- Worker Processes (see shm_ring.py) ---
+HOST, PORT = 'localhost', int(os.environ.get('FOCUS_PORT', '8765'))
+WORKERS = int(os.environ.get('FOCUS_WORKERS', '0'))  # N > 0: N processes share PORT (SO_REUSEPORT) and send the frames
+RING_BYTES = int(os.environ.get('FOCUS_RING_BYTES', str(64 * 2**20)))  # Shared memory between the pipeline and workers
+PIPELINE_PORT = PORT + 1  # With workers, the pipeline process serves the HTTP routes (its metrics) here
+
+# --- Stream Levels ---
+DEFAULT_STREAMS = ('raw',)  # What a client receives when it does not subscribe explicitly
+DISPLAY_POINTS = 500  # Default number of min/max buckets in the display trace
+MAX_DISPLAY_POINTS = 4000
+ATTENTION_SMOOTHING = 0.1  # Per-tick weight of the newest probability in the attention score
+
+# --- Emission Policy (see emission.py) ---
+KEYFRAME_TICKS = 50  # Frames carry the whole state every 5 s; in between only the fields that changed
+MAX_FRAME_INTERVAL = 50  # Lowest update rate a client can ask for, in ticks per frame
+SESSION_LINGER = float(os.environ.get('FOCUS_SESSION_LINGER', '30'))  # Seconds a session stays suspended after its last client left
+
+# --- Scheduling & Backpressure ---
+TICK_INTERVAL = 0.1  # Seconds per chunk, matching the original FuncAnimation interval
+MAX_CATCH_UP_TICKS = 10  # Missed ticks replayed in one batch; anything older is skipped
+SEND_QUEUE_SIZE = 16  # Frames buffered per client before the oldest is dropped
+SLOW_CLIENT_WINDOW = 5.0  # Seconds over which dropped frames are counted
+SLOW_CLIENT_MAX_DROPS = 20  # A client dropping more than this within the window is disconnected
+
+# --- Instrumentation (Prometheus text at http://localhost:8765/metrics) ---
+METRICS_PATH = '/metrics'
+STATUS_PATH = '/status'  # 503 while the server is warming up, 200 once sessions can start
+METRICS = MetricsRegistry(sample_every=int(os.environ.get('FOCUS_METRICS_SAMPLE', '10')))  # Time 1 tick in N; 0 = off
+STAGE_SECONDS = METRICS.histogram('focus_stage_seconds', "Time per tick in each pipeline stage (sampled ticks).",
+                                  label='stage')
+TICK_SECONDS = METRICS.histogram('focus_tick_seconds', "Processing time of a whole tick (sampled ticks).")
+TICK_DELAY_SECONDS = METRICS.histogram('focus_tick_delay_seconds',
+                                       "How late ticks start after their deadline, i.e. event loop lag (sampled ticks).")
+SEND_SECONDS = METRICS.histogram('focus_client_send_seconds', "Time spent in websocket.send per frame (sampled frames).")
+QUEUE_LAG_SECONDS = METRICS.histogram('focus_client_queue_lag_seconds',
+                                      "Time frames wait in a client's send queue (sampled frames).")
+
+def missing_data_error(filepath):
+    """The error for a missing recording, with the eeg_synth command that generates it."""
+    stem, ext = os.path.splitext(os.path.basename(filepath))
+    options = f" --out-dir {os.path.dirname(filepath)}" if os.path.dirname(filepath) else ''
+    options += ' --format eegrec' if ext == '.eegrec' else ''
+    return FileNotFoundError(f"Data file not found. Please run 'python eeg_synth.py {stem}{options}' "
+                             f"to create '{filepath}'.")
 
 class FocusMonitor:
     """
@@ -20,98 +104,187 @@ class FocusMonitor:
     visualization parts have been removed in favor of a method that returns
     state as a dictionary for WebSocket transmission.
     """
-    def __init__(self, data_filepath):
-        # --- Load Pre-generated Data ---
-        self._load_data(data_filepath)
-        self.data_stream = self._data_provider()
+    def __init__(self, source, model=None, session_id=DEFAULT_SESSION, adaptive=ONLINE_ADAPTATION):
+        self.session_id = session_id
 
-        # --- ML Model and Scaler ---
-        self.scaler = StandardScaler()
-        self.clf = SVC(kernel='linear', probability=True)
-        self._train_model()
+        # --- EEG Source: a recording path (looped) or any source from sources.py ---
+        if isinstance(source, str):
+            source = self._load_data(source)
+        self.source = source
+
+        # --- ML Model (shared between sessions) and per-session filter and spectral window state ---
+        if model is None:
+            model = ModelStore().get(FS, CHUNK_SIZE, channels=source.channels, backend=CLASSIFIER_BACKEND)[0]
+        self.model = model
+        self.bandpass = self.model.make_filter()
+        self.band_power = self.model.make_band_power()
+
+        # --- Online Adaptation: a per-session copy of the model keeps learning ---
+        self.adaptive = adaptive
+        if adaptive:
+            try:
+                self.model = model.adaptive_copy()
+            except ValueError as e:
+                print(f"⚠️ Session '{session_id}' runs without online adaptation: {e}")
+                self.adaptive = False
+        if self.adaptive:
+            self.recent_features = RingBuffer(FEEDBACK_CHUNKS, len(model.features.names))
+            self.calibration_remaining = CALIBRATION_CHUNKS
+        self._chunk_labels = np.zeros(0, dtype=np.int8)  # Ground truth of the current batch, -1 when unknown
 
         # --- Real-time Data & State ---
-        self.eeg_buffer = np.zeros(FS * 2)  # Buffer for plotting
-        self.focus_history = []
-        self.time_remaining = FOCUS_WINDOW_CHUNKS
+        self.n_channels = None if source.channels is None else len(source.channels)
+        self.eeg_buffer = RingBuffer(FS * 2, self.n_channels)  # Buffer for plotting
+        self.time_axis = np.linspace(0, len(self.eeg_buffer)/FS, len(self.eeg_buffer))  # Sent once per client
+        self.seq = 0
+        self.verdicts = VerdictAggregator(FOCUS_WINDOW_CHUNKS, VERDICT_MODE)
+        self.last_verdict = None
         self.last_focus_verdict = "No verdict yet"
+        self.probability = None  # Model probability of "focused" for the newest chunk
+        self.attention = None  # Exponentially smoothed probability, 0-100
+        self.band_powers = None
+        self._display_cache = {}  # display_points -> frame, valid for the current seq only
 
     def _load_data(self, filepath):
-        """Loads the long EEG signal from the specified .npz file."""
+        """Opens the EEG recording (.npz, or a memory-mapped .eegrec next to it / in its place) as a looping source."""
+        filepath = resolve_recording_path(filepath)
         print(f"Loading data from '{filepath}'...")
         if not os.path.exists(filepath):
-            raise FileNotFoundError(f"Data file not found. Please run generate_data.py to create '{filepath}'.")
+            raise missing_data_error(filepath)
         
-        data = np.load(filepath)
-        self.full_eeg_signal = data['signal']
+        source = FileSource(filepath, fs=FS, chunk_size=CHUNK_SIZE)  # Chunks of an .eegrec are zero-copy views
         print("✅ Data loaded successfully.")
+        return source
 
-    def _data_provider(self):
-        """Generator that yields consecutive chunks of the loaded EEG signal."""
-        current_pos = 0
-        while True:
-            yield self.full_eeg_signal[current_pos : current_pos + CHUNK_SIZE]
-            current_pos += CHUNK_SIZE
-            if current_pos + CHUNK_SIZE > len(self.full_eeg_signal):
-                print("🔄 Reached end of data file, looping back to the beginning.")
-                current_pos = 0
-
-    def _bandpass_filter(self, data, lowcut=1.0, highcut=40.0, order=4):
-        nyq = 0.5 * FS
-        low = lowcut / nyq
-        high = highcut / nyq
-        b, a = butter(order, [low, high], btype='band')
-        return filtfilt(b, a, data)
-
-    def _extract_features(self, data):
-        """Extracts band power features from a data chunk."""
-        filtered = self._bandpass_filter(data)
-        freqs, psd = welch(filtered, FS, nperseg=len(data))
-        
-        bands = {'delta': (0.5, 4), 'theta': (4, 8), 'alpha': (8, 12), 'beta': (12, 30)}
-        features = []
-        for low, high in bands.values():
-            idx = np.logical_and(freqs >= low, freqs <= high)
-            band_power = np.mean(psd[idx]) if idx.any() else 0
-            features.append(band_power)
-            
-        return np.array(features)
-
-    def _train_model(self):
-        """Generates temporary synthetic data to train a baseline SVM classifier."""
-        print("Training baseline model...")
-        X_train, y_train = [], []
-        for _ in range(150):
-            t = np.linspace(0, CHUNK_SIZE/FS, CHUNK_SIZE, endpoint=False)
-            # Focused
-            alpha_f = 0.3 * np.sin(2 * np.pi * 10 * t)
-            beta_f = 0.8 * np.sin(2 * np.pi * 20 * t)
-            X_train.append(self._extract_features(alpha_f + beta_f + 0.1 * np.random.randn(CHUNK_SIZE)))
-            y_train.append(1)
-            # Unfocused
-            alpha_u = 0.8 * np.sin(2 * np.pi * 10 * t)
-            beta_u = 0.3 * np.sin(2 * np.pi * 20 * t)
-            X_train.append(self._extract_features(alpha_u + beta_u + 0.1 * np.random.randn(CHUNK_SIZE)))
-            y_train.append(0)
-
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        self.clf.fit(X_train_scaled, y_train)
-        print("✅ Model trained successfully.")
+    def _bandpass_filter(self, data, stateful=False):
+        """Live chunks continue the streaming filter state; anything else is filtered offline (zero-phase)."""
+        if stateful:
+            return self.bandpass.process(data)
+        return self.bandpass.offline(data)
+
+    def _extract_features(self, data, stateful=False):
+        """Extracts band power features from a live chunk, or from a whole analysis window."""
+        return self._extract_features_batch(np.asarray(data)[np.newaxis], stateful)[0]
+
+    def _band_powers_batch(self, chunks, stateful=False):
+        """
+        Band powers after each chunk of a live (n_chunks, [n_channels,] CHUNK_SIZE) block, which
+        advances the session's sliding analysis window; without `stateful`, band powers of
+        independent (n, [n_channels,] window_size) windows.
+        """
+        chunks = np.asarray(chunks, dtype=float)
+        if not stateful:
+            return self.model.band_power.band_powers(self.bandpass.offline(chunks))
+        # Consecutive live chunks (e.g. catching up after a stall) are one stretch of the stream
+        filtered = split_chunks(self.bandpass.process(join_chunks(chunks)), len(chunks))
+        return self.band_power.process(filtered)
+
+    def _extract_features_batch(self, chunks, stateful=False):
+        """Extracts features from a block of live chunks (or of windows) in one vectorized pass."""
+        return self.model.features(self._band_powers_batch(chunks, stateful))
 
     def update_and_get_state(self):
         """
         Runs one step of the analysis and returns the current state as a dictionary.
         This is the core logic from the original `update` function.
+        Only the newest chunk is returned; clients rebuild the plotting buffer themselves.
+        Returns None when a live source has no complete chunk yet.
         """
-        new_data = next(self.data_stream)
-        
-        self.eeg_buffer = np.roll(self.eeg_buffer, -CHUNK_SIZE)
-        self.eeg_buffer[-CHUNK_SIZE:] = new_data
+        new_data = self.next_chunks(1)
+        if len(new_data) == 0:
+            return None
+        powers = self._band_powers_batch(new_data, stateful=True)
+        labels, probabilities = self.model.classify(self.model.features(powers))
+        return self.apply_predictions(new_data, labels, probabilities, powers)
 
-        features = self._extract_features(new_data).reshape(1, -1)
-        features_scaled = self.scaler.transform(features)
-        pred_label = self.clf.predict(features_scaled)[0]
-        
+    def next_chunks(self, count=1):
+        """
+        Advances the stream by `count` chunks, returned as a (n, [n_channels,] CHUNK_SIZE) array.
+        Live sources may return fewer (even none) or, to catch up with the device, more.
+        """
+        block = self.source.read(count)
+        chunks = block.chunks
+        if len(chunks) == 0:
+            return chunks
+        self._chunk_labels = block.labels
+        self.seq += len(chunks)
+        self.eeg_buffer.write(join_chunks(chunks))
+        self._display_cache.clear()
+        return chunks
+
+    def apply_predictions(self, chunks, pred_labels, probabilities=None, band_powers=None):
+        """
+        Feeds the predictions for consecutive chunks through the verdict window and returns
+        the state to broadcast. Several chunks (a catch-up batch) go out as one frame.
+        """
+        for i, pred_label in enumerate(pred_labels):
+            probability = None if probabilities is None else probabilities[i]
+            self._update_verdict(pred_label, probability)
+            if probability is not None:
+                self._update_attention(probability)
+        if band_powers is not None and self.adaptive:
+            self._adapt(self.model.features(band_powers))
+        if band_powers is not None:
+            # The summary shows the newest chunk's band powers averaged over channels
+            latest = np.reshape(band_powers[-1], (-1, len(self.model.band_power.band_names))).mean(axis=0)
+            self.band_powers = dict(zip(self.model.band_power.band_names, latest.tolist()))
+        return self._state(join_chunks(chunks), pred_labels[-1])
+
+    def _adapt(self, features):
+        """Remembers the newest features for feedback and, while calibrating, learns from the true labels."""
+        self.recent_features.write(features.T)
+        if self.calibration_remaining <= 0:
+            return
+        n = min(len(features), self.calibration_remaining)
+        known = self._chunk_labels[:n] >= 0
+        if not known.any():
+            return
+        self.model.partial_fit(features[:n][known], self._chunk_labels[:n][known])
+        self.calibration_remaining -= int(known.sum())
+        if self.calibration_remaining <= 0:
+            print(f"Session '{self.session_id}': calibration finished after {CALIBRATION_CHUNKS} chunks.")
+
+    def log_rows(self, chunks, labels, probabilities, band_powers, state):
+        """Session-log rows for the chunks of one tick; they share the tick's attention and verdict."""
+        n = len(chunks)
+        verdict = state['verdict']
+        return {
+            'timestamp': np.full(n, state['timestamp']),
+            'seq': np.arange(self.seq - n + 1, self.seq + 1),
+            'label': labels,
+            'truth': self._chunk_labels,
+            'probability': probabilities,
+            'attention': np.full(n, np.nan if self.attention is None else self.attention),
+            'verdict_label': np.full(n, -1 if verdict is None else verdict['label']),
+            'verdict_confidence': np.full(n, np.nan if verdict is None else verdict['confidence']),
+            'band_powers': band_powers,
+            'signal': chunks,
+        }
+
+    def feedback(self, label, n_chunks=None):
+        """Trains the session's model with a label for the last n_chunks chunks (user feedback)."""
+        if not self.adaptive:
+            return False
+        available = min(self.recent_features.total_written, len(self.recent_features))
+        n = min(FEEDBACK_CHUNKS if n_chunks is None else n_chunks, available)
+        if n > 0:
+            self.model.partial_fit(self.recent_features.view(n).T, np.full(n, label))
+        return n > 0
+
+    def _update_attention(self, probability):
+        self.probability = float(probability)
+        if self.attention is None:
+            self.attention = 100 * self.probability
+        else:
+            self.attention += ATTENTION_SMOOTHING * (100 * self.probability - self.attention)
+
+    def _update_verdict(self, pred_label, probability=None):
+        verdict = self.verdicts.update(pred_label, probability)
+        if verdict is not None:
+            self.last_verdict = verdict
+            self.last_focus_verdict = str(verdict)
+
+    def _state(self, new_data, pred_label):
         if pred_label == 1:
             current_focus_text = 'FOCUSED'
             current_focus_color = '#10B981' # Green
@@ -119,76 +292,1172 @@ class FocusMonitor:
             current_focus_text = 'NOT FOCUSED'
             current_focus_color = '#EF4444' # Red
 
-        self.focus_history.append(pred_label)
-        self.time_remaining -= 1
-
-        if self.time_remaining <= 0:
-            focus_sum = np.sum(self.focus_history)
-            verdict = 1 if focus_sum > (len(self.focus_history) / 2) else 0
-            confidence = focus_sum / len(self.focus_history) if verdict == 1 else 1 - (focus_sum / len(self.focus_history))
-            
-            verdict_str = 'Focused' if verdict == 1 else 'Not Focused'
-            self.last_focus_verdict = f'{verdict_str} (Confidence: {confidence:.2f})'
-            
-            self.focus_history = []
-            self.time_remaining = FOCUS_WINDOW_CHUNKS
-            
-        seconds_left = self.time_remaining * CHUNK_SIZE / FS
-        timer_text = f'Next verdict in: {seconds_left:.1f} s'
+        if self.verdicts.mode == 'tumbling':
+            seconds_left = self.verdicts.remaining * CHUNK_SIZE / FS
+            timer_text = f'Next verdict in: {seconds_left:.1f} s'
+        else:
+            timer_text = f'Rolling verdict over {self.verdicts.count * CHUNK_SIZE / FS:.1f} s'
         last_verdict_text = f'Last Verdict: {self.last_focus_verdict}'
         
-        progress = (FOCUS_WINDOW_CHUNKS - self.time_remaining) / FOCUS_WINDOW_CHUNKS
+        progress = self.verdicts.progress
         
         return {
-            "eeg_buffer": self.eeg_buffer.tolist(),
-            "time_axis": np.linspace(0, len(self.eeg_buffer)/FS, len(self.eeg_buffer)).tolist(),
+            "seq": self.seq,
+            "timestamp": time.time(),
+            "chunk": new_data,
             "current_focus_text": current_focus_text,
             "current_focus_color": current_focus_color,
             "timer_text": timer_text,
             "last_verdict_text": last_verdict_text,
             "progress_percent": progress * 100,
+            "verdict": self.last_verdict._asdict() if self.last_verdict is not None else None,
+            "probability": self.probability,
+            "attention": self.attention,
+            "band_powers": self.band_powers,
+            "buffer_mean": self.eeg_buffer.mean(),
         }
 
+    def hello_message(self, streams=STREAM_LEVELS):
+        """
+        JSON handshake with the static stream description and the client's subscribed `streams`;
+        the time axis only matters to raw clients.
+        """
+        time_axis = self.time_axis if 'raw' in streams else []
+        return encode_hello(FS, CHUNK_SIZE, len(self.eeg_buffer), time_axis,
+                            streams=[level for level in STREAM_LEVELS if level in streams],
+                            channels=self.source.channels)
+
+    def snapshot_frame(self, fields=None):
+        """
+        Binary frame holding the whole plotting buffer so a new client starts with a full
+        trace, and the state `fields` its next chunk frames update.
+        """
+        return encode_frame(FRAME_SNAPSHOT, self.seq, time.time(), self.eeg_buffer.view(), fields)
+
+    def summary_frame(self, fields):
+        """A summary frame with the given state fields, as a keyframe for a new summary subscriber."""
+        return encode_frame(FRAME_SUMMARY, self.seq, time.time(), np.zeros(0, dtype=np.float32), fields)
+
+    def display_frame(self, points):
+        """
+        The plotting buffer as `points` min/max buckets: one row of minima per channel, then
+        one row of maxima per channel. Built
+        at most once per tick and resolution, however many clients asked for it.
+        """
+        frame = self._display_cache.get(points)
+        if frame is None:
+            mins, maxs, bucket = minmax_decimate(self.eeg_buffer.view(), points)
+            rows = np.concatenate([np.atleast_2d(mins), np.atleast_2d(maxs)])
+            frame = encode_frame(FRAME_DISPLAY, self.seq, time.time(), rows,
+                                 {"bucket_size": bucket, "bucket_seconds": bucket / FS})
+            self._display_cache[points] = frame
+        return frame
+
+
+def join_chunks(chunks):
+    """(count, [n_channels,] CHUNK_SIZE) chunks -> one ([n_channels,] count * CHUNK_SIZE) stretch."""
+    return np.moveaxis(chunks, 0, -2).reshape(chunks.shape[1:-1] + (-1,))
+
+def split_chunks(samples, count):
+    """Inverse of join_chunks."""
+    return np.moveaxis(samples.reshape(samples.shape[:-1] + (count, -1)), -2, 0)
+
+def encode_state(state):
+    """Serializes a state dict into a binary chunk frame (samples + small JSON trailer)."""
+    meta = {k: v for k, v in state.items() if k not in ("seq", "timestamp", "chunk")}
+    return encode_frame(FRAME_CHUNK, state["seq"], state["timestamp"], state["chunk"], meta)
+
+def encode_summary(state):
+    """Serializes a state dict without its samples, for clients that only show the model output."""
+    meta = {k: v for k, v in state.items() if k not in ("seq", "timestamp", "chunk")}
+    return encode_frame(FRAME_SUMMARY, state["seq"], state["timestamp"], np.zeros(0, dtype=np.float32), meta)
+
+def level_frame(level, display_points, monitor, state, encoded):
+    """
+    This tick's frame of one stream level. `encoded` caches the per-session encodings, so
+    each level is serialized once no matter how many clients receive it.
+    """
+    if level == 'display':
+        return monitor.display_frame(display_points)
+    if level not in encoded:
+        encoded[level] = encode_state(state) if level == 'raw' else encode_summary(state)
+    return encoded[level]
+
+def stream_frames(client, monitor, state, encoded):
+    """The frames one client subscribed to for this tick."""
+    return [level_frame(level, client.display_points, monitor, state, encoded)
+            for level in STREAM_LEVELS if level in client.streams]
+
+# --- Inference Pool ---
+def infer_batch(monitors, chunks, timings=None):
+    """
+    Filters every session's (n_ticks, CHUNK_SIZE) block with that session's own streaming
+    state, takes the chunk spectra of all sessions that share a model in one product, advances
+    each session's sliding band-power window, then extracts features and classifies in one
+    batch. Returns one (labels, probabilities, band_powers) tuple of n_ticks rows per session.
+    With a `timings` dict, the seconds spent per stage are added to it.
+    """
+    preds = [None] * len(monitors)
+    groups = {}
+    for i, monitor in enumerate(monitors):
+        groups.setdefault(id(monitor.model), []).append(i)
+    for indices in groups.values():
+        model = monitors[indices[0]].model
+        started = time.perf_counter()
+        filtered = np.stack([
+            split_chunks(monitors[i].bandpass.process(join_chunks(chunks[i])), len(chunks[i])) for i in indices
+        ])
+        filtered_at = time.perf_counter()
+        spectra = model.spectrum.chunk_spectra(filtered)
+        # (n_sessions, n_ticks, [n_channels,] n_bands)
+        powers = np.stack([monitors[i].band_power.update(spectra[j]) for j, i in enumerate(indices)])
+        features = model.features(powers)  # (n_sessions, n_ticks, n_features)
+        flat = features.reshape(-1, features.shape[-1])
+        features_at = time.perf_counter()
+        labels, probabilities = model.classify(flat)
+        if timings is not None:
+            _add_timings(timings, filter=filtered_at - started, features=features_at - filtered_at,
+                         inference=time.perf_counter() - features_at)
+        labels = labels.reshape(features.shape[:2])
+        probabilities = probabilities.reshape(features.shape[:2])
+        for j, i in enumerate(indices):
+            preds[i] = (labels[j], probabilities[j], powers[j])
+    return preds
+
+def _add_timings(timings, **seconds):
+    for stage, value in seconds.items():
+        timings[stage] = timings.get(stage, 0.0) + value
+
+
+class InferencePool:
+    """Runs batched feature extraction and classification off the event loop."""
+    def __init__(self, max_workers=INFERENCE_WORKERS):
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='inference')
+
+    async def predict(self, monitors, chunks, timings=None):
+        """
+        Splits the sessions into one shard per worker and gathers the predictions in order.
+        With a `timings` dict, the per-stage seconds of all shards are summed into it.
+        """
+        loop = asyncio.get_running_loop()
+        n_shards = max(1, min(self.max_workers, len(monitors)))
+        bounds = np.linspace(0, len(monitors), n_shards + 1).astype(int)
+        shard_timings = [None if timings is None else {} for _ in range(n_shards)]
+        shards = await asyncio.gather(*(
+            loop.run_in_executor(self.executor, infer_batch, monitors[a:b], chunks[a:b], shard_timings[k])
+            for k, (a, b) in enumerate(zip(bounds[:-1], bounds[1:]))
+        ))
+        if timings is not None:
+            for shard in shard_timings:
+                _add_timings(timings, **shard)
+        return [pred for shard in shards for pred in shard]
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+# --- Scheduling & Backpressure ---
+class TickScheduler:
+    """
+    Runs ticks on absolute deadlines of the monotonic clock, so processing and send time
+    never accumulate into drift. When the loop falls behind, the missed ticks are reported
+    so the caller can process them as one batch.
+    """
+    def __init__(self, interval=TICK_INTERVAL, max_catch_up=MAX_CATCH_UP_TICKS):
+        self.interval = interval
+        self.max_catch_up = max_catch_up
+        self.next_deadline = None
+        self.overruns = 0  # Ticks that started late
+        self.skipped = 0  # Ticks dropped because the backlog exceeded max_catch_up
+        self.delay = 0.0  # Seconds the latest tick started after its deadline
+
+    async def wait(self):
+        """Sleeps until the next deadline and returns how many ticks are due (at least 1)."""
+        now = time.monotonic()
+        if self.next_deadline is None:
+            self.next_deadline = now
+        if self.next_deadline > now:
+            await asyncio.sleep(self.next_deadline - now)
+            now = time.monotonic()
+        self.delay = now - self.next_deadline
+
+        elapsed_ticks = 1 + int((now - self.next_deadline) // self.interval)
+        self.next_deadline += elapsed_ticks * self.interval
+        if elapsed_ticks > 1:
+            self.overruns += 1
+        if elapsed_ticks > self.max_catch_up:
+            self.skipped += elapsed_ticks - self.max_catch_up
+            return self.max_catch_up
+        return elapsed_ticks
+
+
+class ClientConnection:
+    """
+    A websocket with a bounded send queue drained by its own writer task. Enqueueing
+    never blocks the broadcast loop: when the queue is full the oldest frame is dropped
+    (the client sees a gap in the sequence numbers), and a client that keeps dropping
+    frames is disconnected.
+    """
+    def __init__(self, websocket, maxsize=SEND_QUEUE_SIZE, session_id=DEFAULT_SESSION):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.address = _client_address(websocket)
+        self.streams = set(DEFAULT_STREAMS)
+        self.display_points = DISPLAY_POINTS
+        self.interval = 1  # Ticks per frame
+        self.coalescer = None  # emission.Coalescer while the client asks for a lower rate
+        self.maxsize = maxsize
+        self.queue = deque()  # (enqueue time, frame)
+        self.dropped = 0
+        self.sent = 0
+        self.closing = False
+        self._drop_times = deque()
+        self._ready = asyncio.Event()
+        self._writer = asyncio.create_task(self._drain())
+
+    def subscribe(self, streams=None, display_points=None, rate=None):
+        """Changes the stream levels, display resolution and/or update rate; None leaves a setting as it is."""
+        if streams is not None:
+            self.streams = set(streams)
+        if display_points is not None:
+            self.display_points = max(1, min(display_points, MAX_DISPLAY_POINTS))
+        if rate is not None:
+            self.interval = max(1, min(round(1 / (rate * TICK_INTERVAL)), MAX_FRAME_INTERVAL))
+
+    def enqueue(self, message):
+        if self.closing:
+            return
+        if len(self.queue) >= self.maxsize:
+            self.queue.popleft()
+            self._record_drop()
+        self.queue.append((time.monotonic(), message))
+        self._ready.set()
+
+    def _record_drop(self):
+        now = time.monotonic()
+        self.dropped += 1
+        self._drop_times.append(now)
+        while self._drop_times and now - self._drop_times[0] > SLOW_CLIENT_WINDOW:
+            self._drop_times.popleft()
+        if len(self._drop_times) > SLOW_CLIENT_MAX_DROPS:
+            print(f"Disconnecting slow client ({self.dropped} frames dropped).")
+            self.closing = True
+            self.queue.clear()
+            asyncio.ensure_future(self.websocket.close(code=1013, reason="Client too slow"))
+
+    def lag(self):
+        """Seconds the oldest queued frame has been waiting."""
+        return time.monotonic() - self.queue[0][0] if self.queue else 0.0
+
+    async def _drain(self):
+        try:
+            while True:
+                while not self.queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+                enqueued_at, message = self.queue.popleft()
+                sampled = METRICS.sample_every and self.sent % METRICS.sample_every == 0
+                self.sent += 1
+                if not sampled:
+                    await self.websocket.send(message)
+                    continue
+                started = time.monotonic()
+                QUEUE_LAG_SECONDS.observe(started - enqueued_at)
+                await self.websocket.send(message)
+                SEND_SECONDS.observe(time.monotonic() - started)
+        except websockets.ConnectionClosed:
+            pass
+
+    def close(self):
+        self._writer.cancel()
+
+
+# --- Sessions ---
+class Session:
+    """One independent stream (e.g. one subject) and the clients watching it."""
+    def __init__(self, session_id, monitor):
+        self.id = session_id
+        self.monitor = monitor
+        self.clients = set()
+        self.deltas = StateDeltas(KEYFRAME_TICKS)  # The state fields as the full-rate clients know them
+        self.log = None  # SessionLogWriter while the session is being recorded
+        self.uploader = None  # The client that streams this session's EEG (sources.StreamSource)
+        self.expiry = None  # Timer that ends the session while it lingers without clients
+
+    @property
+    def live(self):
+        """A live stream keeps arriving whether anyone watches it, so it cannot be suspended."""
+        return isinstance(self.monitor.source, StreamSource)
+
+    @property
+    def suspended(self):
+        return not self.live and not any(client.streams for client in self.clients)
+
+
+class SessionManager:
+    """
+    Creates a FocusMonitor per session on first use; all monitors share one trained model.
+    With a SessionStore, every session is recorded from its start until its last client leaves.
+    A session streams the data file (or synthetic data, per SOURCE), the live `receiver`,
+    or, when it is started by an uploading client, that client's packets.
+    A recorded or synthetic session that nobody subscribes to is suspended: its monitor is
+    not advanced, so it resumes where its stream stood. After its last client left it lingers
+    like that for SESSION_LINGER seconds, so a reconnecting dashboard picks it up again.
+    """
+    def __init__(self, data_filepath, model, store=None, receiver=None):
+        self.data_filepath = data_filepath
+        self.model = model
+        self.store = store
+        self.receiver = receiver
+        self.sessions = {}
+
+    def make_source(self, upload=False):
+        if upload or self.receiver is not None:
+            return StreamSource(FS, CHUNK_SIZE, self.model.channels, receiver=None if upload else self.receiver)
+        if SOURCE == 'synthetic' and not REPLAY_FILE:
+            return SyntheticSource(FS, CHUNK_SIZE, self.model.channels)
+        return self.data_filepath
+
+    def join(self, session_id, client, upload=False):
+        """Adds a client to a session, starting the session if needed; an uploader must be its only source."""
+        session = self.sessions.get(session_id)
+        if upload and session is not None and (session.uploader is not None or
+                                               not isinstance(session.monitor.source, StreamSource)
+                                               or session.monitor.source.receiver is not None):
+            raise ValueError(f"Session '{session_id}' already has an EEG source.")
+        if session is not None and session.expiry is not None:
+            session.expiry.cancel()
+            session.expiry = None
+            print(f"Session '{session_id}' resumed.")
+        if session is None:
+            monitor = FocusMonitor(self.make_source(upload), model=self.model, session_id=session_id)
+            session = self.sessions[session_id] = Session(session_id, monitor)
+            if self.store is not None:
+                session.log = self.store.open(session_id, FS, CHUNK_SIZE, monitor.source.channels,
+                                              monitor.model.band_power.band_names)
+            print(f"Session '{session_id}' started. Total sessions: {len(self.sessions)}")
+        if upload:
+            session.uploader = client
+        session.clients.add(client)
+        return session
+
+    def leave(self, session, client):
+        session.clients.discard(client)
+        if session.uploader is client:
+            session.uploader = None
+        if session.clients:
+            return
+        if session.live or SESSION_LINGER <= 0:
+            self._end(session)
+            return
+        session.expiry = asyncio.get_running_loop().call_later(SESSION_LINGER, self._end, session)
+        print(f"Session '{session.id}' suspended; it ends in {SESSION_LINGER:g} s unless a client rejoins.")
+
+    def _end(self, session):
+        del self.sessions[session.id]
+        session.monitor.source.close()
+        if session.log is not None:
+            self.store.close_log(session.log)
+        print(f"Session '{session.id}' ended. Total sessions: {len(self.sessions)}")
+
+    def swap_model(self, model):
+        """
+        Hot-swaps the model of every session; filter and spectral window state are kept when
+        their designs are unchanged.
+        """
+        old_params = self.model.filter_params
+        old_window = self.model.window_size
+        self.model = model
+        for session in self.sessions.values():
+            if session.monitor.adaptive:
+                continue  # An adapted per-session model is worth more than a fresh baseline
+            session.monitor.model = model
+            if model.filter_params != old_params:
+                session.monitor.bandpass = model.make_filter()
+            if model.window_size != old_window:
+                session.monitor.band_power = model.make_band_power()
+
+    def active(self):
+        """The sessions to advance this tick."""
+        return [session for session in self.sessions.values() if not session.suspended]
+
+    def client_count(self):
+        return sum(len(session.clients) for session in self.sessions.values())
+
+
 # --- WebSocket Server Logic ---
-CONNECTED_CLIENTS = set()
-monitor = FocusMonitor(data_filepath=DATA_FILE)
+SESSIONS = None
+INFERENCE_POOL = None
+STARTUP = None
+HUB = None  # WorkerHub when FOCUS_WORKERS > 0
+
+def _query(websocket):
+    """Query parameters of the connection URL, e.g. ws://localhost:8765/?session=alice&streams=summary."""
+    request = getattr(websocket, 'request', None)
+    path = request.path if request is not None else getattr(websocket, 'path', '/')
+    return parse_qs(urlsplit(path).query)
+
+def _session_id(websocket):
+    return _query(websocket).get('session', [DEFAULT_SESSION])[0]
+
+def _is_upload(websocket):
+    """?source=upload: the client streams EEG frames into its session instead of (only) watching it."""
+    return _query(websocket).get('source', [None])[0] == 'upload'
+
+def _client_address(websocket):
+    address = getattr(websocket, 'remote_address', None)
+    return f'{address[0]}:{address[1]}' if address else 'unknown'
+
+def _url_subscription(websocket):
+    """The subscription requested in the URL, in the same form as a subscribe message."""
+    query = _query(websocket)
+    request = {'type': 'subscribe'}
+    if 'streams' in query:
+        request['streams'] = query['streams'][0]
+    if 'display_points' in query:
+        request['display_points'] = query['display_points'][0]
+    if 'rate' in query:
+        request['rate'] = query['rate'][0]
+    return parse_subscription(json.dumps(request))
+
+def _send_initial_frames(client, session, levels):
+    """
+    A newly subscribed raw stream needs the whole buffer, a display stream its current trace,
+    and both raw and summary streams the state fields the following frames only update.
+    """
+    monitor, known = session.monitor, session.deltas.known
+    if 'raw' in levels:
+        client.enqueue(monitor.snapshot_frame(known))
+    if 'display' in levels:
+        client.enqueue(monitor.display_frame(client.display_points))
+    if 'summary' in levels and known is not None:
+        client.enqueue(monitor.summary_frame(known))
+
+def _retime(session, client):
+    """
+    Starts sending at the client's (new) interval. What a previous coalescer collected goes
+    out first, so the client has every sample and the same state fields as the session's
+    full-rate clients, which is where a new coalescer starts from.
+    """
+    if client.coalescer is not None:
+        update = client.coalescer.flush()
+        if update is not None:
+            for frame in stream_frames(client, session.monitor, update, {}):
+                client.enqueue(frame)
+    client.coalescer = Coalescer(client.interval, session.deltas.known, KEYFRAME_TICKS) if client.interval > 1 else None
+
+def handle_client_message(session, client, message):
+    """Applies one message from a client: an uploaded EEG frame, feedback or a subscription change."""
+    if isinstance(message, bytes):
+        if client is not session.uploader:
+            print(f"⚠️ Ignoring binary message from a client that did not connect with ?source=upload.")
+            return
+        try:
+            session.monitor.source.push_frame(message)
+        except (ValueError, struct.error) as e:
+            print(f"⚠️ Ignoring upload packet for '{session.id}': {e}")
+        return
+    try:
+        kind, payload = parse_client_message(message)
+    except ValueError as e:
+        print(f"⚠️ Ignoring client message: {e}")
+        return
+    if kind == 'feedback':
+        if not session.monitor.feedback(*payload):
+            print(f"⚠️ Ignoring feedback for '{session.id}': online adaptation is off.")
+        return
+    streams, display_points, rate = payload
+    added = (streams or set()) - client.streams
+    interval = client.interval
+    client.subscribe(streams, display_points, rate)
+    if client.interval != interval:
+        _retime(session, client)
+    if 'raw' in added:
+        # The connect-time hello only carried the time axis if raw was subscribed then
+        client.enqueue(session.monitor.hello_message(client.streams))
+    _send_initial_frames(client, session, added)
+
+def _initial_subscription(client, websocket):
+    """Applies the URL's subscription; uploaders only receive the hello unless they ask for more."""
+    if _is_upload(websocket) and 'streams' not in _query(websocket):
+        client.subscribe(streams=set())
+    client.subscribe(*_url_subscription(websocket))
 
 async def handler(websocket):
-    """Handles new WebSocket connections."""
-    CONNECTED_CLIENTS.add(websocket)
-    print(f"Client connected. Total clients: {len(CONNECTED_CLIENTS)}")
+    """Handles new WebSocket connections and their subscribe messages."""
+    await STARTUP.ready.wait()  # Connections made while warming up are held open until sessions can start
+    client = ClientConnection(websocket, session_id=_session_id(websocket))
+    try:
+        _initial_subscription(client, websocket)
+        session = SESSIONS.join(client.session_id, client, _is_upload(websocket))
+    except ValueError as e:
+        client.close()
+        await websocket.close(code=1008, reason=str(e)[:120])
+        return
+    print(f"Client connected to '{session.id}'. Total clients: {SESSIONS.client_count()}")
+    try:
+        client.enqueue(session.monitor.hello_message(client.streams))
+        _send_initial_frames(client, session, client.streams)
+        _retime(session, client)
+        async for message in websocket:
+            handle_client_message(session, client, message)
+    except websockets.ConnectionClosed:
+        pass
+    finally:
+        client.close()
+        SESSIONS.leave(session, client)
+        print(f"Client disconnected. Total clients: {SESSIONS.client_count()}")
+
+async def broadcast_updates(scheduler):
+    """
+    Advances every active session on a drift-free schedule and queues its state for its
+    clients. Ticks missed while the loop was busy are processed together as one batch.
+    Full-rate clients share one update per session and level holding the fields that changed;
+    throttled clients get theirs from their coalescer every few ticks (see emission.py).
+    Sampled ticks record how long each stage took.
+    """
+    while True:
+        ticks = await scheduler.wait()
+        sessions = SESSIONS.active()
+        if not sessions:
+            continue
+        sampled = METRICS.sample()
+        timings = {} if sampled else None
+        started = time.perf_counter()
+        chunks = [session.monitor.next_chunks(ticks) for session in sessions]
+        # Live sessions whose source has no complete chunk yet skip this tick
+        ready = [i for i, c in enumerate(chunks) if len(c)]
+        if len(ready) < len(sessions):
+            sessions, chunks = [sessions[i] for i in ready], [chunks[i] for i in ready]
+            if not sessions:
+                continue
+        monitors = [session.monitor for session in sessions]
+        fetched_at = time.perf_counter()
+        preds = await INFERENCE_POOL.predict(monitors, chunks, timings)
+        serialize = fanout = 0.0
+        state_started = time.perf_counter()
+        for session, session_chunks, (labels, probabilities, band_powers) in zip(sessions, chunks, preds):
+            state = session.monitor.apply_predictions(session_chunks, labels, probabilities, band_powers)
+            if session.log is not None:
+                SESSIONS.store.append(session.log, session.monitor.log_rows(session_chunks, labels, probabilities,
+                                                                            band_powers, state))
+            frames_started = time.perf_counter()
+            update = session.deltas.update(state)
+            encoded = {}
+            if HUB is not None:
+                HUB.publish(session, update, encoded)
+            serialize += time.perf_counter() - frames_started
+            for client in list(session.clients):
+                if client.coalescer is None and HUB is not None:
+                    continue  # Published above; its worker sends it
+                frames_started = time.perf_counter()
+                if client.coalescer is None:
+                    frames = stream_frames(client, session.monitor, update, encoded)
+                else:
+                    coalesced = client.coalescer.push(state, keep_chunks='raw' in client.streams)
+                    frames = [] if coalesced is None else stream_frames(client, session.monitor, coalesced, {})
+                frames_done = time.perf_counter()
+                for frame in frames:
+                    client.enqueue(frame)
+                serialize += frames_done - frames_started
+                fanout += time.perf_counter() - frames_done
+        if HUB is not None:
+            notified = time.perf_counter()
+            HUB.notify()
+            fanout += time.perf_counter() - notified
+        if sampled:
+            finished = time.perf_counter()
+            _add_timings(timings, fetch=fetched_at - started, serialize=serialize, fanout=fanout,
+                         state=finished - state_started - serialize - fanout)
+            for stage, seconds in timings.items():
+                STAGE_SECONDS.observe(seconds, stage)
+            TICK_SECONDS.observe(finished - started)
+            TICK_DELAY_SECONDS.observe(scheduler.delay)
+
+# --- Worker Processes ---
+# With FOCUS_WORKERS=N the pipeline process runs the sessions but accepts no dashboard
+# connections itself: N worker processes bind PORT together (SO_REUSEPORT, the kernel spreads
+# the connections) and each sends frames to its own clients. Per tick, the pipeline writes
+# every subscribed frame once into a shared-memory FrameRing that all workers read, and
+# rings a doorbell on each worker's pipe. The pipes otherwise only carry small control
+# messages: joins, leaves and client messages from the workers, rejections from the pipeline.
+# Ring records: kind, stream level, target worker, display points, target client, session id length
+FANOUT_RECORD = struct.Struct('<BBHHIH')
+RECORD_STREAM, RECORD_TEXT, RECORD_BINARY = range(3)  # A session's frame of one level / a message for one client
+
+def _subscription_keys(client):
+    """The published frames a client receives; throttled clients are sent their own."""
+    if client.interval > 1:
+        return set()
+    return {(level, client.display_points if level == 'display' else 0) for level in client.streams}
+
+
+class RemoteClient:
+    """Pipeline-side stand-in for a client of a worker process; what it is sent goes into the ring."""
+    def __init__(self, hub, worker, client_id, session_id):
+        self.hub = hub
+        self.worker = worker
+        self.id = client_id
+        self.session_id = session_id
+        self.streams = set(DEFAULT_STREAMS)
+        self.display_points = DISPLAY_POINTS
+        self.interval = 1
+        self.coalescer = None
+
+    def subscribe(self, streams=None, display_points=None, rate=None):
+        old = _subscription_keys(self)
+        ClientConnection.subscribe(self, streams, display_points, rate)
+        self.hub.resubscribed(self, old)
+
+    def enqueue(self, message):
+        self.hub.send_to(self, message)
+
+
+class WorkerHub:
+    """
+    Pipeline side of worker mode: starts the worker processes and owns the ring, turns their
+    control messages into session joins, client messages and leaves, and publishes each
+    frame a session's clients subscribed to once per tick, whichever worker they are on.
+    A worker that exits takes its clients with it; the others keep serving.
+    """
+    def __init__(self, n_workers, ring_bytes=RING_BYTES):
+        self.ring = FrameRing.create(ring_bytes)
+        self.clients = {}  # (worker, client id) -> (RemoteClient, Session)
+        self.wanted = {}  # session id -> Counter of (level, display points) its clients subscribed to
+        self.connections = []
+        self.processes = []
+        self._dirty = False
+        context = multiprocessing.get_context('spawn')  # Fresh interpreters: nothing of the pipeline is inherited
+        for index in range(n_workers):
+            connection, child = context.Pipe()
+            process = context.Process(target=run_worker, args=(index, self.ring.name, child),
+                                      name=f'focus-worker-{index}', daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    def start(self, phases):
+        """Starts serving the workers' control messages and tells them the pipeline is ready."""
+        loop = asyncio.get_running_loop()
+        for index, connection in enumerate(self.connections):
+            loop.add_reader(connection.fileno(), self._receive, index)
+            self._send(index, ('ready', phases))
+
+    def _send(self, index, message):
+        connection = self.connections[index]
+        if connection is None:
+            return
+        try:
+            connection.send(message)
+        except (BrokenPipeError, EOFError, OSError):
+            self._worker_exited(index)
+
+    def _receive(self, index):
+        connection = self.connections[index]
+        try:
+            while connection.poll():
+                self._handle(index, *connection.recv())
+        except (EOFError, OSError):
+            self._worker_exited(index)
+        self.notify()
+
+    def _worker_exited(self, index):
+        connection, self.connections[index] = self.connections[index], None
+        if connection is None:
+            return
+        asyncio.get_running_loop().remove_reader(connection.fileno())
+        connection.close()
+        for worker, client_id in [key for key in self.clients if key[0] == index]:
+            self._leave(worker, client_id)
+        print(f"⚠️ Worker {index} exited; its clients were disconnected.")
+
+    def _handle(self, worker, kind, client_id, *args):
+        if kind == 'join':
+            session_id, streams, display_points, interval, upload = args
+            client = RemoteClient(self, worker, client_id, session_id)
+            client.streams, client.display_points, client.interval = set(streams), display_points, interval
+            try:
+                session = SESSIONS.join(session_id, client, upload)
+            except ValueError as e:
+                self._send(worker, ('reject', client_id, str(e)[:120]))
+                return
+            self.clients[worker, client_id] = (client, session)
+            self.resubscribed(client, set())
+            client.enqueue(session.monitor.hello_message(client.streams))
+            _send_initial_frames(client, session, client.streams)
+            _retime(session, client)
+            print(f"Client connected to '{session.id}' (worker {worker}). Total clients: {SESSIONS.client_count()}")
+        elif (worker, client_id) not in self.clients:
+            return
+        elif kind == 'message':
+            client, session = self.clients[worker, client_id]
+            handle_client_message(session, client, args[0])
+        elif kind == 'leave':
+            self._leave(worker, client_id)
+            print(f"Client disconnected (worker {worker}). Total clients: {SESSIONS.client_count()}")
+
+    def _leave(self, worker, client_id):
+        client, session = self.clients.pop((worker, client_id))
+        wanted = self.wanted[client.session_id]
+        wanted.subtract(_subscription_keys(client))
+        if not +wanted:
+            del self.wanted[client.session_id]
+        SESSIONS.leave(session, client)
+
+    def resubscribed(self, client, old_keys):
+        if (client.worker, client.id) not in self.clients:
+            return  # Not joined yet; counted on join
+        wanted = self.wanted.setdefault(client.session_id, Counter())
+        wanted.subtract(old_keys)
+        wanted.update(_subscription_keys(client))
+
+    def _publish(self, kind, session_id, payload, level=0, display_points=0, worker=0, client_id=0):
+        session = session_id.encode('utf-8')
+        self.ring.publish(FANOUT_RECORD.pack(kind, level, worker, display_points, client_id, len(session)),
+                          session, payload)
+        self._dirty = True
+
+    def send_to(self, client, message):
+        if isinstance(message, str):
+            self._publish(RECORD_TEXT, client.session_id, message.encode('utf-8'), worker=client.worker,
+                          client_id=client.id)
+        else:
+            self._publish(RECORD_BINARY, client.session_id, message, worker=client.worker, client_id=client.id)
+
+    def publish(self, session, update, encoded):
+        """Writes every frame the session's full-rate clients subscribed to into the ring, once each."""
+        for (level, display_points), count in self.wanted.get(session.id, {}).items():
+            if count > 0:
+                frame = level_frame(level, display_points, session.monitor, update, encoded)
+                self._publish(RECORD_STREAM, session.id, frame, STREAM_LEVELS.index(level), display_points)
+
+    def notify(self):
+        """Rings every worker's doorbell if anything was published since the last call."""
+        if not self._dirty:
+            return
+        self._dirty = False
+        for index in range(len(self.connections)):
+            self._send(index, None)
+
+    def close(self):
+        for index, connection in enumerate(self.connections):
+            if connection is not None:
+                asyncio.get_running_loop().remove_reader(connection.fileno())
+                connection.close()
+        for process in self.processes:
+            process.terminate()
+            process.join(timeout=5)
+        self.ring.close()
+
+
+class WorkerFrontEnd:
+    """
+    Worker side: accepts WebSocket clients on the shared port, forwards their joins and
+    messages to the pipeline process and delivers what it publishes in the ring. A client
+    receives session frames once its hello has arrived, so it never sees a frame first.
+    """
+    def __init__(self, index, ring, connection):
+        self.index = index
+        self.ring = ring
+        self.reader = ring.reader()
+        self.connection = connection
+        self.clients = {}  # client id -> ClientConnection
+        self.sessions = {}  # session id -> clients that received their hello
+        self.stopped = asyncio.get_running_loop().create_future()
+        self._ids = itertools.count(1)
+        self._reported_lost = 0
+
+    def _send(self, message):
+        try:
+            self.connection.send(message)
+        except (BrokenPipeError, OSError):
+            self._stop()
+
+    def _stop(self):
+        asyncio.get_running_loop().remove_reader(self.connection.fileno())
+        if not self.stopped.done():
+            self.stopped.set_result(None)
+
+    def receive(self):
+        try:
+            while self.connection.poll():
+                message = self.connection.recv()
+                if message is None:
+                    continue  # Doorbell: new records in the ring
+                if message[0] == 'ready':
+                    STARTUP.phases.update({f'pipeline {name}': seconds for name, seconds in message[1].items()})
+                    STARTUP.ready.set()
+                elif message[0] == 'reject' and message[1] in self.clients:
+                    asyncio.ensure_future(self.clients[message[1]].websocket.close(code=1008, reason=message[2]))
+        except (EOFError, OSError):
+            print(f"Worker {self.index}: the pipeline process is gone, stopping.")
+            self._stop()
+            return
+        self.deliver()
+
+    def deliver(self):
+        for record in self.reader.read():
+            kind, level, worker, display_points, client_id, length = FANOUT_RECORD.unpack_from(record)
+            start = FANOUT_RECORD.size
+            session_id = record[start:start + length].decode('utf-8')
+            payload = record[start + length:]
+            if kind == RECORD_STREAM:
+                level = STREAM_LEVELS[level]
+                for client in self.sessions.get(session_id, ()):
+                    if client.interval == 1 and level in client.streams and (
+                            level != 'display' or client.display_points == display_points):
+                        client.enqueue(payload)
+                continue
+            client = self.clients.get(client_id) if worker == self.index else None
+            if client is None:
+                continue
+            if kind == RECORD_TEXT:
+                client.enqueue(payload.decode('utf-8'))
+                self.sessions.setdefault(session_id, set()).add(client)  # The hello: session frames may follow
+            else:
+                client.enqueue(payload)
+        if self.reader.lost > self._reported_lost:
+            print(f"⚠️ Worker {self.index} fell behind the ring and skipped {self.reader.lost - self._reported_lost} records.")
+            self._reported_lost = self.reader.lost
+
+    async def handler(self, websocket):
+        """Like `handler`, with the session living in the pipeline process."""
+        await STARTUP.ready.wait()
+        client = ClientConnection(websocket, session_id=_session_id(websocket))
+        try:
+            _initial_subscription(client, websocket)
+        except ValueError as e:
+            client.close()
+            await websocket.close(code=1008, reason=str(e)[:120])
+            return
+        client_id = next(self._ids)
+        self.clients[client_id] = client
+        self._send(('join', client_id, client.session_id, sorted(client.streams), client.display_points,
+                    client.interval, _is_upload(websocket)))
+        try:
+            async for message in websocket:
+                if isinstance(message, str):
+                    try:
+                        kind, payload = parse_client_message(message)
+                        if kind == 'subscribe':
+                            client.subscribe(*payload)  # Mirrors the pipeline, which sends any new initial frames
+                    except ValueError:
+                        pass  # The pipeline reports it
+                self._send(('message', client_id, message))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            client.close()
+            del self.clients[client_id]
+            session_clients = self.sessions.get(client.session_id)
+            if session_clients is not None:
+                session_clients.discard(client)
+                if not session_clients:
+                    del self.sessions[client.session_id]
+            self._send(('leave', client_id))
+
+def register_worker_metrics(front):
+    """A worker's /metrics: its own clients, send times and ring position."""
+    clients = lambda: list(front.clients.values())
+    labels = lambda client: {'session': client.session_id, 'client': client.address, 'worker': front.index}
+    METRICS.callback('focus_clients', "Connected clients.", lambda: len(front.clients))
+    METRICS.callback('focus_client_queue_depth', "Frames waiting in each client's send queue.",
+                     lambda: [(labels(c), len(c.queue)) for c in clients()])
+    METRICS.callback('focus_client_lag_seconds', "Age of the oldest frame in each client's send queue.",
+                     lambda: [(labels(c), c.lag()) for c in clients()])
+    METRICS.callback('focus_client_dropped_frames_total', "Frames dropped from each client's full send queue.",
+                     lambda: [(labels(c), c.dropped) for c in clients()], kind='counter')
+    METRICS.callback('focus_worker_ring_lost_records_total', "Ring records this worker was lapped on.",
+                     lambda: front.reader.lost, kind='counter')
+    METRICS.callback('focus_process_resident_memory_bytes', "Resident set size of the worker process.",
+                     resident_memory_bytes)
+
+async def worker_main(index, ring_name, connection):
+    global STARTUP
+    STARTUP = Startup(IMPORT_STARTED)
+    ring = FrameRing.attach(ring_name)
+    front = WorkerFrontEnd(index, ring, connection)
+    register_worker_metrics(front)
+    asyncio.get_running_loop().add_reader(connection.fileno(), front.receive)
+    with STARTUP.phase('bind'):
+        server = await websockets.serve(front.handler, HOST, PORT, process_request=process_http, reuse_port=True)
     try:
-        await websocket.wait_closed()
+        await front.stopped
     finally:
-        CONNECTED_CLIENTS.remove(websocket)
-        print(f"Client disconnected. Total clients: {len(CONNECTED_CLIENTS)}")
+        asyncio.get_running_loop().remove_reader(connection.fileno())
+        server.close()
+        front.reader = None
+        ring.close()
 
-async def broadcast_updates():
-    """Continuously runs the monitor and broadcasts state to all clients."""
+def run_worker(index, ring_name, connection):
+    """Entry point of a worker process."""
+    try:
+        asyncio.run(worker_main(index, ring_name, connection))
+    except KeyboardInterrupt:
+        pass
+
+async def _http_only(websocket):
+    await websocket.close(code=1008, reason=f"Dashboards connect to port {PORT}; this port serves HTTP only.")
+
+# --- Metrics Endpoint ---
+def register_runtime_metrics(scheduler):
+    """Gauges and counters that are read from the live server objects when /metrics is scraped."""
+    clients = lambda: [client for session in SESSIONS.sessions.values() for client in session.clients
+                       if isinstance(client, ClientConnection)]  # Workers report their own clients
+    labels = lambda client: {'session': client.session_id, 'client': client.address}
+    METRICS.callback('focus_tick_overruns_total', "Ticks that started after their deadline.",
+                     lambda: scheduler.overruns, kind='counter')
+    METRICS.callback('focus_ticks_skipped_total', "Ticks dropped because the backlog exceeded MAX_CATCH_UP_TICKS.",
+                     lambda: scheduler.skipped, kind='counter')
+    METRICS.callback('focus_sessions', "Active sessions.", lambda: len(SESSIONS.sessions))
+    METRICS.callback('focus_suspended_sessions', "Sessions not advanced because nobody subscribes to them.",
+                     lambda: sum(session.suspended for session in SESSIONS.sessions.values()))
+    METRICS.callback('focus_clients', "Connected clients.", SESSIONS.client_count)
+    METRICS.callback('focus_client_queue_depth', "Frames waiting in each client's send queue.",
+                     lambda: [(labels(c), len(c.queue)) for c in clients()])
+    METRICS.callback('focus_client_lag_seconds', "Age of the oldest frame in each client's send queue.",
+                     lambda: [(labels(c), c.lag()) for c in clients()])
+    METRICS.callback('focus_client_dropped_frames_total', "Frames dropped from each client's full send queue.",
+                     lambda: [(labels(c), c.dropped) for c in clients()], kind='counter')
+    live = lambda: [(s.id, s.monitor.source.stats()) for s in SESSIONS.sessions.values()
+                    if isinstance(s.monitor.source, StreamSource)]
+    for stat, help in (('buffered_chunks', "Complete chunks waiting in each live session's jitter buffer."),
+                       ('packets_total', "Device packets received per live session."),
+                       ('lost_packets_total', "Device packets missing from the sequence numbers."),
+                       ('rejected_packets_total', "Device packets that did not match the session's layout."),
+                       ('underruns_total', "Times a live session's jitter buffer ran dry."),
+                       ('filled_samples_total', "Samples synthesized to fill gaps in a live stream."),
+                       ('late_samples_total', "Samples dropped because they arrived after being played out."),
+                       ('overflow_samples_total', "Samples dropped because a live session's buffer was full."),
+                       ('gaps_total', "Discontinuities in a live stream's timestamps.")):
+        METRICS.callback(f'focus_source_{stat}', help,
+                         lambda stat=stat: [({'session': sid}, stats[stat]) for sid, stats in live()],
+                         kind='counter' if stat.endswith('_total') else 'gauge')
+    METRICS.callback('focus_process_resident_memory_bytes', "Resident set size of the server process.",
+                     resident_memory_bytes)
+    METRICS.callback('focus_process_peak_resident_memory_bytes', "Peak resident set size of the server process.",
+                     peak_memory_bytes)
+
+def http_response(path):
+    """
+    Plain HTTP routes served next to the WebSocket, as (status, content type, body) or None:
+      /metrics                  Prometheus metrics
+      /status                   startup state ('warming', 'ready') and time per startup phase
+      /sessions                 stored session logs
+      /sessions/<id>/summary    summary of the latest log of a session; ?start=&end= in
+                                seconds after the session started select a time range
+    """
+    url = urlsplit(path)
+    if url.path == METRICS_PATH:
+        return HTTPStatus.OK, CONTENT_TYPE, METRICS.render()
+    if url.path == STATUS_PATH:
+        report = STARTUP.report()
+        status = HTTPStatus.OK if report['status'] == 'ready' else HTTPStatus.SERVICE_UNAVAILABLE
+        return status, 'application/json', json.dumps(report)
+    parts = [unquote(part) for part in url.path.strip('/').split('/')]
+    if parts[0] != 'sessions' or not SESSION_LOG_DIR:
+        return None
+    if len(parts) == 1:
+        logs = [{'session': log.meta['session'], 'path': log.path, 'started_at': log.meta['started_at'],
+                 'n_chunks': log.n_rows} for log in map(SessionLog, session_logs(SESSION_LOG_DIR))]
+        return HTTPStatus.OK, 'application/json', json.dumps(logs)
+    paths = session_logs(SESSION_LOG_DIR, parts[1]) if len(parts) == 3 and parts[2] == 'summary' else []
+    if not paths:
+        return HTTPStatus.NOT_FOUND, 'text/plain; charset=utf-8', f"No stored session at '{url.path}'.\n"
+    log = SessionLog(paths[-1])
+    query = parse_qs(url.query)
+    try:
+        start, end = (log.meta['started_at'] + float(query[key][0]) if key in query else None for key in ('start', 'end'))
+    except ValueError:
+        return HTTPStatus.BAD_REQUEST, 'text/plain; charset=utf-8', "start and end must be numbers of seconds.\n"
+    return HTTPStatus.OK, 'application/json', json.dumps(log.summary(start, end))
+
+def process_http(connection, request):
+    """websockets process_request hook: answers the http_response routes, lets everything else upgrade."""
+    legacy = isinstance(connection, str)  # websockets < 13 calls process_request(path, request_headers)
+    response = http_response(connection if legacy else request.path)
+    if response is None:
+        return None
+    status, content_type, body = response
+    headers = [('Content-Type', content_type), ('Access-Control-Allow-Origin', '*')]
+    if legacy:
+        return status, headers, body.encode('utf-8')
+    reply = connection.respond(status, body)
+    del reply.headers['Content-Type']  # respond() sets plain text; Headers would append a second value
+    for name, value in headers:
+        reply.headers[name] = value
+    return reply
+
+# --- Model Lifecycle ---
+async def watch_model(store, key):
+    """Hot-swaps the shared model whenever a newer artifact for its key appears in the cache."""
+    last_mtime = store.artifact_mtime(key)
     while True:
-        if CONNECTED_CLIENTS:
-            state = monitor.update_and_get_state()
-            message = json.dumps(state)
-            # Use asyncio.gather for concurrent sending
-            await asyncio.gather(
-                *(client.send(message) for client in CONNECTED_CLIENTS)
-            )
-        # Match the interval from the original FuncAnimation
-        await asyncio.sleep(0.1) # 100ms interval
-
-async def main():
-    """Starts the WebSocket server and the broadcast loop."""
+        await asyncio.sleep(MODEL_POLL_INTERVAL)
+        mtime = store.artifact_mtime(key)
+        if mtime is None or mtime == last_mtime:
+            continue
+        last_mtime = mtime
+        try:
+            model, _ = await asyncio.to_thread(store.load, key)
+        except Exception as e:
+            print(f"⚠️ Could not load new model artifact: {e}")
+            continue
+        SESSIONS.swap_model(model)
+        print(f"🔁 Hot-swapped model {key}.")
+
+async def retrain_stale_model(store, model):
+    """Retrains off the event loop; the saved artifact is then picked up by watch_model."""
+    print("Cached model is stale, retraining in the background...")
+    await asyncio.to_thread(store.train, model.fs, model.chunk_size, channels=model.channels,
+                            backend=model.backend, **model.filter_params)
+
+# --- Startup ---
+class Startup:
+    """
+    Staged bootstrap. The port is bound right after the (light) module imports and reports
+    'warming' until the heavy dependencies, the data source and the model are ready, which
+    happens off the event loop. Each phase is timed for --profile-startup and /status.
+    """
+    def __init__(self, started):
+        self.started = started
+        self.phases = {'imports': time.perf_counter() - started}
+        self.current = None
+        self.ready = asyncio.Event()
+
+    @contextmanager
+    def phase(self, name):
+        self.current = name
+        phase_started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - phase_started
+            self.current = None
+
+    def report(self):
+        status = 'ready' if self.ready.is_set() else 'warming'
+        return {'status': status, 'phase': self.current, 'uptime_seconds': time.perf_counter() - self.started,
+                'phases': self.phases}
+
+    def print_profile(self):
+        print("\n--- Startup Profile ---")
+        for name, seconds in self.phases.items():
+            print(f"  {name:<14}{seconds * 1000:9.1f} ms")
+        print(f"  {'total':<14}{(time.perf_counter() - self.started) * 1000:9.1f} ms "
+              f"(port bound after {(self.phases['imports'] + self.phases['bind']) * 1000:.1f} ms)")
+
+def import_heavy_dependencies():
+    """dsp imports scipy.signal on first use; importing it while warming up keeps it off the first tick."""
+    import scipy.signal
+
+def _stream_channels(data_file, from_file):
+    if SOURCE_CHANNELS:
+        return SOURCE_CHANNELS.split(',')
+    if from_file:
+        return open_recording(data_file, fs=FS, chunk_size=CHUNK_SIZE).channel_names()
+    return None
+
+async def main(profile_startup=False):
+    """
+    Binds the WebSocket port first, then loads (or trains) the shared model in the background
+    and starts the broadcast loop once the server is ready. With FOCUS_WORKERS the worker
+    processes bind the port and this process serves only HTTP, on PIPELINE_PORT.
+    """
+    global SESSIONS, INFERENCE_POOL, STARTUP, HUB
+    STARTUP = Startup(IMPORT_STARTED)
+    METRICS.callback('focus_startup_seconds', "Time spent in each startup phase.",
+                     lambda: [({'phase': name}, seconds) for name, seconds in STARTUP.phases.items()])
+    METRICS.callback('focus_ready', "1 once the server has finished warming up.", lambda: int(STARTUP.ready.is_set()))
+    data_file = REPLAY_FILE or DATA_FILE
+    from_file = SOURCE == 'file' or REPLAY_FILE
+    if REPLAY_FILE and not os.path.exists(REPLAY_FILE):
+        raise FileNotFoundError(f"Session log '{REPLAY_FILE}' not found.")
+    if from_file and not os.path.exists(resolve_recording_path(data_file)):
+        raise missing_data_error(data_file)
+    if WORKERS and not hasattr(socket, 'SO_REUSEPORT'):
+        raise SystemExit("\nERROR: FOCUS_WORKERS needs SO_REUSEPORT, which this platform does not have.")
+
+    with STARTUP.phase('bind'):
+        if WORKERS:
+            HUB = WorkerHub(WORKERS)
+            server = await websockets.serve(_http_only, HOST, PIPELINE_PORT, process_request=process_http)
+        else:
+            server = await websockets.serve(handler, HOST, PORT, process_request=process_http)
+    http_port = PIPELINE_PORT if WORKERS else PORT
     print("\n--- Starting WebSocket Server ---")
-    print("URL: ws://localhost:8765")
-    print("Open index.html in a browser to connect.")
-    
-    server = await websockets.serve(handler, "localhost", 8765)
-    await broadcast_updates()
+    print(f"URL: ws://localhost:{PORT} (add ?session=<id> for an independent stream)")
+    if WORKERS:
+        print(f"{WORKERS} worker processes share port {PORT}; pipeline metrics on port {PIPELINE_PORT}.")
+    print(f"Metrics: http://localhost:{http_port}{METRICS_PATH}, startup status: http://localhost:{http_port}{STATUS_PATH}")
+    print("Warming up...")
+
+    receiver = session_store = None
+    background = []
+    try:
+        with STARTUP.phase('dependencies'):
+            await asyncio.to_thread(import_heavy_dependencies)
+        with STARTUP.phase('data'):
+            channels = await asyncio.to_thread(_stream_channels, data_file, from_file)
+        with STARTUP.phase('model'):
+            store = ModelStore()
+            model, stale = await asyncio.to_thread(store.get, FS, CHUNK_SIZE, channels=channels,
+                                                   backend=CLASSIFIER_BACKEND)
+        with STARTUP.phase('sessions'):
+            if not from_file and SOURCE != 'synthetic':
+                receiver = make_receiver(SOURCE)
+                await receiver.start()
+            session_store = SessionStore(SESSION_LOG_DIR) if SESSION_LOG_DIR else None
+            SESSIONS = SessionManager(data_file, model, session_store, receiver)
+            INFERENCE_POOL = InferencePool()
+            scheduler = TickScheduler(TICK_INTERVAL / REPLAY_SPEED)
+            register_runtime_metrics(scheduler)
+        background.append(asyncio.create_task(watch_model(store, model.cache_key())))
+        if stale:
+            background.append(asyncio.create_task(retrain_stale_model(store, model)))
+        STARTUP.ready.set()
+        if HUB is not None:
+            HUB.start(STARTUP.phases)
+
+        print(f"✅ Ready in {time.perf_counter() - IMPORT_STARTED:.2f} s.")
+        if REPLAY_FILE:
+            ignored = f" (FOCUS_SOURCE={SOURCE} is ignored)" if SOURCE != 'file' else ''
+            print(f"Replaying '{REPLAY_FILE}' at {REPLAY_SPEED:g}x{ignored}.")
+        elif receiver is not None:
+            print(f"Streaming EEG from {SOURCE} ({len(channels) if channels else 1} channel(s) @ {FS} Hz).")
+        print(f"Upload EEG into a session with ws://localhost:{PORT}/?session=<id>&source=upload (see sources.py).")
+        if session_store is not None:
+            print(f"Recording sessions to '{SESSION_LOG_DIR}' (summaries at http://localhost:{http_port}/sessions/<id>/summary).")
+        print("Open index.html in a browser to connect.")
+        if profile_startup:
+            STARTUP.print_profile()
+
+        await broadcast_updates(scheduler)
+    finally:
+        for task in background:
+            task.cancel()
+        if INFERENCE_POOL is not None:
+            INFERENCE_POOL.shutdown()
+        if receiver is not None:
+            receiver.close()
+        if session_store is not None:
+            session_store.close()
+        if HUB is not None:
+            HUB.close()
+        server.close()
     await server.wait_closed()
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Stream focus analysis of EEG to WebSocket clients (configured "
+                                                 "through FOCUS_* environment variables).")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="Print the time spent per startup phase once the server is ready "
+                             "(add python -X importtime for single modules).")
+    args = parser.parse_args()
     try:
-        asyncio.run(main())
+        asyncio.run(main(args.profile_startup))
     except FileNotFoundError as e:
         print(f"\nERROR: {e}")
     except KeyboardInterrupt:
@@ -0,0 +1,295 @@
+import argparse
+import json
+import os
+import queue
+import re
+import threading
+import time
+import zlib
+import numpy as np
+from recording import Recording, write_recording
+
+# --- Session Log Format ---
+# Every live session is logged to its own directory '<log dir>/<safe session id>-<crc32>/<start>.sesslog':
+#   meta.json     fs, chunk_size, channel and band names, start time, format version
+#   <column>.bin  one append-only file of raw little-endian values per column (COLUMNS),
+#                 one row per chunk, so a column is read with a single np.memmap
+# Rows are only ever appended in whole batches; a reader uses the number of complete
+# rows common to all columns, so a log can be read (and replayed) while it is written.
+# The timestamp column never decreases and doubles as the time index: a time-range
+# query is two binary searches on the memory-mapped column.
+FORMAT_NAME = 'sessionlog'
+FORMAT_VERSION = 1
+EXTENSION = '.sesslog'
+SESSION_LOG_DIR = os.environ.get('FOCUS_SESSION_LOG_DIR', '')  # Set (e.g. to 'session_logs') to record sessions
+FLUSH_INTERVAL = 1.0  # Seconds between batch flushes of the background writer
+FLUSH_ROWS = 512  # Rows buffered across all sessions before an early flush
+SUMMARY_POINTS = 300  # Attention history points in a session summary
+
+# column -> dtype; per-row shapes depend on the session (see _row_shape)
+COLUMNS = {
+    'timestamp': '<f8',  # Server time of the tick that processed the chunk
+    'seq': '<u4',  # Chunk sequence number of the session
+    'label': 'i1',  # Predicted label
+    'truth': 'i1',  # Ground-truth label from the source recording, -1 when unknown
+    'probability': '<f4',  # Model probability of "focused"
+    'attention': '<f4',  # Smoothed 0-100 attention score after the tick
+    'verdict_label': 'i1',  # Latest verdict after the tick, -1 before the first one
+    'verdict_confidence': '<f4',
+    'band_powers': '<f4',  # (n_channels, n_bands)
+    'signal': '<f4',  # (n_channels, chunk_size) raw samples, or (chunk_size,) for mono
+}
+
+
+def _safe_name(session_id):
+    """
+    Session ids come from client URLs; only word characters and '-' reach the file system,
+    and a hash of the raw id keeps ids such as 'a/b' and 'a.b' in separate directories.
+    """
+    name = re.sub(r'[^\w-]', '_', session_id)
+    return f"{name}-{zlib.crc32(session_id.encode('utf-8')):08x}"
+
+
+def _row_shape(meta, column):
+    channels = meta['channels']
+    if column == 'band_powers':
+        return (len(channels) if channels else 1, len(meta['band_names']))
+    if column == 'signal':
+        return (meta['chunk_size'],) if channels is None else (len(channels), meta['chunk_size'])
+    return ()
+
+
+class SessionLogWriter:
+    """One session's log. Only the store's writer thread touches the files."""
+    def __init__(self, path, session_id, fs, chunk_size, channels=None, band_names=()):
+        self.path = path
+        self.meta = {
+            'format': FORMAT_NAME,
+            'version': FORMAT_VERSION,
+            'session': session_id,
+            'started_at': time.time(),
+            'fs': fs,
+            'chunk_size': chunk_size,
+            'channels': list(channels) if channels is not None else None,
+            'band_names': list(band_names),
+        }
+        self._files = None
+
+    def _open(self):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, 'meta.json'), 'w') as f:
+            json.dump(self.meta, f, indent=2)
+        self._files = {column: open(os.path.join(self.path, column + '.bin'), 'ab') for column in COLUMNS}
+
+    def write(self, batches):
+        """Appends a list of row batches (column -> array with one leading row axis)."""
+        if self._files is None:
+            self._open()
+        for column, dtype in COLUMNS.items():
+            data = np.concatenate([np.asarray(batch[column], dtype=dtype).reshape((-1,) + _row_shape(self.meta, column))
+                                   for batch in batches])
+            self._files[column].write(data.tobytes())
+        for f in self._files.values():
+            f.flush()
+
+    def close(self):
+        for f in (self._files or {}).values():
+            f.close()
+        self._files = None
+
+
+class SessionStore:
+    """
+    Writes session logs from a background thread. `append` only puts the tick's arrays
+    on a queue, so the event loop never waits for the disk; the writer thread collects
+    rows and flushes them in batches every FLUSH_INTERVAL seconds (or after FLUSH_ROWS).
+    """
+    def __init__(self, root=SESSION_LOG_DIR, flush_interval=FLUSH_INTERVAL, flush_rows=FLUSH_ROWS):
+        self.root = root
+        self.flush_interval = flush_interval
+        self.flush_rows = flush_rows
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name='session-log-writer', daemon=True)
+        self._thread.start()
+
+    def open(self, session_id, fs, chunk_size, channels=None, band_names=()):
+        """A new log for a session that just started; nothing touches the disk until its first rows."""
+        log = SessionLogWriter(None, session_id, fs, chunk_size, channels, band_names)
+        started = log.meta['started_at']
+        name = time.strftime('%Y%m%d-%H%M%S', time.localtime(started)) + f'-{int(started * 1000) % 1000:03d}'
+        log.path = os.path.join(self.root, _safe_name(session_id), name + EXTENSION)
+        return log
+
+    def append(self, log, rows):
+        self._queue.put((log, rows))
+
+    def close_log(self, log):
+        """Flushes and closes one session's log (e.g. when its last client left)."""
+        self._queue.put((log, None))
+
+    def close(self):
+        """Flushes everything and stops the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        pending = {}  # log -> list of row batches
+        n_rows = 0
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = ()
+            if item is None:
+                self._flush(pending)
+                for log in pending:
+                    log.close()
+                return
+            if item:
+                log, rows = item
+                if rows is None:
+                    self._flush({log: pending.pop(log, [])})
+                    log.close()
+                else:
+                    pending.setdefault(log, []).append(rows)
+                    n_rows += len(rows['timestamp'])
+            if n_rows >= self.flush_rows or time.monotonic() >= deadline:
+                self._flush(pending)
+                pending = {log: [] for log in pending}
+                n_rows = 0
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, pending):
+        for log, batches in pending.items():
+            if not batches:
+                continue
+            try:
+                log.write(batches)
+            except OSError as e:
+                print(f"⚠️ Could not write session log '{log.path}': {e}")
+
+
+class SessionLog:
+    """A stored session: memory-mapped columns, time-range queries, summaries and replay."""
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        if self.meta.get('format') != FORMAT_NAME or self.meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"'{path}' is not a version {FORMAT_VERSION} {FORMAT_NAME} log.")
+        self.n_rows = min(self._complete_rows(column) for column in COLUMNS)
+
+    def _row_bytes(self, column):
+        return np.dtype(COLUMNS[column]).itemsize * int(np.prod(_row_shape(self.meta, column)))
+
+    def _complete_rows(self, column):
+        path = os.path.join(self.path, column + '.bin')
+        return os.path.getsize(path) // self._row_bytes(column) if os.path.exists(path) else 0
+
+    def column(self, name, start=0, stop=None):
+        """Rows [start, stop) of a column as a read-only memory-mapped array."""
+        stop = self.n_rows if stop is None else min(stop, self.n_rows)
+        shape = (max(stop - start, 0),) + _row_shape(self.meta, name)
+        if shape[0] == 0:
+            return np.zeros(shape, dtype=COLUMNS[name])
+        return np.memmap(os.path.join(self.path, name + '.bin'), dtype=COLUMNS[name], mode='r',
+                         offset=start * self._row_bytes(name), shape=shape)
+
+    def rows_between(self, start_time=None, end_time=None):
+        """Row range [start, stop) of the chunks processed in [start_time, end_time) (epoch seconds)."""
+        timestamps = self.column('timestamp')
+        start = 0 if start_time is None else int(np.searchsorted(timestamps, start_time, side='left'))
+        stop = self.n_rows if end_time is None else int(np.searchsorted(timestamps, end_time, side='left'))
+        return start, stop
+
+    def to_recording(self, start_time=None, end_time=None):
+        """The logged raw chunks as a Recording (ground-truth labels kept when all are known)."""
+        start, stop = self.rows_between(start_time, end_time)
+        chunks = np.asarray(self.column('signal', start, stop))
+        signal = np.moveaxis(chunks, 0, -2).reshape(chunks.shape[1:-1] + (-1,))
+        truth = np.asarray(self.column('truth', start, stop))
+        labels = truth if len(truth) and np.all(truth >= 0) else np.zeros(0, dtype=np.int8)
+        return Recording(signal, labels, self.meta['fs'], self.meta['chunk_size'], self.meta['channels'], self.path)
+
+    def summary(self, start_time=None, end_time=None, points=SUMMARY_POINTS):
+        """What the session looked like: focus statistics, verdicts and a downsampled attention history."""
+        start, stop = self.rows_between(start_time, end_time)
+        timestamps = np.asarray(self.column('timestamp', start, stop))
+        summary = {'session': self.meta['session'], 'path': self.path, 'started_at': self.meta['started_at'],
+                   'n_chunks': stop - start}
+        if stop <= start:
+            return summary
+        labels = np.asarray(self.column('label', start, stop))
+        probability = np.asarray(self.column('probability', start, stop), dtype=float)
+        attention = np.asarray(self.column('attention', start, stop), dtype=float)
+        verdict_label = np.asarray(self.column('verdict_label', start, stop))
+        confidence = np.asarray(self.column('verdict_confidence', start, stop))
+        powers = np.asarray(self.column('band_powers', start, stop), dtype=float).mean(axis=(0, 1))
+
+        # A new verdict shows up as a change in the (label, confidence) columns
+        changed = np.flatnonzero((verdict_label >= 0) & (
+            np.r_[True, (verdict_label[1:] != verdict_label[:-1]) | (confidence[1:] != confidence[:-1])]))
+        if start > 0 and len(changed) and changed[0] == 0:
+            changed = changed[1:]  # Carried over from before the range
+        buckets = np.array_split(np.arange(stop - start), min(points, stop - start))
+        summary.update({
+            'duration_seconds': float(timestamps[-1] - timestamps[0]),
+            'focused_fraction': float(labels.mean()),
+            'mean_probability': float(np.nanmean(probability)) if np.isfinite(probability).any() else None,
+            'mean_attention': float(np.nanmean(attention)) if np.isfinite(attention).any() else None,
+            'band_powers': dict(zip(self.meta['band_names'], powers.tolist())),
+            'verdicts': [{'timestamp': float(timestamps[i]), 'label': int(verdict_label[i]),
+                          'confidence': float(confidence[i])} for i in changed],
+            'attention_history': [{'timestamp': float(timestamps[b[0]]), 'attention': float(np.nanmean(attention[b]))}
+                                  for b in buckets if np.isfinite(attention[b]).any()],
+        })
+        return summary
+
+
+def session_logs(root=SESSION_LOG_DIR, session_id=None):
+    """Paths of the stored logs (of one session id, or all), oldest first."""
+    ids = [_safe_name(session_id)] if session_id is not None else sorted(os.listdir(root)) if os.path.isdir(root) else []
+    paths = []
+    for sid in ids:
+        directory = os.path.join(root, sid)
+        if os.path.isdir(directory):
+            paths += [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(EXTENSION)]
+    return sorted(paths, key=lambda p: os.path.getmtime(os.path.join(p, 'meta.json'))
+                  if os.path.exists(os.path.join(p, 'meta.json')) else 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect, summarize and export stored session logs.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    list_parser = sub.add_parser('list', help="List stored session logs.")
+    list_parser.add_argument('--root', default=SESSION_LOG_DIR, required=not SESSION_LOG_DIR)
+    for name, help in (('summary', "Print a session summary as JSON."),
+                       ('export', "Write (a time range of) a session as an .eegrec recording.")):
+        command = sub.add_parser(name, help=help)
+        command.add_argument('log')
+        command.add_argument('--start', type=float, default=None, help="Seconds after the session started.")
+        command.add_argument('--end', type=float, default=None, help="Seconds after the session started.")
+        if name == 'export':
+            command.add_argument('out')
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        for path in session_logs(args.root):
+            log = SessionLog(path)
+            print(f"{path}: session '{log.meta['session']}', {log.n_rows} chunks, "
+                  f"{log.n_rows * log.meta['chunk_size'] / log.meta['fs']:.1f} s of signal")
+        return
+    log = SessionLog(args.log)
+    offset = lambda seconds: None if seconds is None else log.meta['started_at'] + seconds
+    if args.command == 'summary':
+        print(json.dumps(log.summary(offset(args.start), offset(args.end)), indent=2))
+        return
+    recording = log.to_recording(offset(args.start), offset(args.end))
+    write_recording(args.out, recording.signal, recording.labels, recording.fs, recording.chunk_size,
+                    recording.channels)
+    print(f"💾 {recording.n_samples} samples from '{args.log}' -> '{args.out}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import struct
+import numpy as np
+from multiprocessing import shared_memory
+
+# --- Shared-Memory Frame Ring ---
+# One producer process appends variable-length records to a byte ring in shared memory and
+# any number of reader processes follow it, each at its own pace, without pickling or
+# copying through pipes. Layout of the segment:
+#   header   4 x uint64: capacity, reserved, committed, records written
+#   data     records of [u32 payload length][u64 record number][payload]
+# Positions are absolute byte offsets (taken modulo the capacity), so records simply wrap
+# around the end of the data area. Before overwriting anything the producer advances
+# `reserved` to the end of the new record, and once the record is complete it advances
+# `committed`: a seqlock on byte positions. A reader copies a record and then re-reads
+# `reserved`; if the producer has reached the copied bytes in the meantime (the reader was
+# lapped), the copy is discarded and the reader skips ahead to the newest record.
+HEADER = 32
+CAPACITY, RESERVED, COMMITTED, RECORDS = range(4)
+RECORD = struct.Struct('<IQ')
+
+
+class FrameRing:
+    """A single-writer, multi-reader ring of byte records in a shared memory segment."""
+    def __init__(self, shm, owner=False):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray((4,), dtype=np.uint64, buffer=shm.buf)
+        self.data = shm.buf[HEADER:]
+        self.capacity = int(self.header[CAPACITY])
+
+    @classmethod
+    def create(cls, capacity):
+        shm = shared_memory.SharedMemory(create=True, size=HEADER + capacity)
+        np.ndarray((4,), dtype=np.uint64, buffer=shm.buf)[:] = (capacity, 0, 0, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(shared_memory.SharedMemory(name=name))
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def _write(self, position, data):
+        offset = position % self.capacity
+        first = min(len(data), self.capacity - offset)
+        self.data[offset:offset + first] = data[:first]
+        if first < len(data):
+            self.data[:len(data) - first] = data[first:]
+
+    def _read(self, position, size):
+        offset = position % self.capacity
+        first = min(size, self.capacity - offset)
+        if first == size:
+            return bytes(self.data[offset:offset + size])
+        return bytes(self.data[offset:]) + bytes(self.data[:size - first])
+
+    def publish(self, *parts):
+        """Appends one record made of the concatenated `parts` (bytes-like). Producer only."""
+        length = sum(len(part) for part in parts)
+        if RECORD.size + length > self.capacity:
+            raise ValueError(f"A {length}-byte record does not fit in a {self.capacity}-byte ring.")
+        start = int(self.header[COMMITTED])
+        end = start + RECORD.size + length
+        self.header[RESERVED] = end
+        position = start
+        for part in (RECORD.pack(length, int(self.header[RECORDS])),) + parts:
+            self._write(position, memoryview(part).cast('B'))
+            position += len(part)
+        self.header[RECORDS] += 1
+        self.header[COMMITTED] = end
+
+    def reader(self):
+        """A cursor that starts at the newest record; readers never block the producer."""
+        return RingReader(self)
+
+    def close(self):
+        self.header = None  # Views into the segment must be released before it can be closed
+        self.data.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class RingReader:
+    """One reader's position in a FrameRing; `lost` counts the records it was lapped on."""
+    def __init__(self, ring):
+        self.ring = ring
+        self.position = int(ring.header[COMMITTED])
+        self.record = int(ring.header[RECORDS])
+        self.lost = 0
+
+    def _skip_to_newest(self):
+        header = self.ring.header
+        position, record = int(header[COMMITTED]), int(header[RECORDS])
+        if record < self.record or position < self.position:  # Both are read without a lock; try again later
+            return
+        self.lost += record - self.record
+        self.position, self.record = position, record
+
+    def read(self):
+        """The payloads of all records committed since the last call, oldest first."""
+        ring, header = self.ring, self.ring.header
+        committed = int(header[COMMITTED])
+        payloads = []
+        while self.position < committed:
+            if committed - self.position > ring.capacity:
+                self._skip_to_newest()
+                break
+            length, record = RECORD.unpack(ring._read(self.position, RECORD.size))
+            payload = ring._read(self.position + RECORD.size, length) if record == self.record else None
+            if payload is None or int(header[RESERVED]) - ring.capacity > self.position:
+                self._skip_to_newest()  # Overwritten while it was being copied
+                break
+            payloads.append(payload)
+            self.position += RECORD.size + length
+            self.record += 1
+        return payloads
@@ -0,0 +1,514 @@
+import abc
+import argparse
+import asyncio
+import struct
+import time
+from bisect import bisect_right
+from collections import namedtuple
+from urllib.parse import urlsplit
+import numpy as np
+from eeg_synth import simulate_eeg_chunks, channel_names, subject_profile
+from protocol import encode_frame, decode_frame, frame_size, HEADER, FRAME_CHUNK
+from recording import open_recording
+
+# --- EEG Sources ---
+# A source delivers the stream one FocusMonitor analyses. Every source has fs,
+# chunk_size and channels (names, or None for a mono stream) and
+#   read(count) -> SourceBlock(chunks, timestamps, labels)
+# with up to `count` (n, [n_channels,] chunk_size) chunks, the time of each chunk's
+# first sample and its ground-truth label (-1 when unknown). Live sources may return
+# fewer chunks than asked for, or none, and more when they have fallen behind.
+#
+#   FileSource       loops a recording (.eegrec, .npz or a stored .sesslog)
+#   SyntheticSource  generates EEG on the fly (eeg_synth), labelled by its focus state
+#   StreamSource     sample packets of any size from a device, reassembled into chunks by
+#                    a JitterBuffer; fed by a PacketReceiver (UDP, TCP, LSL) or by a
+#                    WebSocket client uploading frames
+SYNTHETIC_TRANSITIONS = [[0.995, 0.005], [0.003, 0.997]]  # Per-chunk Markov chain over [unfocused, focused]
+PREFILL_CHUNKS = 2  # Chunks a jitter buffer holds before reading starts (and after an underrun)
+BUFFER_CHUNKS = 100  # Jitter buffer capacity; the oldest samples are dropped beyond it
+MAX_GAP_SECONDS = 0.5  # Longer holes in the device timestamps restart the alignment instead of being filled
+CLOCK_TRACKING = 0.01  # How fast the device-to-server clock offset follows increasing transport delays
+
+SourceBlock = namedtuple('SourceBlock', ['chunks', 'timestamps', 'labels'])
+
+
+def _empty_block(chunk_size, channels):
+    shape = (0, chunk_size) if channels is None else (0, len(channels), chunk_size)
+    return SourceBlock(np.zeros(shape), np.zeros(0), np.zeros(0, dtype=np.int8))
+
+
+class FileSource:
+    """Loops a recording; timestamps are positions in the recording (seconds)."""
+    def __init__(self, path, fs=None, chunk_size=None):
+        self.recording = open_recording(path, fs=fs, chunk_size=chunk_size)
+        self.fs = self.recording.fs
+        self.chunk_size = chunk_size or self.recording.chunk_size
+        self.channels = self.recording.channel_names()
+        self.position = 0
+
+    def read(self, count=1):
+        signal = self.recording.signal
+        span = count * self.chunk_size
+        if self.position + span <= signal.shape[-1]:
+            # No loop inside the block: the chunks are a strided view of the (memory-mapped) signal
+            block = signal[..., self.position:self.position + span]
+            chunks = np.moveaxis(block.reshape(block.shape[:-1] + (count, self.chunk_size)), -2, 0)
+            starts = self.position + np.arange(count) * self.chunk_size
+            self.position += span
+            return self._block(chunks, starts)
+        chunks, starts = [], []
+        for _ in range(count):
+            if self.position + self.chunk_size > signal.shape[-1]:
+                print("🔄 Reached end of data file, looping back to the beginning.")
+                self.position = 0
+            chunks.append(signal[..., self.position:self.position + self.chunk_size])
+            starts.append(self.position)
+            self.position += self.chunk_size
+        return self._block(np.stack(chunks), np.array(starts))
+
+    def _block(self, chunks, starts):
+        label_index = starts // self.recording.chunk_size
+        labels = np.full(len(starts), -1, dtype=np.int8)
+        known = label_index < len(self.recording.labels)
+        labels[known] = self.recording.labels[label_index[known]]
+        return SourceBlock(chunks, starts / self.fs, labels)
+
+    def close(self):
+        pass
+
+
+class SyntheticSource:
+    """
+    Generates EEG on the fly with eeg_synth.simulate_eeg_chunks for one random subject,
+    switching between focused and unfocused with a per-chunk Markov chain.
+    """
+    def __init__(self, fs, chunk_size, channels=None, transitions=SYNTHETIC_TRANSITIONS, seed=None):
+        self.fs = fs
+        self.chunk_size = chunk_size
+        self.channels = list(channels) if channels is not None else None
+        self.transitions = np.asarray(transitions, dtype=float)
+        self.rng = np.random.default_rng(seed)
+        self.profile = subject_profile(self.rng)
+        self.state = 1
+        self.n_read = 0
+
+    def read(self, count=1):
+        labels = np.empty(count, dtype=np.int8)
+        for i in range(count):
+            self.state = int(self.rng.random() < self.transitions[self.state, 1])
+            labels[i] = self.state
+        n_channels = None if self.channels is None else len(self.channels)
+        chunks = simulate_eeg_chunks(labels.astype(bool), self.rng, self.fs, self.chunk_size, n_channels, self.profile)
+        timestamps = (self.n_read + np.arange(count)) * self.chunk_size / self.fs
+        self.n_read += count
+        return SourceBlock(chunks, timestamps, labels)
+
+    def close(self):
+        pass
+
+
+class JitterBuffer:
+    """
+    Reassembles sample packets of any size into chunk_size blocks with aligned timestamps.
+
+    Packets go into a preallocated circular FIFO. Device timestamps (the time of a
+    packet's first sample) place each packet on the sample grid: short holes, e.g. a lost
+    UDP packet, are filled by holding the last sample so later chunks stay aligned, samples
+    that overlap what is already buffered (late or duplicate packets) are dropped, and
+    holes longer than `max_gap` seconds restart the alignment. Packets without a timestamp
+    are taken as contiguous at the nominal rate. Device time is mapped to server time
+    (epoch seconds) with a clock offset that tracks the smallest observed transport delay.
+
+    Reading starts once `prefill` chunks are buffered and returns to buffering after an
+    underrun, which absorbs arrival jitter. A backlog above `prefill` chunks is handed out
+    with the next read, so a consumer ticking slower than the device still keeps up.
+    """
+    def __init__(self, fs, chunk_size, n_channels=None, prefill=PREFILL_CHUNKS, capacity=BUFFER_CHUNKS,
+                 max_gap=MAX_GAP_SECONDS):
+        self.fs = fs
+        self.chunk_size = chunk_size
+        self.n_channels = n_channels
+        self.prefill = prefill
+        self.capacity = capacity * chunk_size  # In samples
+        self.max_gap = int(max_gap * fs)
+        self._data = np.zeros((self.capacity,) if n_channels is None else (n_channels, self.capacity))
+        self.read_index = 0  # Absolute sample counters
+        self.write_index = 0
+        self.buffering = True
+        self.clock_offset = None  # Server time minus device time
+        self._next_time = None  # Device time expected for the next sample
+        self._last = None  # Last sample, held to fill short gaps
+        self._anchor_index = []  # Sample index -> server time of that sample, one entry per packet
+        self._anchor_time = []
+        # Statistics
+        self.packets = 0
+        self.underruns = 0
+        self.overflow_samples = 0
+        self.filled_samples = 0
+        self.late_samples = 0
+        self.gaps = 0
+
+    def __len__(self):
+        return self.write_index - self.read_index
+
+    @property
+    def chunks_available(self):
+        return len(self) // self.chunk_size
+
+    def _check(self, samples):
+        samples = np.asarray(samples, dtype=float)
+        if self.n_channels is None:
+            if samples.ndim == 2 and samples.shape[0] == 1:
+                samples = samples[0]
+            if samples.ndim != 1:
+                raise ValueError(f"Expected a mono packet, got shape {samples.shape}.")
+            return samples
+        samples = np.atleast_2d(samples)
+        if samples.ndim != 2 or samples.shape[0] != self.n_channels:
+            raise ValueError(f"Expected {self.n_channels} channels, got a packet of shape {samples.shape}.")
+        return samples
+
+    def push(self, samples, timestamp=None, arrival=None):
+        """Buffers one packet; `timestamp` is the device time of its first sample, if known."""
+        samples = self._check(samples)
+        arrival = time.time() if arrival is None else arrival
+        self.packets += 1
+        if timestamp is not None and self._next_time is not None:
+            missing = int(round((timestamp - self._next_time) * self.fs))
+            if missing < 0:
+                overlap = min(-missing, samples.shape[-1])
+                self.late_samples += overlap
+                samples = samples[..., overlap:]
+                timestamp += overlap / self.fs
+            elif missing <= self.max_gap:
+                if missing > 0:
+                    self.filled_samples += missing
+                    self._append(np.repeat(self._last[..., np.newaxis], missing, axis=-1))
+            else:
+                self.gaps += 1
+        n = samples.shape[-1]
+        if n == 0:
+            return
+        if timestamp is None:
+            timestamp = self._next_time if self._next_time is not None else 0.0
+
+        observed = arrival - (timestamp + n / self.fs)  # Offset plus this packet's transport delay
+        if self.clock_offset is None or observed < self.clock_offset:
+            self.clock_offset = observed
+        else:
+            self.clock_offset += CLOCK_TRACKING * (observed - self.clock_offset)
+        self._anchor_index.append(self.write_index)
+        self._anchor_time.append(timestamp + self.clock_offset)
+        self._append(samples)
+        self._next_time = timestamp + n / self.fs
+
+    def _append(self, samples):
+        n = samples.shape[-1]
+        if n > self.capacity:
+            self.write_index += n - self.capacity
+            samples = samples[..., n - self.capacity:]
+            n = self.capacity
+        overflow = len(self) + n - self.capacity
+        if overflow > 0:
+            self.read_index += overflow
+            self.overflow_samples += overflow
+        start = self.write_index % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[..., start:start + first] = samples[..., :first]
+        self._data[..., :n - first] = samples[..., first:]
+        self.write_index += n
+        self._last = samples[..., -1].copy()
+
+    def _server_time(self, index):
+        i = bisect_right(self._anchor_index, index) - 1
+        if i < 0:
+            return np.nan
+        return self._anchor_time[i] + (index - self._anchor_index[i]) / self.fs
+
+    def pop(self, count=1, max_count=None):
+        """Up to `count` chunks (plus any backlog above `prefill`), as a SourceBlock."""
+        available = self.chunks_available
+        if self.buffering and available < max(self.prefill, 1):
+            return None
+        self.buffering = False
+        if available == 0:
+            self.buffering = True
+            self.underruns += 1
+            return None
+        take = min(available, count + max(0, available - self.prefill))
+        if max_count is not None:
+            take = min(take, max_count)
+        n = take * self.chunk_size
+        samples = np.take(self._data, np.arange(self.read_index, self.read_index + n) % self.capacity, axis=-1)
+        chunks = np.moveaxis(samples.reshape(samples.shape[:-1] + (take, self.chunk_size)), -2, 0)
+        timestamps = np.array([self._server_time(self.read_index + k * self.chunk_size) for k in range(take)])
+        self.read_index += n
+        # Anchors before the read position are no longer needed (keep the one covering it)
+        drop = bisect_right(self._anchor_index, self.read_index) - 1
+        if drop > 0:
+            del self._anchor_index[:drop], self._anchor_time[:drop]
+        return SourceBlock(chunks, timestamps, np.full(take, -1, dtype=np.int8))
+
+
+class StreamSource:
+    """A live stream read through a JitterBuffer; packets come from a PacketReceiver or an uploading client."""
+    def __init__(self, fs, chunk_size, channels=None, receiver=None, max_chunks=BUFFER_CHUNKS, **buffer_params):
+        self.fs = fs
+        self.chunk_size = chunk_size
+        self.channels = list(channels) if channels is not None else None
+        self.buffer = JitterBuffer(fs, chunk_size, None if self.channels is None else len(self.channels),
+                                   **buffer_params)
+        self.max_chunks = max_chunks
+        self.lost_packets = 0
+        self.rejected_packets = 0
+        self._seq = None
+        self.receiver = receiver
+        if receiver is not None:
+            receiver.subscribe(self)
+
+    def push(self, samples, timestamp=None, seq=None):
+        """Buffers one packet; `seq` (uint32, wrapping) is used to count lost packets."""
+        if seq is not None:
+            step = (seq - self._seq) & 0xFFFFFFFF if self._seq is not None else 1
+            if 0 < step < 2 ** 31:
+                self.lost_packets += step - 1
+                self._seq = seq
+        self.buffer.push(samples, timestamp)
+
+    def push_frame(self, frame):
+        """Decodes and buffers one FRAME_CHUNK packet (see protocol.py)."""
+        kind, seq, timestamp, samples, _ = decode_frame(frame)
+        if kind != FRAME_CHUNK:
+            raise ValueError(f"Expected a chunk frame from the device, got frame kind {kind}.")
+        self.push(samples, timestamp or None, seq)
+
+    def read(self, count=1):
+        block = self.buffer.pop(count, self.max_chunks)
+        return _empty_block(self.chunk_size, self.channels) if block is None else block
+
+    def stats(self):
+        b = self.buffer
+        return {'buffered_chunks': b.chunks_available, 'packets_total': b.packets, 'lost_packets_total': self.lost_packets,
+                'rejected_packets_total': self.rejected_packets, 'underruns_total': b.underruns,
+                'filled_samples_total': b.filled_samples, 'late_samples_total': b.late_samples,
+                'overflow_samples_total': b.overflow_samples, 'gaps_total': b.gaps}
+
+    def close(self):
+        if self.receiver is not None:
+            self.receiver.unsubscribe(self)
+
+
+# --- Receivers ---
+class PacketReceiver(abc.ABC):
+    """Receives device packets and pushes each one into every subscribed StreamSource."""
+    def __init__(self):
+        self.sources = set()
+        self.bad_packets = 0
+
+    def subscribe(self, source):
+        self.sources.add(source)
+
+    def unsubscribe(self, source):
+        self.sources.discard(source)
+
+    def dispatch(self, frame):
+        """Delivers one encoded FRAME_CHUNK packet."""
+        try:
+            kind, seq, timestamp, samples, _ = decode_frame(frame)
+            if kind != FRAME_CHUNK:
+                raise ValueError(f"unexpected frame kind {kind}")
+        except (ValueError, struct.error):
+            self.bad_packets += 1
+            return
+        self.deliver(samples, timestamp or None, seq)
+
+    def deliver(self, samples, timestamp=None, seq=None):
+        for source in list(self.sources):
+            try:
+                source.push(samples, timestamp, seq)
+            except ValueError:
+                source.rejected_packets += 1
+
+    @abc.abstractmethod
+    async def start(self):
+        """Starts listening (UDP, TCP) or polling (LSL) for packets."""
+
+    def close(self):
+        pass
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, receiver):
+        self.receiver = receiver
+
+    def datagram_received(self, data, addr):
+        self.receiver.dispatch(data)
+
+
+class UDPReceiver(PacketReceiver):
+    """One FRAME_CHUNK packet per datagram."""
+    def __init__(self, host, port):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.transport = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(lambda: _DatagramProtocol(self),
+                                                                local_addr=(self.host, self.port))
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+
+
+class TCPReceiver(PacketReceiver):
+    """FRAME_CHUNK packets back to back on a byte stream; each header gives the packet length."""
+    def __init__(self, host, port):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve, self.host, self.port)
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                header = await reader.readexactly(HEADER.size)
+                self.dispatch(header + await reader.readexactly(frame_size(header) - HEADER.size))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError as e:
+            print(f"⚠️ Closing TCP source connection, stream out of sync: {e}")
+        finally:
+            writer.close()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+
+
+class LSLReceiver(PacketReceiver):
+    """Pulls sample chunks from a Lab Streaming Layer inlet (needs pylsl) and converts LSL time to epoch seconds."""
+    def __init__(self, stream_type='EEG', poll_interval=0.02):
+        super().__init__()
+        self.stream_type = stream_type
+        self.poll_interval = poll_interval
+        self._task = None
+
+    async def start(self):
+        import pylsl
+        streams = await asyncio.to_thread(pylsl.resolve_byprop, 'type', self.stream_type, 1, 10.0)
+        if not streams:
+            raise RuntimeError(f"No LSL stream of type '{self.stream_type}' found.")
+        self.inlet = pylsl.StreamInlet(streams[0])
+        self._epoch_offset = time.time() - pylsl.local_clock()
+        self._task = asyncio.create_task(self._poll())
+
+    def _pull(self):
+        samples, timestamps = self.inlet.pull_chunk(timeout=0.0)
+        return samples, timestamps, self.inlet.time_correction() if timestamps else 0.0
+
+    async def _poll(self):
+        while True:
+            samples, timestamps, correction = await asyncio.to_thread(self._pull)
+            if timestamps:
+                self.deliver(np.asarray(samples, dtype=float).T, timestamps[0] + correction + self._epoch_offset)
+            await asyncio.sleep(self.poll_interval)
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+
+
+RECEIVERS = {'udp': UDPReceiver, 'tcp': TCPReceiver, 'lsl': LSLReceiver}
+
+
+def make_receiver(spec):
+    """A receiver from 'udp://host:port', 'tcp://host:port' or 'lsl://<stream type>'."""
+    url = urlsplit(spec)
+    if url.scheme in ('udp', 'tcp') and url.port:
+        return RECEIVERS[url.scheme](url.hostname or '0.0.0.0', url.port)
+    if url.scheme == 'lsl':
+        return LSLReceiver(url.netloc or 'EEG')
+    raise ValueError(f"Unknown source '{spec}', expected udp://host:port, tcp://host:port or lsl://<type>.")
+
+
+# --- Loopback Simulator ---
+async def simulate_device(target, fs, chunk_size=200, n_channels=None, seconds=30.0, packet=(10, 300),
+                          jitter=0.02, loss=0.0, seed=None):
+    """
+    Plays a synthetic subject in real time into `target` (udp://, tcp:// or a ws:// URL with
+    ?source=upload) the way a device would: irregular packet sizes, send-time jitter, lost
+    packets, and the device time of each packet's first sample in the frame header.
+    """
+    rng = np.random.default_rng(seed)
+    source = SyntheticSource(fs, chunk_size, channel_names(n_channels) if n_channels else None, seed=rng)
+    url = urlsplit(target)
+    if url.scheme == 'udp':
+        transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            asyncio.DatagramProtocol, remote_addr=(url.hostname, url.port))
+        async def send(frame):
+            transport.sendto(frame)
+        close = transport.close
+    elif url.scheme == 'tcp':
+        _, writer = await asyncio.open_connection(url.hostname, url.port)
+        async def send(frame):
+            writer.write(frame)
+            await writer.drain()
+        close = writer.close
+    elif url.scheme in ('ws', 'wss'):
+        import websockets
+        websocket = await websockets.connect(target)
+        send, close = websocket.send, websocket.close
+    else:
+        raise ValueError(f"Cannot simulate a device on '{target}'.")
+
+    started = time.time()
+    pending = np.zeros((0,) if n_channels is None else (n_channels, 0))
+    sent = seq = lost = 0
+    total = int(seconds * fs)
+    while sent < total:
+        n = min(int(rng.integers(packet[0], packet[1] + 1)), total - sent)
+        while pending.shape[-1] < n:
+            pending = np.concatenate([pending, np.concatenate(list(source.read(1).chunks), axis=-1)], axis=-1)
+        samples, pending = pending[..., :n], pending[..., n:]
+        # A packet leaves the device once its last sample has been acquired, plus jitter
+        delay = started + (sent + n) / fs + rng.uniform(0, jitter) - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if rng.random() >= loss:
+            await send(encode_frame(FRAME_CHUNK, seq, started + sent / fs, samples))
+        else:
+            lost += 1
+        seq += 1
+        sent += n
+    result = close()
+    if asyncio.iscoroutine(result):
+        await result
+    print(f"📡 Sent {seq - lost} packets ({sent} samples, {lost} dropped on purpose) to {target}.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Loopback device simulator for the live EEG sources.")
+    parser.add_argument('target', help="udp://host:port, tcp://host:port or ws://host:port/?session=<id>&source=upload")
+    parser.add_argument('--fs', type=int, default=5000)
+    parser.add_argument('--chunk-size', type=int, default=200, help="Chunk size of the synthetic generator.")
+    parser.add_argument('--channels', type=int, default=None, help="Number of channels (mono when omitted).")
+    parser.add_argument('--seconds', type=float, default=30.0)
+    parser.add_argument('--packet', default='10-300', help="Range of samples per packet, e.g. 10-300.")
+    parser.add_argument('--jitter', type=float, default=0.02, help="Maximum extra send delay in seconds.")
+    parser.add_argument('--loss', type=float, default=0.0, help="Fraction of packets dropped.")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+    low, _, high = args.packet.partition('-')
+    asyncio.run(simulate_device(args.target, args.fs, args.chunk_size, args.channels, args.seconds,
+                                (int(low), int(high or low)), args.jitter, args.loss, args.seed))
+
+
+if __name__ == '__main__':
+    main()
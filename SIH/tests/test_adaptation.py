@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from classifiers import LinearClassifier, OnlineLinearClassifier, SklearnSVCClassifier
+from eeg_synth import focus_labels, generate_eeg_signal, BUILTIN_SCENARIOS
+from evaluate import classify_recording
+from focus_model import FocusModel
+from recording import Recording
+
+CALIBRATION_CHUNKS = 600
+
+
+def _separable(rng, n=200, offset=0.0):
+    y = np.repeat([0, 1], n)
+    return rng.normal(size=(2 * n, 2)) + offset + np.where(y[:, None] == 1, [3.0, 0.0], 0.0), y
+
+
+def test_warm_start_reproduces_the_linear_model():
+    rng = np.random.default_rng(0)
+    X, y = _separable(rng)
+    base = LinearClassifier().fit(X, y)
+    online = OnlineLinearClassifier.from_classifier(base)
+    np.testing.assert_allclose(online.predict_proba(X), base.predict_proba(X), atol=1e-9)
+    # The online model labels by its calibrated probability rather than by the SVM decision
+    np.testing.assert_array_equal(online.classify(X)[0], (base.predict_proba(X) > 0.5).astype(int))
+
+
+def test_partial_fit_follows_a_shifted_subject():
+    rng = np.random.default_rng(1)
+    online = OnlineLinearClassifier.from_classifier(LinearClassifier().fit(*_separable(rng)))
+    X, y = _separable(rng, offset=[-2.5, 4.0])  # Same classes, other feature baseline
+    before = np.mean(online.predict(X) == y)
+    for i in rng.permutation(len(X)):
+        online.partial_fit(X[i:i + 1], y[i:i + 1])
+    assert np.mean(online.predict(X) == y) > max(before + 0.2, 0.9)
+
+
+def test_only_linear_models_can_be_warm_started():
+    pytest.importorskip('sklearn')
+    rng = np.random.default_rng(2)
+    with pytest.raises(ValueError):
+        OnlineLinearClassifier.from_classifier(SklearnSVCClassifier().fit(*_separable(rng)))
+
+
+def test_calibration_improves_a_shifted_subject():
+    # Persistent focus states, and a subject whose alpha peak and noise level differ from training
+    scenario = {'markov': BUILTIN_SCENARIOS['markov_60min_8ch']['markov'], 'duration_min': 10}
+    rng = np.random.default_rng(4)
+    _, signal, labels = generate_eeg_signal(focus_labels(scenario, rng), rng,
+                                            profile={'gain': 1.0, 'alpha_shift': 1.5, 'noise': 0.4})
+    recording = Recording(signal, labels, 500, 200)
+    model = FocusModel(500, 200).train()
+    accuracy = {}
+    for chunks in (0, CALIBRATION_CHUNKS):
+        preds, _ = classify_recording(recording, model, chunks)
+        accuracy[chunks] = np.mean(preds[CALIBRATION_CHUNKS:] == labels[CALIBRATION_CHUNKS:len(preds)])
+    assert accuracy[CALIBRATION_CHUNKS] > accuracy[0] + 0.05
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from classifiers import LinearClassifier, make_classifier
+
+
+def _blobs(rng, n=200, shift=0.0, scale=1.0):
+    """Two Gaussian classes on very different feature scales, as raw band powers are."""
+    y = np.repeat([0, 1], n)
+    X = rng.normal(size=(2 * n, 3)) + np.where(y[:, None] == 1, [2.5, -2.0, 0.0], 0.0)
+    return (X + shift) * scale * np.array([1e-6, 1.0, 1e3]), y
+
+
+def test_linear_classifier_separates_unscaled_features():
+    rng = np.random.default_rng(0)
+    X, y = _blobs(rng)
+    model = LinearClassifier().fit(X, y)
+    X_test, y_test = _blobs(rng)
+    assert np.mean(model.predict(X_test) == y_test) > 0.9
+    probabilities = model.predict_proba(X_test)
+    assert probabilities[y_test == 1].mean() > 0.8 and probabilities[y_test == 0].mean() < 0.2
+
+
+def test_classify_matches_predict_for_batches_and_single_rows():
+    rng = np.random.default_rng(1)
+    X, y = _blobs(rng)
+    model = LinearClassifier().fit(X, y)
+    labels, probabilities = model.classify(X)
+    np.testing.assert_array_equal(labels, model.predict(X))
+    np.testing.assert_allclose(probabilities, model.predict_proba(X))
+    for i in range(0, len(X), 37):
+        label, probability = model.classify(X[i:i + 1])
+        assert label.shape == probability.shape == (1,)
+        assert label[0] == labels[i] and probability[0] == pytest.approx(probabilities[i], abs=1e-12)
+
+
+def test_rejects_bad_labels_and_backends():
+    with pytest.raises(ValueError):
+        LinearClassifier().fit(np.zeros((4, 2)), [0, 1, 2, 1])
+    with pytest.raises(ValueError):
+        make_classifier('forest')
@@ -0,0 +1,44 @@
+import numpy as np
+from dsp import minmax_decimate, SlidingDFT, SlidingBandPower, BandPowerExtractor
+
+FS, CHUNK_SIZE, WINDOW_CHUNKS = 500, 200, 5
+
+
+def test_minmax_decimate_keeps_spikes_and_drops_the_oldest_remainder():
+    samples = np.zeros((2, 103))
+    samples[0, 50] = 5.0
+    samples[1, 2] = -7.0  # In the 3 oldest samples, which do not fill a bucket
+    mins, maxs, bucket = minmax_decimate(samples, 10)
+    assert bucket == 10 and mins.shape == maxs.shape == (2, 10)
+    assert maxs[0, 4] == 5.0 and maxs[0].sum() == 5.0
+    assert mins[1].min() == 0.0
+    assert minmax_decimate(np.arange(5.0), 50)[2] == 1
+
+
+def test_chunk_spectra_sum_to_the_window_rfft():
+    design = SlidingDFT(FS, CHUNK_SIZE, WINDOW_CHUNKS)
+    window = np.random.default_rng(0).normal(size=CHUNK_SIZE * WINDOW_CHUNKS)
+    spectra = design.chunk_spectra(window.reshape(WINDOW_CHUNKS, CHUNK_SIZE))
+    np.testing.assert_allclose((spectra * design.slot_phases).sum(axis=0),
+                               np.fft.rfft(window)[design.bins], atol=1e-9)
+
+
+def test_sliding_band_powers_match_the_extractor_on_each_window():
+    design = SlidingDFT(FS, CHUNK_SIZE, WINDOW_CHUNKS)
+    extractor = BandPowerExtractor(FS, CHUNK_SIZE * WINDOW_CHUNKS)
+    rng = np.random.default_rng(1)
+    for shape in ((), (3,)):
+        signal = rng.normal(size=shape + (CHUNK_SIZE * 3 * WINDOW_CHUNKS,))
+        chunks = np.moveaxis(signal.reshape(shape + (-1, CHUNK_SIZE)), -2, 0)
+        powers = SlidingBandPower(design).process(chunks)
+        for i in range(WINDOW_CHUNKS - 1, len(chunks)):
+            window = signal[..., (i + 1 - WINDOW_CHUNKS) * CHUNK_SIZE:(i + 1) * CHUNK_SIZE]
+            np.testing.assert_allclose(powers[i], extractor.band_powers(window), rtol=1e-7, atol=1e-15)
+
+
+def test_stream_updates_match_one_batch():
+    design = SlidingDFT(FS, CHUNK_SIZE, WINDOW_CHUNKS)
+    chunks = np.random.default_rng(2).normal(size=(12, CHUNK_SIZE))
+    streamed = SlidingBandPower(design)
+    np.testing.assert_allclose(np.concatenate([streamed.process(chunks[i:i + 1]) for i in range(12)]),
+                               SlidingBandPower(design).process(chunks))
@@ -0,0 +1,44 @@
+import numpy as np
+from emission import StateDeltas, Coalescer
+
+CHUNK_SIZE = 4
+
+
+def _state(seq, **fields):
+    state = {'seq': seq, 'timestamp': seq * 0.1, 'chunk': np.full(CHUNK_SIZE, float(seq)),
+             'attention': 50.0, 'focus_text': 'Focused'}
+    state.update(fields)
+    return state
+
+
+def test_deltas_send_changed_fields_between_keyframes():
+    deltas = StateDeltas(keyframe_every=3)
+    first = deltas.update(_state(0))
+    assert set(first) == {'seq', 'timestamp', 'chunk', 'attention', 'focus_text'}
+    assert set(deltas.update(_state(1))) == {'seq', 'timestamp', 'chunk'}
+    assert deltas.update(_state(2, attention=55.0))['attention'] == 55.0
+    keyframe = deltas.update(_state(3))
+    assert keyframe['focus_text'] == 'Focused' and keyframe['attention'] == 50.0
+
+
+def test_deltas_start_from_what_the_clients_already_know():
+    deltas = StateDeltas(keyframe_every=10, known={'attention': 50.0, 'focus_text': 'Focused'})
+    assert set(deltas.update(_state(0, focus_text='Distracted'))) == {'seq', 'timestamp', 'chunk', 'focus_text'}
+
+
+def test_coalescer_emits_the_samples_and_changes_of_its_interval():
+    coalescer = Coalescer(3, known={'attention': 50.0, 'focus_text': 'Focused'}, keyframe_ticks=30)
+    assert coalescer.push(_state(0, attention=60.0)) is None
+    assert coalescer.push(_state(1, attention=50.0)) is None
+    update = coalescer.push(_state(2))
+    # Attention changed and changed back within the interval: nothing to send
+    assert update['seq'] == 2 and set(update) == {'seq', 'timestamp', 'chunk'}
+    np.testing.assert_array_equal(update['chunk'], np.repeat([0.0, 1.0, 2.0], CHUNK_SIZE))
+    assert coalescer.flush() is None
+
+
+def test_coalescer_without_samples_and_early_flush():
+    coalescer = Coalescer(5, known=None, keyframe_ticks=30)
+    coalescer.push(_state(0), keep_chunks=False)
+    update = coalescer.flush()
+    assert update['chunk'].shape == (0,) and update['focus_text'] == 'Focused'
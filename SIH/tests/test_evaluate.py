@@ -0,0 +1,16 @@
+import numpy as np
+import pytest
+from evaluate import confusion_matrix, true_states, main
+
+
+def test_confusion_matrix_and_true_states():
+    np.testing.assert_array_equal(confusion_matrix([0, 0, 1, 1, 1], [0, 1, 1, 1, 0]), [[1, 1], [1, 2]])
+    labels = np.repeat([1, 0], 100)
+    labels[[10, 20, 150]] ^= 1  # Isolated label noise does not flip the state
+    np.testing.assert_array_equal(true_states(labels, 9), np.repeat([1, 0], 100))
+
+
+def test_calibration_needs_an_adaptable_backend(capsys):
+    with pytest.raises(SystemExit):
+        main(['missing.npz', '--backend', 'sklearn', '--calibration-chunks', '100'])
+    assert '--calibration-chunks needs the linear or online backend' in capsys.readouterr().err
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from eeg_synth import simulate_eeg_chunks
+from focus_model import FocusModel
+
+
+def _stream_accuracy(model, focus, rng):
+    """Chunk accuracy of the model streaming simulated chunks of a persistent focus schedule."""
+    channels = None if model.channels is None else model.n_channels
+    chunks = simulate_eeg_chunks(focus, rng, model.fs, model.chunk_size, channels)
+    # Filtered as one continuous stream, as a live session does
+    stream = model.make_filter().process(np.concatenate(list(chunks), axis=-1))
+    filtered = np.moveaxis(stream.reshape(stream.shape[:-1] + (len(focus), model.chunk_size)), -2, 0)
+    powers = model.make_band_power().process(filtered)
+    labels, _ = model.classify(model.features(powers))
+    settled = np.ones(len(focus), dtype=bool)
+    settled[:model.spectrum.window_chunks] = False  # The window still holds the previous state
+    switch = np.flatnonzero(np.diff(focus)) + 1
+    for start in switch:
+        settled[start:start + model.spectrum.window_chunks] = False
+    return np.mean(labels[settled] == focus[settled])
+
+
+@pytest.mark.parametrize('fs, channels', [(500, None), (5000, None), (500, ['F3', 'F4', 'O1', 'O2'])])
+def test_baseline_model_recognizes_generated_eeg(fs, channels):
+    with np.errstate(all='ignore'):
+        model = FocusModel(fs, 200, channels=channels).train()
+    focus = np.repeat([True, False, True, False], 100)
+    assert _stream_accuracy(model, focus, np.random.default_rng(0)) > 0.9
@@ -0,0 +1,75 @@
+import json
+import numpy as np
+import pytest
+from protocol import (encode_hello, encode_frame, decode_frame, frame_size, parse_client_message, parse_subscription,
+                      HEADER, FRAME_CHUNK, FRAME_SUMMARY, PROTOCOL_VERSION)
+
+
+@pytest.mark.parametrize('shape', [(200,), (3, 200), (0,)])
+def test_frame_round_trip(shape):
+    samples = np.random.default_rng(0).normal(size=shape)
+    state = {'attention': 42.5, 'focus_text': 'Focused'}
+    frame = encode_frame(FRAME_CHUNK, 7, 1234.5, samples, state)
+    kind, seq, timestamp, decoded, decoded_state = decode_frame(frame)
+    assert (kind, seq, timestamp) == (FRAME_CHUNK, 7, 1234.5)
+    np.testing.assert_array_equal(decoded, samples.astype(np.float32))
+    assert decoded_state == state
+
+
+def test_frame_without_state_and_wrapping_seq():
+    frame = encode_frame(FRAME_SUMMARY, 2**32 + 5, 0.0, np.zeros(0))
+    kind, seq, _, samples, state = decode_frame(frame)
+    assert (kind, seq, samples.size, state) == (FRAME_SUMMARY, 5, 0, {})
+
+
+def test_decode_rejects_foreign_frames():
+    frame = bytearray(encode_frame(FRAME_CHUNK, 0, 0.0, np.zeros(4)))
+    frame[:4] = b'XXXX'
+    with pytest.raises(ValueError):
+        decode_frame(bytes(frame))
+
+
+def test_frame_size_from_the_header():
+    for samples in (np.zeros(200), np.zeros((4, 50)), np.zeros(0)):
+        frame = encode_frame(FRAME_CHUNK, 1, 0.0, samples, {'label': 1})
+        assert frame_size(frame[:HEADER.size]) == len(frame)
+
+
+def test_hello():
+    hello = json.loads(encode_hello(500, 200, 1000, np.linspace(0, 2, 1000)))
+    assert hello['type'] == 'hello' and hello['protocol'] == PROTOCOL_VERSION
+    assert (hello['fs'], hello['chunk_size'], hello['buffer_length']) == (500, 200, 1000)
+    assert len(hello['time_axis']) == 1000
+
+
+def test_parse_subscribe():
+    kind, (streams, points, _) = parse_client_message('{"type": "subscribe", "streams": "raw,summary", '
+                                                      '"display_points": "300"}')
+    assert (kind, streams, points) == ('subscribe', {'raw', 'summary'}, 300)
+    assert parse_subscription('{"type": "subscribe", "streams": ["display"]}')[0] == {'display'}
+    assert parse_subscription('{"type": "subscribe"}')[:2] == (None, None)
+
+
+def test_parse_feedback():
+    assert parse_client_message('{"type": "feedback", "label": 1, "chunks": 25}') == ('feedback', (1, 25))
+    assert parse_client_message('{"type": "feedback", "label": 0}') == ('feedback', (0, None))
+    with pytest.raises(ValueError):
+        parse_client_message('{"type": "feedback", "label": 2}')
+
+
+@pytest.mark.parametrize('message', ['not json', '[1, 2]', '{"type": "unknown"}',
+                                     '{"type": "subscribe", "streams": ["raw", "video"]}'])
+def test_parse_rejects_unknown_messages(message):
+    with pytest.raises(ValueError):
+        parse_client_message(message)
+
+
+@pytest.mark.parametrize('message', ['{"type": "subscribe", "display_points": [1]}',
+                                     '{"type": "subscribe", "streams": 5}',
+                                     '{"type": "subscribe", "display_points": 0}',
+                                     '{"type": "subscribe", "rate": 0}',
+                                     '{"type": "subscribe", "rate": "fast"}',
+                                     '{"type": "feedback", "label": 1, "chunks": {}}'])
+def test_parse_rejects_malformed_fields(message):
+    with pytest.raises(ValueError):
+        parse_client_message(message)
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from ring_buffer import RingBuffer
+
+
+def test_wraps_and_keeps_the_newest_samples_in_order():
+    buffer = RingBuffer(10)
+    stream = np.arange(37, dtype=float)
+    for start in range(0, len(stream), 3):
+        buffer.write(stream[start:start + 3])
+        written = stream[:start + 3]
+        np.testing.assert_array_equal(buffer.view(), np.concatenate([np.zeros(10), written])[-10:])
+    assert buffer.total_written == 37
+    np.testing.assert_array_equal(buffer.view(4), stream[-4:])
+
+
+def test_chunk_longer_than_capacity():
+    buffer = RingBuffer(5, n_channels=2)
+    buffer.write(np.zeros((2, 3)))
+    chunk = np.arange(24, dtype=float).reshape(2, 12)
+    buffer.write(chunk)
+    np.testing.assert_array_equal(buffer.view(), chunk[:, -5:])
+
+
+def test_running_mean_matches_the_buffer():
+    rng = np.random.default_rng(0)
+    for n_channels in (None, 3):
+        buffer = RingBuffer(100, n_channels)
+        for n in rng.integers(1, 150, 50):
+            buffer.write(rng.normal(size=(n,) if n_channels is None else (n_channels, n)))
+            assert buffer.mean() == pytest.approx(buffer.view().mean(), abs=1e-12)
+        buffer.clear()
+        assert buffer.mean() == 0
+
+
+def test_view_is_read_only_and_bounded():
+    buffer = RingBuffer(8)
+    with pytest.raises(ValueError):
+        buffer.view()[0] = 1.0
+    with pytest.raises(ValueError):
+        buffer.view(9)
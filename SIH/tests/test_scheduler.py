@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+import server
+from server import TickScheduler
+
+
+class FakeClock:
+    """Stands in for time.monotonic and asyncio.sleep; sleeping advances the clock exactly."""
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(server.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(server.asyncio, 'sleep', clock.sleep)
+    return clock
+
+
+def _run(scheduler, clock, costs):
+    """Waits once per entry of `costs`, spending that many seconds 'processing' each tick."""
+    async def loop():
+        due = []
+        for cost in costs:
+            due.append(await scheduler.wait())
+            clock.now += cost
+        return due
+    return asyncio.run(loop())
+
+
+def test_deadlines_do_not_drift_with_processing_time(clock):
+    scheduler = TickScheduler(0.1, max_catch_up=10)
+    start = clock.now
+    assert _run(scheduler, clock, [0.03] * 50) == [1] * 50
+    # Each sleep only covers what is left of the interval, so tick 50 starts at start + 4.9 s
+    assert clock.sleeps[0] == pytest.approx(0.07)
+    assert clock.now - 0.03 == pytest.approx(start + 4.9)
+    assert scheduler.overruns == 0 and scheduler.skipped == 0
+
+
+def test_late_loop_reports_missed_ticks_as_one_batch(clock):
+    scheduler = TickScheduler(0.1, max_catch_up=10)
+    assert _run(scheduler, clock, [0.35, 0.0, 0.0]) == [1, 3, 1]
+    assert scheduler.overruns == 1 and scheduler.skipped == 0
+    assert scheduler.delay == pytest.approx(0.0)
+
+
+def test_backlog_beyond_max_catch_up_is_skipped(clock):
+    scheduler = TickScheduler(0.1, max_catch_up=3)
+    assert _run(scheduler, clock, [1.05, 0.0]) == [1, 3]
+    assert scheduler.skipped == 7
+    # The schedule stays on the original grid after skipping
+    assert scheduler.next_deadline == pytest.approx(100.0 + 1.1)
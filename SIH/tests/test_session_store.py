@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from session_store import SessionStore, SessionLog, session_logs
+
+FS, CHUNK_SIZE, BANDS = 500, 100, ('alpha', 'beta')
+
+
+def _rows(n, start_time=0.0, seq=0):
+    """`n` logged ticks of a mono session."""
+    return {
+        'timestamp': start_time + np.arange(n) * CHUNK_SIZE / FS,
+        'seq': seq + np.arange(n),
+        'label': np.arange(n) % 2,
+        'truth': np.ones(n, dtype=int),
+        'probability': np.full(n, 0.75),
+        'attention': np.linspace(0, 100, n),
+        'verdict_label': np.full(n, -1),
+        'verdict_confidence': np.zeros(n),
+        'band_powers': np.ones((n, 1, len(BANDS))),
+        'signal': np.arange(n * CHUNK_SIZE, dtype=float).reshape(n, CHUNK_SIZE) + seq * CHUNK_SIZE,
+    }
+
+
+def test_session_ids_differing_only_in_punctuation_get_separate_logs(tmp_path):
+    store = SessionStore(str(tmp_path))
+    for session_id in ('a/b', 'a_b', 'a.b'):
+        log = store.open(session_id, FS, CHUNK_SIZE, band_names=BANDS)
+        store.append(log, _rows(3))
+        store.close_log(log)
+    store.close()
+    assert len(session_logs(str(tmp_path))) == 3
+    for session_id in ('a/b', 'a_b', 'a.b'):
+        paths = session_logs(str(tmp_path), session_id)
+        assert [SessionLog(path).meta['session'] for path in paths] == [session_id]
+
+
+def test_store_round_trips_rows_and_answers_time_range_queries(tmp_path):
+    store = SessionStore(str(tmp_path), flush_rows=4)
+    log = store.open('s', FS, CHUNK_SIZE, band_names=BANDS)
+    store.append(log, _rows(5, start_time=100.0))
+    store.append(log, _rows(5, start_time=101.0, seq=5))
+    store.close()
+    stored = SessionLog(session_logs(str(tmp_path), 's')[0])
+    assert stored.n_rows == 10
+    np.testing.assert_array_equal(stored.column('seq'), np.arange(10))
+    assert stored.rows_between(100.4, 101.2) == (2, 6)
+    recording = stored.to_recording(100.4, 101.2)
+    np.testing.assert_array_equal(recording.signal, np.arange(2 * CHUNK_SIZE, 6 * CHUNK_SIZE))
+    np.testing.assert_array_equal(recording.labels, 1)
+
+
+def test_log_reads_only_complete_rows_while_being_written(tmp_path):
+    store = SessionStore(str(tmp_path))
+    log = store.open('s', FS, CHUNK_SIZE, band_names=BANDS)
+    store.append(log, _rows(4))
+    store.close()
+    path = session_logs(str(tmp_path), 's')[0]
+    with open(f'{path}/signal.bin', 'ab') as f:
+        f.write(b'\0' * 7)  # Half-written next row of one column
+    assert SessionLog(path).n_rows == 4
+
+
+def test_summary_reports_each_verdict_once(tmp_path):
+    rows = _rows(6)
+    rows['verdict_label'] = np.array([-1, 1, 1, 0, 0, 0])
+    rows['verdict_confidence'] = np.array([0, 0.8, 0.8, 0.6, 0.6, 0.7])
+    store = SessionStore(str(tmp_path))
+    log = store.open('s', FS, CHUNK_SIZE, band_names=BANDS)
+    store.append(log, rows)
+    store.close()
+    summary = SessionLog(session_logs(str(tmp_path), 's')[0]).summary()
+    assert [v['label'] for v in summary['verdicts']] == [1, 0, 0]
+    assert [v['confidence'] for v in summary['verdicts']] == pytest.approx([0.8, 0.6, 0.7])
+    assert summary['n_chunks'] == 6 and summary['focused_fraction'] == 0.5
+    assert summary['band_powers'] == {'alpha': 1.0, 'beta': 1.0}
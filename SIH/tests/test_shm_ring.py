@@ -0,0 +1,59 @@
+import pytest
+from shm_ring import FrameRing, RESERVED
+
+
+@pytest.fixture
+def ring():
+    ring = FrameRing.create(64)
+    yield ring
+    ring.close()
+
+
+def _payload(i, size=8):
+    return bytes([i]) * size
+
+
+def test_records_wrap_around_the_ring_and_reach_every_reader(ring):
+    attached = FrameRing.attach(ring.name)
+    try:
+        readers = [ring.reader(), attached.reader()]
+        received = [[], []]
+        for i in range(10):  # 20-byte records in a 64-byte ring: most of them wrap
+            ring.publish(_payload(i, 4), _payload(i, 4))
+            for reader, payloads in zip(readers, received):
+                payloads += reader.read()
+        assert received[0] == received[1] == [_payload(i) for i in range(10)]
+        assert readers[0].lost == readers[1].lost == 0
+    finally:
+        attached.close()
+
+
+def test_lapped_reader_skips_to_the_newest_record(ring):
+    reader = ring.reader()
+    for i in range(5):
+        ring.publish(_payload(i))
+    assert reader.read() == [] and reader.lost == 5
+    ring.publish(_payload(5))
+    assert reader.read() == [_payload(5)]
+
+
+def test_copy_overwritten_while_reading_is_discarded(ring):
+    reader = ring.reader()
+    ring.publish(_payload(0))
+    read = ring._read
+
+    def read_while_producer_laps(position, size):
+        if size == 8 and ring.header[RESERVED] < 80:  # Copying the payload: the producer catches up
+            for i in range(1, 4):
+                ring.publish(_payload(i))
+        return read(position, size)
+    ring._read = read_while_producer_laps
+    assert reader.read() == [] and reader.lost == 4
+    ring._read = read
+    ring.publish(_payload(4))
+    assert reader.read() == [_payload(4)]
+
+
+def test_record_larger_than_the_ring_is_rejected(ring):
+    with pytest.raises(ValueError):
+        ring.publish(bytes(64))
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from protocol import encode_frame, FRAME_CHUNK, FRAME_SUMMARY
+from recording import write_recording
+from sources import FileSource, JitterBuffer, StreamSource
+
+FS, CHUNK_SIZE = 500, 100
+
+
+def _packets(samples, size, start_time=0.0):
+    """(packet, device timestamp) pairs covering `samples` along the last axis."""
+    return [(samples[..., i:i + size], start_time + i / FS) for i in range(0, samples.shape[-1], size)]
+
+
+def test_jitter_buffer_reassembles_packets_into_aligned_chunks():
+    buffer = JitterBuffer(FS, CHUNK_SIZE, prefill=2)
+    signal = np.arange(1000, dtype=float)
+    for i, (packet, timestamp) in enumerate(_packets(signal, 37)):
+        buffer.push(packet, timestamp, arrival=1000.0 + timestamp + 0.05)
+    block = buffer.pop(1)
+    # The asked-for chunk plus the backlog above the prefill are handed out at once
+    assert len(block.chunks) == 9 and buffer.chunks_available == 1
+    np.testing.assert_array_equal(block.chunks.reshape(-1), signal[:900])
+    np.testing.assert_allclose(np.diff(block.timestamps), CHUNK_SIZE / FS)
+    assert block.timestamps[0] == pytest.approx(1000.0, abs=0.1)
+
+
+def test_jitter_buffer_fills_short_gaps_and_drops_late_samples():
+    buffer = JitterBuffer(FS, CHUNK_SIZE, prefill=1)
+    signal = np.arange(400, dtype=float)
+    packets = _packets(signal, 50)
+    del packets[2]  # A lost packet: samples 100-149
+    packets.insert(4, packets[3])  # A duplicate
+    for packet, timestamp in packets:
+        buffer.push(packet, timestamp)
+    block = buffer.pop(4)
+    samples = block.chunks.reshape(-1)
+    assert len(samples) == 400
+    np.testing.assert_array_equal(samples[100:150], 99.0)  # Held last sample keeps later chunks aligned
+    np.testing.assert_array_equal(samples[150:], signal[150:])
+    assert (buffer.filled_samples, buffer.late_samples) == (50, 50)
+
+
+def test_jitter_buffer_prefills_again_after_an_underrun():
+    buffer = JitterBuffer(FS, CHUNK_SIZE, n_channels=2, prefill=2)
+    buffer.push(np.ones((2, CHUNK_SIZE)))
+    assert buffer.pop() is None  # Still prefilling
+    buffer.push(np.ones((2, CHUNK_SIZE)))
+    assert buffer.pop().chunks.shape == (1, 2, CHUNK_SIZE)
+    assert buffer.pop().chunks.shape == (1, 2, CHUNK_SIZE)
+    assert buffer.pop() is None and buffer.underruns == 1
+    buffer.push(np.ones((2, CHUNK_SIZE)))
+    assert buffer.pop() is None
+    with pytest.raises(ValueError):
+        buffer.push(np.ones((3, CHUNK_SIZE)))
+
+
+def test_stream_source_decodes_frames_and_counts_lost_packets():
+    source = StreamSource(FS, CHUNK_SIZE, prefill=1)
+    for seq in (0, 1, 3, 4):  # Packet 2 is lost
+        source.push_frame(encode_frame(FRAME_CHUNK, seq, 0.0, np.full(CHUNK_SIZE, seq, dtype=float)))
+    block = source.read(1)
+    assert block.chunks.shape == (4, CHUNK_SIZE) and source.lost_packets == 1
+    assert source.read(1).chunks.shape == (0, CHUNK_SIZE)  # Underrun: an empty block, not None
+    with pytest.raises(ValueError):
+        source.push_frame(encode_frame(FRAME_SUMMARY, 5, 0.0, np.zeros(0)))
+
+
+def test_file_source_reads_views_and_loops(tmp_path):
+    signal = np.arange(3 * 1000, dtype=np.float32).reshape(3, 1000)
+    path = str(tmp_path / 'loop.eegrec')
+    write_recording(path, signal, np.arange(10) % 2, FS, CHUNK_SIZE, ['F3', 'F4', 'Cz'])
+    source = FileSource(path)
+    block = source.read(4)
+    assert block.chunks.shape == (4, 3, CHUNK_SIZE)
+    assert np.shares_memory(block.chunks, source.recording.signal)
+    np.testing.assert_array_equal(block.chunks[2], signal[:, 200:300])
+    np.testing.assert_array_equal(block.labels, [0, 1, 0, 1])
+    block = source.read(7)  # Loops back to the start after six chunks
+    np.testing.assert_array_equal(block.chunks[-1], signal[:, :CHUNK_SIZE])
+    np.testing.assert_allclose(block.timestamps, np.r_[np.arange(4, 10), 0] * CHUNK_SIZE / FS)
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from verdict import VerdictAggregator
+
+
+def test_tumbling_emits_once_per_window():
+    aggregator = VerdictAggregator(4)
+    verdicts = [aggregator.update(label, p) for label, p in [(1, 0.9), (1, 0.8), (0, 0.4), (1, 0.7)] * 2]
+    assert verdicts[:3] == [None] * 3 and verdicts[4:7] == [None] * 3
+    verdict = verdicts[3]
+    assert (verdict.label, verdict.n_chunks) == (1, 4)
+    assert verdict.confidence == pytest.approx(0.75)
+    assert verdict.probability == pytest.approx(0.7)
+    assert verdicts[7] == verdict
+    assert aggregator.remaining == 4
+
+
+def test_sliding_covers_the_latest_window():
+    rng = np.random.default_rng(0)
+    labels = rng.integers(0, 2, 50)
+    probabilities = rng.random(50)
+    aggregator = VerdictAggregator(7, mode='sliding')
+    for i, (label, p) in enumerate(zip(labels, probabilities)):
+        verdict = aggregator.update(label, p)
+        window = slice(max(0, i - 6), i + 1)
+        fraction = labels[window].mean()
+        assert verdict.label == int(fraction > 0.5)
+        assert verdict.confidence == pytest.approx(fraction if verdict.label else 1 - fraction)
+        assert verdict.probability == pytest.approx(probabilities[window].mean())
+        assert verdict.n_chunks == min(i + 1, 7)
+    assert aggregator.remaining == 0
+
+
+def test_decay_weights_recent_predictions():
+    aggregator = VerdictAggregator(10, mode='decay', half_life=2)
+    for _ in range(20):
+        aggregator.update(0)
+    verdict = aggregator.update(1)
+    assert verdict.label == 0
+    for _ in range(3):
+        verdict = aggregator.update(1)
+    # After two half-lives of focused chunks the older unfocused history has lost the majority
+    assert verdict.label == 1 and verdict.n_chunks == 10
+    assert verdict.probability == pytest.approx(verdict.confidence)
+
+
+def test_rejects_bad_settings():
+    with pytest.raises(ValueError):
+        VerdictAggregator(5, mode='median')
+    with pytest.raises(ValueError):
+        VerdictAggregator(0)
@@ -0,0 +1,100 @@
+import numpy as np
+from collections import namedtuple
+
+VERDICT_MODES = ('tumbling', 'sliding', 'decay')
+
+
+class Verdict(namedtuple('Verdict', ['label', 'confidence', 'probability', 'n_chunks'])):
+    """Majority label over a window, how clear the majority was, and the mean focus probability."""
+    __slots__ = ()
+
+    def __str__(self):
+        verdict_str = 'Focused' if self.label == 1 else 'Not Focused'
+        return f'{verdict_str} (Confidence: {self.confidence:.2f})'
+
+
+class VerdictAggregator:
+    """
+    Turns per-chunk predictions into focus verdicts at constant cost per tick.
+
+    tumbling  one verdict at the end of every `window` chunks (the original behaviour)
+    sliding   a verdict on every tick over the latest `window` chunks; the predictions
+              live in a fixed-size circular array and the running sums are updated by
+              adding the newest and subtracting the oldest entry
+    decay     a verdict on every tick over exponentially decayed sums; by default the
+              decay gives an effective memory of `window` chunks, or pass `half_life`
+    """
+    def __init__(self, window, mode='tumbling', half_life=None):
+        if mode not in VERDICT_MODES:
+            raise ValueError(f"Unknown verdict mode '{mode}', expected one of {VERDICT_MODES}.")
+        if window <= 0:
+            raise ValueError("The verdict window must be positive.")
+        self.window = window
+        self.mode = mode
+        self.decay = 0.5 ** (1.0 / half_life) if half_life else 1.0 - 1.0 / window
+        self._labels = np.zeros(window if mode == 'sliding' else 0, dtype=np.int8)
+        self._probabilities = np.zeros(len(self._labels))
+        self.reset()
+
+    def reset(self):
+        self.count = 0  # Chunks in the current window (capped at `window` for sliding/decay)
+        self.cursor = 0
+        self.focus_sum = 0.0
+        self.probability_sum = 0.0
+        self.weight = 0.0
+
+    @property
+    def remaining(self):
+        """Chunks until the next verdict: counts down for tumbling windows, 0 for rolling ones."""
+        return self.window - self.count if self.mode == 'tumbling' else 0
+
+    @property
+    def progress(self):
+        """Fraction of the window filled so far."""
+        return self.count / self.window
+
+    def update(self, label, probability=None):
+        """
+        Adds one prediction (and optionally the model's focus probability, which defaults
+        to the label) and returns the Verdict it completes, or None.
+        """
+        probability = float(label) if probability is None else float(probability)
+        if self.mode == 'tumbling':
+            self.count += 1
+            self.focus_sum += label
+            self.probability_sum += probability
+            self.weight += 1
+            if self.count < self.window:
+                return None
+            verdict = self._verdict()
+            self.reset()
+            return verdict
+
+        if self.mode == 'sliding':
+            if self.count == self.window:
+                self.focus_sum -= self._labels[self.cursor]
+                self.probability_sum -= self._probabilities[self.cursor]
+            else:
+                self.count += 1
+                self.weight += 1
+            self._labels[self.cursor] = label
+            self._probabilities[self.cursor] = probability
+            self.focus_sum += label
+            self.probability_sum += probability
+            self.cursor = (self.cursor + 1) % self.window
+            if self.cursor == 0:
+                # Re-sum once per lap so rounding errors in the running sum cannot accumulate
+                self.probability_sum = float(self._probabilities[:self.count].sum())
+            return self._verdict()
+
+        self.count = min(self.count + 1, self.window)
+        self.focus_sum = self.decay * self.focus_sum + label
+        self.probability_sum = self.decay * self.probability_sum + probability
+        self.weight = self.decay * self.weight + 1
+        return self._verdict()
+
+    def _verdict(self):
+        fraction = self.focus_sum / self.weight
+        label = 1 if self.focus_sum > self.weight / 2 else 0
+        confidence = fraction if label == 1 else 1 - fraction
+        return Verdict(label, float(confidence), float(self.probability_sum / self.weight), self.count)
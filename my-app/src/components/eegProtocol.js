@@ -0,0 +1,45 @@
+// Decoder for the binary frames sent by SIH/server.py (see SIH/protocol.py for the layout).
+export const FRAME_CHUNK = 1;
+export const FRAME_SNAPSHOT = 2;
+export const FRAME_DISPLAY = 3;
+export const FRAME_SUMMARY = 4;
+const HEADER_SIZE = 28;
+const MAGIC = "EEG1";
+const textDecoder = new TextDecoder();
+
+export function decodeFrame(buffer) {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3));
+  if (magic !== MAGIC) throw new Error(`Unexpected frame magic: ${magic}`);
+
+  const kind = view.getUint8(5);
+  const channels = view.getUint16(6, true);
+  const seq = view.getUint32(8, true);
+  const timestamp = view.getFloat64(12, true);
+  const samplesPerChannel = view.getUint32(20, true);
+  const metaLength = view.getUint32(24, true);
+
+  const count = channels * samplesPerChannel;
+  const samples = new Float32Array(buffer, HEADER_SIZE, count);
+  const metaStart = HEADER_SIZE + count * 4;
+  const state = metaLength ? JSON.parse(textDecoder.decode(new Uint8Array(buffer, metaStart, metaLength))) : {};
+
+  return { kind, channels, seq, timestamp, samplesPerChannel, samples, state };
+}
+
+// Stream levels: "raw" (chunks + state), "display" (min/max trace), "summary" (state only).
+export function streamUrl(base, streams, displayPoints) {
+  const params = new URLSearchParams({ streams: streams.join(",") });
+  if (displayPoints) params.set("display_points", String(displayPoints));
+  return `${base}/?${params}`;
+}
+
+// Asks for at most `rate` frames per second (the server ticks at 10); slower frames coalesce the ticks in between.
+export function rateMessage(rate) {
+  return JSON.stringify({ type: "subscribe", rate });
+}
+
+// Frames carry only the state fields that changed since the previous one; fold them into the known state.
+export function mergeState(known, frame) {
+  return { ...known, ...frame.state };
+}
@@ -1,10 +1,13 @@
 import { useState, useEffect, useMemo, useRef } from "react";
+import { decodeFrame, streamUrl, rateMessage, mergeState, FRAME_SUMMARY } from "./eegProtocol";
 
 const EEG_CHANNELS = ["Fp1", "Fp2", "Cz"]; // Reduced to match visualization in EegStreamChart
 
-// --- NEW: Hardcoded attention sequence for predictable demo values ---
-// This array has 20 values: 18 are high-focus (60-90) and 2 are low-focus (0-30).
-const ATTENTION_SEQUENCE = [75, 82, 68, 88, 79, 15, 85, 90, 71, 83, 66, 77, 89, 28, 74, 81, 70, 86, 76, 84];
+// The hook only renders the model output and the buffer mean, so it subscribes to the compact summary stream
+const STREAM_URL = streamUrl("ws://localhost:8765", ["summary"]);
+// Frames per second while the tab is hidden; above the 1 s after which the fallback below kicks in
+const BACKGROUND_RATE = 2;
+const FULL_RATE = 10;
 
 export default function useDemoStream(isStreaming = false) {
   const [attention, setAttention] = useState(0);
@@ -15,7 +18,7 @@ export default function useDemoStream(isStreaming = false) {
   const [ws, setWs] = useState(null);
   const lastEventTimestampRef = useRef(0);
   const lastAttentionUpdateRef = useRef(Date.now());
-  const attentionIndexRef = useRef(0);
+  const lastAttentionRef = useRef(0);
 
   useEffect(() => {
     if (!isStreaming) {
@@ -29,8 +32,8 @@ export default function useDemoStream(isStreaming = false) {
       return;
     }
 
-    // Reset attention cycle index
-    attentionIndexRef.current = 0;
+    // No score until the first summary frame arrives
+    lastAttentionRef.current = 0;
 
     // Reset session events and attention history when a new session starts
     const initialAttention = 0;
@@ -42,29 +45,37 @@ export default function useDemoStream(isStreaming = false) {
     lastAttentionUpdateRef.current = startTimestamp;
 
     // Initialize WebSocket connection
-    const websocket = new WebSocket("ws://localhost:8765");
+    const websocket = new WebSocket(STREAM_URL);
+    websocket.binaryType = "arraybuffer";
     setWs(websocket);
+    let serverState = {};
+
+    // A hidden tab does not need every tick
+    const sendRate = () => websocket.send(rateMessage(document.hidden ? BACKGROUND_RATE : FULL_RATE));
+    const onVisibilityChange = () => {
+      if (websocket.readyState === WebSocket.OPEN) sendRate();
+    };
+    document.addEventListener("visibilitychange", onVisibilityChange);
 
     websocket.onopen = () => {
       console.log("🟢 Connected to WebSocket server");
+      if (document.hidden) sendRate();
     };
 
     websocket.onmessage = (event) => {
       try {
-        const data = JSON.parse(event.data);
-        const { eeg_buffer, current_focus_text } = data;
+        // The handshake is the only text message; summary frames carry everything we render
+        if (typeof event.data === "string") return;
 
-        // Validate eeg_buffer
-        if (!eeg_buffer || !Array.isArray(eeg_buffer)) {
-          console.error("Invalid or missing eeg_buffer data:", eeg_buffer);
-          return;
-        }
+        const frame = decodeFrame(event.data);
+        if (frame.kind !== FRAME_SUMMARY) return;
+        serverState = mergeState(serverState, frame);
+        if (serverState.attention == null) return;
 
         // Process EEG signal into multi-channel format
         const timestamp = Date.now();
         
-        const mean = eeg_buffer.reduce((sum, val) => sum + val, 0) / eeg_buffer.length;
-        const scaledMean = (mean / 500);
+        const scaledMean = (serverState.buffer_mean / 500);
 
         const newEegPoint = EEG_CHANNELS.reduce((acc, channel, index) => {
             const noise = (Math.random() - 0.5) * 0.2; 
@@ -80,9 +91,9 @@ export default function useDemoStream(isStreaming = false) {
           return newData;
         });
         
-        // --- FIX: Use the hardcoded attention sequence ---
-        const currentAttention = ATTENTION_SEQUENCE[attentionIndexRef.current];
-        attentionIndexRef.current = (attentionIndexRef.current + 1) % ATTENTION_SEQUENCE.length;
+        // Smoothed model probability computed by the server (0-100)
+        const currentAttention = serverState.attention;
+        lastAttentionRef.current = currentAttention;
         setAttention(currentAttention);
 
         // Add to attention history every message for continuous graph
@@ -150,9 +161,8 @@ export default function useDemoStream(isStreaming = false) {
       const now = Date.now();
       if (now - lastAttentionUpdateRef.current >= 1000) { // 1s without update
         setAttention((prev) => {
-          // Also use the sequence in the fallback
-          const newAttention = ATTENTION_SEQUENCE[attentionIndexRef.current];
-          attentionIndexRef.current = (attentionIndexRef.current + 1) % ATTENTION_SEQUENCE.length;
+          // Hold the last score from the server until updates resume
+          const newAttention = lastAttentionRef.current;
           setAttentionHistory((prevHistory) => {
             const newHistory = [...prevHistory, { timestamp: now, attention: Math.round(newAttention) }];
             return newHistory.length > 600 ? newHistory.slice(-600) : newHistory;
@@ -177,7 +187,8 @@ export default function useDemoStream(isStreaming = false) {
     }, 500);
 
     return () => {
-      websocket.close();
+      document.removeEventListener("visibilitychange", onVisibilityChange);
+      websocket.close();
       clearInterval(interval);
     };
   }, [isStreaming]);